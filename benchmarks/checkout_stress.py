@@ -0,0 +1,201 @@
+"""Stress test of parallel checkouts of a hot product
+
+Creates a product with limited stock and buyers who all have it in cart,
+checks out all the carts in parallel and verifies that the product wasn't
+oversold: units in orders plus the remaining stock must equal the initial
+stock. Exits with 1 if they don't.
+
+Usage (with the app installed as a package):
+    python benchmarks/checkout_stress.py [--url URL] [--buyers N]
+        [--workers N] [--stock N] [--amount N]
+
+The database is created in a temporary SQLite file unless `--url` is given
+(e.g. `postgresql://...`, tables are created if missing). SQLite serializes
+writers, so checkouts there wait for each other or fail with "database is
+locked" and are retried; PostgreSQL only makes checkouts of the same
+product wait for each other's row locks.
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Settings the app requires on import, unused by the benchmark
+os.environ.setdefault('DATABASE_CONNECTION_URL', 'sqlite://')
+os.environ.setdefault('HASH_ALGORITHM', 'HS256')
+os.environ.setdefault('HASH_SECRET_KEY', 'benchmark')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+import sqlalchemy
+import sqlalchemy.exc
+import sqlalchemy.orm
+
+import market.common.errors
+import market.database.mappers
+import market.database.orm
+import market.modules.cart.domain.models
+import market.modules.order.domain.models
+import market.modules.product.domain.models
+import market.modules.user.domain.models
+import market.services.orders
+from market.services import unit_of_work
+
+
+# Attempts of a checkout failing with database errors (e.g. lock timeouts)
+MAX_ATTEMPTS = 20
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', help='Database URL')
+    parser.add_argument('--buyers', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--amount', type=int, default=1)
+    return parser.parse_args()
+
+
+def create_engine(url: str, workers: int) -> sqlalchemy.Engine:
+    if url.startswith('sqlite'):
+        return sqlalchemy.create_engine(
+            url,
+            connect_args={'timeout': 30, 'check_same_thread': False},
+        )
+
+    return sqlalchemy.create_engine(url, pool_size=workers, max_overflow=0)
+
+
+def populate(session_factory, buyers: int, stock: int, amount: int):
+    """Returns ids of the product and the buyers"""
+    seller = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username=f'seller_{uuid.uuid4().hex}',
+        password='password_hash',
+    )
+    product = market.modules.product.domain.models.Product(
+        id=uuid.uuid4(),
+        title='Hot product',
+        stock=stock,
+        price_rub=100.0,
+        owner_id=seller.id,
+    )
+    product_id = product.id
+    buyer_ids = [uuid.uuid4() for _ in range(buyers)]
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.users.add(seller)
+        uow.products.add(product)
+
+        for buyer_id in buyer_ids:
+            uow.users.add(market.modules.user.domain.models.User(
+                id=buyer_id,
+                username=f'buyer_{buyer_id.hex}',
+                password='password_hash',
+            ))
+            uow.cart.add(market.modules.cart.domain.models.CartItem(
+                id=uuid.uuid4(),
+                amount=amount,
+                product_id=product_id,
+                user_id=buyer_id,
+            ))
+
+        uow.commit()
+
+    return product_id, buyer_ids
+
+
+def check_out(session_factory, buyer_id: uuid.UUID):
+    """Returns outcome of the checkout and the number of retries"""
+    for attempt in range(MAX_ATTEMPTS):
+        with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+            try:
+                market.services.orders.checkout(uow, buyer_id)
+                uow.commit()
+                return 'ordered', attempt
+            except market.common.errors.OutOfStockError:
+                return 'out of stock', attempt
+            except sqlalchemy.exc.OperationalError:
+                uow.rollback()
+
+    return 'failed', MAX_ATTEMPTS
+
+
+def count_ordered(session_factory, product_id: uuid.UUID) -> int:
+    item = market.modules.order.domain.models.OrderItem
+
+    with session_factory() as session:
+        statement = sqlalchemy.select(sqlalchemy.func.sum(item.amount))
+        statement = statement.where(item.product_id == product_id)
+        return session.scalar(statement) or 0
+
+
+def main() -> int:
+    args = parse_args()
+    url = args.url
+
+    if url is None:
+        directory = tempfile.mkdtemp(prefix='checkout_stress_')
+        url = f'sqlite:///{os.path.join(directory, "market.db")}'
+
+    market.database.mappers.start_mappers()
+    engine = create_engine(url, args.workers)
+    market.database.orm.Base.metadata.create_all(bind=engine)
+    session_factory = sqlalchemy.orm.sessionmaker(bind=engine)
+    product_id, buyer_ids = populate(
+        session_factory,
+        args.buyers,
+        args.stock,
+        args.amount,
+    )
+
+    outcomes = {'ordered': 0, 'out of stock': 0, 'failed': 0}
+    retries = 0
+    started_at = time.perf_counter()
+
+    with concurrent.futures.ThreadPoolExecutor(args.workers) as executor:
+        futures = [
+            executor.submit(check_out, session_factory, buyer_id)
+            for buyer_id in buyer_ids
+        ]
+
+        for future in concurrent.futures.as_completed(futures):
+            outcome, attempts = future.result()
+            outcomes[outcome] += 1
+            retries += attempts
+
+    elapsed = time.perf_counter() - started_at
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        final_stock = uow.products.get(product_id).stock
+
+    ordered_units = count_ordered(session_factory, product_id)
+    engine.dispose()
+
+    print(f'Database: {engine.dialect.name}, workers: {args.workers}')
+    print(
+        f'Checkouts: {args.buyers} in {elapsed:.2f}s '
+        f'({args.buyers / elapsed:.0f}/s), {retries} retries',
+    )
+
+    for outcome, count in outcomes.items():
+        print(f'  {outcome}: {count}')
+
+    print(
+        f'Stock: {args.stock} initial, {ordered_units} ordered, '
+        f'{final_stock} left',
+    )
+
+    consistent = (
+        final_stock >= 0
+        and ordered_units + final_stock == args.stock
+        and ordered_units == outcomes['ordered'] * args.amount
+    )
+    print('OK' if consistent else 'OVERSOLD OR INCONSISTENT')
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
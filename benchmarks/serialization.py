@@ -0,0 +1,126 @@
+"""Benchmark of serialization of a product listing
+
+Serializes a listing of products the way list endpoints did, with
+`ProductRead.from_orm` per row followed by FastAPI's validation against
+the `response_model` and `jsonable_encoder`, and the way they do with the
+validation-free serializer of `ProductRead`. Both end with encoding the
+listing with orjson, like `ORJSONResponse` does, and are checked to give
+the same JSON. Prints the best time of each and its cost per row.
+
+Usage (with the app installed as a package):
+    python benchmarks/serialization.py [--products N] [--repeat N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+
+# Settings the app requires on import, unused by the benchmark
+os.environ.setdefault('DATABASE_CONNECTION_URL', 'sqlite://')
+os.environ.setdefault('HASH_ALGORITHM', 'HS256')
+os.environ.setdefault('HASH_SECRET_KEY', 'benchmark')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+import fastapi.routing
+import fastapi.utils
+import orjson
+
+import market.modules.product.domain.models
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app.routers.product import schemas
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args()
+
+
+def make_products(count: int):
+    owner_id = uuid.uuid4()
+    added = datetime(2023, 1, 1)
+    return [
+        market.modules.product.domain.models.Product(
+            id=uuid.uuid4(),
+            title=f'Product title {number}',
+            description='Product description',
+            stock=number % 100,
+            price_rub=100.0 + number,
+            owner_id=owner_id,
+            added=added + timedelta(seconds=number),
+            last_updated=added + timedelta(seconds=number),
+        )
+        for number in range(count)
+    ]
+
+
+RESPONSE_FIELD = fastapi.utils.create_response_field(
+    name='Response_get_products',
+    type_=List[schemas.ProductRead],
+)
+
+
+def serialize_validated(products) -> bytes:
+    content = [schemas.ProductRead.from_orm(product) for product in products]
+    content = asyncio.run(fastapi.routing.serialize_response(
+        field=RESPONSE_FIELD,
+        response_content=content,
+    ))
+    return orjson.dumps(content)
+
+
+def serialize_unvalidated(products) -> bytes:
+    response = serializers.make_list_response(
+        schemas.serialize_product,
+        products,
+    )
+    return response.body
+
+
+def measure(serialize, products, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        serialize(products)
+        timings.append(time.perf_counter() - started_at)
+
+    return min(timings)
+
+
+def main() -> int:
+    args = parse_args()
+    products = make_products(args.products)
+
+    if orjson.loads(serialize_validated(products)) != orjson.loads(
+        serialize_unvalidated(products),
+    ):
+        print('Serializations differ')
+        return 1
+
+    validated = measure(serialize_validated, products, args.repeat)
+    unvalidated = measure(serialize_unvalidated, products, args.repeat)
+
+    print(f'Products: {args.products}, best of {args.repeat}')
+
+    for name, elapsed in (
+        ('from_orm + response_model', validated),
+        ('serializer', unvalidated),
+    ):
+        print(
+            f'  {name}: {elapsed * 1000:.1f}ms '
+            f'({elapsed / args.products * 1e6:.2f}us per row)',
+        )
+
+    print(f'Speedup: {validated / unvalidated:.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,44 @@
+import concurrent.futures
+import contextlib
+import functools
 import logging
+import multiprocessing
 import os
 import os.path
+import re
 import uuid
+from typing import AsyncIterator
 from typing import Callable
 from typing import Iterator
 from typing import Optional
+from typing import Union
 
+from fastapi import BackgroundTasks
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Header
+from fastapi import Query
 from fastapi import UploadFile
 from fastapi import status
 
+import market.common.errors
+import market.common.executors
+import market.common.uploads
+import market.config
 import market.database
 import market.database.orm
 import market.services.auth
+import market.services.media
+import market.services.storage
 import market.modules.image.domain.models
 import market.modules.image.repositories
+import market.modules.image.variants
 import market.modules.user.domain.models
 import market.modules.user.repositories
 from market.services import unit_of_work
 from market.apps.fastapi_app import auth
+from market.apps.fastapi_app import streaming
+from market.apps.fastapi_app import writes
 
 
 def get_uow() -> Iterator[unit_of_work.abstract.UnitOfWork]:
@@ -30,23 +49,72 @@ def get_uow() -> Iterator[unit_of_work.abstract.UnitOfWork]:
         yield uow
 
 
+async def get_async_uow() -> AsyncIterator[unit_of_work.AsyncUnitOfWork]:
+    uow = unit_of_work.sqlalchemy.AsyncSQLAlchemyUnitOfWork(
+        market.database.orm.DEFAULT_ASYNC_SESSION_FACTORY,
+    )
+    async with uow:
+        yield uow
+
+
+def get_async_uow_factory() -> Callable[[], unit_of_work.AsyncUnitOfWork]:
+    """Returns factory of units of work for tasks which outlive requests"""
+    return lambda: unit_of_work.AsyncSQLAlchemyUnitOfWork(
+        market.database.orm.DEFAULT_ASYNC_SESSION_FACTORY,
+    )
+
+
 AuthServiceFactory = Callable[
-    [market.modules.user.repositories.UserRepository],
+    [
+        Union[
+            market.modules.user.repositories.UserRepository,
+            market.modules.user.repositories.AsyncUserRepository,
+        ],
+    ],
     market.services.auth.AuthService
 ]
 
 
-def get_auth_service_factory() -> AuthServiceFactory:
-    return lambda repo: market.services.auth.AuthServiceImpl(repo)
+@functools.lru_cache(maxsize=None)
+def get_user_cache() -> market.services.auth.UserCache:
+    """Returns the process-wide cache of users authenticated by tokens"""
+    return market.services.auth.UserCache(
+        max_size=market.config.get_user_cache_size(),
+        ttl=market.config.get_user_cache_ttl_seconds(),
+    )
+
+
+def get_auth_service_factory(
+    user_cache: market.services.auth.UserCache = Depends(get_user_cache),
+) -> AuthServiceFactory:
+    return lambda repo: market.services.auth.AuthServiceImpl(
+        repo,
+        user_cache=user_cache,
+    )
 
 
-def get_user(
+@functools.lru_cache(maxsize=None)
+def get_auth_executor() -> market.common.executors.BoundedExecutor:
+    """Returns the pool which runs password hashing (and the database work
+    around it) outside of the event loop
+    """
+    return market.common.executors.BoundedExecutor(
+        max_workers=market.config.get_auth_workers(),
+        max_queue_size=market.config.get_auth_queue_size(),
+        thread_name_prefix='auth',
+    )
+
+
+async def get_user(
     token: str = Depends(auth.oauth2_scheme),
     auth_service_factory: AuthServiceFactory = Depends(get_auth_service_factory),
-    uow: unit_of_work.UnitOfWork = Depends(get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(get_async_uow),
 ) -> market.modules.user.domain.models.User:
+    """Returns the authorized user, who's looked up on the event loop.
+    Endpoints on the asyncio unit of work share its session
+    """
     auth_service = auth_service_factory(uow.users)
-    user = auth_service.get_user(token)
+    user = await auth_service.get_user_async(token)
 
     if user is None:
         raise HTTPException(
@@ -57,33 +125,89 @@ def get_user(
     return user
 
 
-def get_available_media_filename(media_path: str, media_filename: str) -> str:
-    """Checks if media file name is available and returns the original
-    file name if it is and generates a unique one otherwise
+def get_page_size(
+    limit: Optional[int] = Query(default=None, gt=0),
+) -> int:
+    """Returns requested page size capped at the configured maximum"""
+    if limit is None:
+        limit = market.config.get_products_page_size()
+    
+    return min(limit, market.config.get_products_max_page_size())
 
-    Returns:
-        Available media file name
+
+def get_return_representation(
+    prefer: Optional[str] = Header(default=None),
+) -> bool:
+    """Returns whether a write should respond with the written resource
+    instead of redirecting to it
     """
-    new_media_filename = media_filename
+    preference = writes.get_return_preference(prefer)
 
-    while os.path.exists(os.path.join(media_path, new_media_filename)):
-        new_media_filename = f'{uuid.uuid4().hex}_{media_filename}'
-    
-    return new_media_filename
+    if preference is None:
+        return market.config.get_return_representation()
+
+    return preference == 'representation'
+
+
+def get_streaming_requested(
+    accept: Optional[str] = Header(default=None),
+) -> bool:
+    """Returns whether a listing should be streamed as NDJSON"""
+    return streaming.accepts_ndjson(accept)
+
+
+# Extensions of stored files are taken from the names of uploaded ones
+MEDIA_EXTENSION_PATTERN = re.compile(r'\.[a-z0-9]{1,10}')
+
+
+def get_image_extension(filename: str) -> str:
+    """Returns lowercase extension of the file name, or an empty string
+    if it's missing or has unexpected characters
+    """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if MEDIA_EXTENSION_PATTERN.fullmatch(extension) is None:
+        return ''
+
+    return extension
 
 
 def get_media_path() -> Optional[str]:
     return os.getenv('MEDIA_PATH')
 
 
-def write_image(
-    image: UploadFile,
-    media_path: str = Depends(get_media_path),
-) -> str:
-    """Writes uploaded image into a file in a media folder"""
-    if media_path is None:
-        raise RuntimeError('MEDIA_PATH is not specified')
+@functools.lru_cache(maxsize=None)
+def get_s3_storage() -> market.services.storage.S3Storage:
+    """Returns the process-wide S3 storage, which keeps a pool of
+    connections to the store
+    """
+    return market.services.storage.create_s3_storage(
+        market.config.get_s3_settings(),
+    )
+
+
+def get_media_storage(
+    media_path: Optional[str] = Depends(get_media_path),
+) -> market.services.storage.Storage:
+    backend = market.config.get_media_storage_backend()
+
+    if backend == 's3':
+        return get_s3_storage()
     
+    return market.services.storage.create_storage(backend, media_path)
+
+
+async def write_image(
+    image: UploadFile,
+    media_storage: market.services.storage.Storage = Depends(
+        get_media_storage,
+    ),
+) -> AsyncIterator[market.common.uploads.UploadedFile]:
+    """Writes uploaded image into the media storage. The image is
+    streamed in chunks, so memory usage doesn't depend on its size.
+    Its file is checked to be still stored after the request, see
+    `store_upload`
+    """
     # We need image to name to at least have an information
     # about it's extension
     if image.filename is None:
@@ -92,30 +216,89 @@ def write_image(
             detail='Image name is not specified',
         )
     
-    # Saving image into media folder
-    image_filename = get_available_media_filename(media_path, image.filename)
-    image_path = os.path.join(media_path, image_filename)
-    try:
-        image_contents = image.file.read()
-        with open(image_path, 'wb') as f:
-            f.write(image_contents)
-    except IOError as e:
-        logging.error(f'Error adding an image: {str(e)} (filename: {e.filename})')
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail='Unable to add the image',
+    max_size = market.config.get_max_image_size()
+
+    # Rejecting images of known size before copying anything
+    if image.size is not None and image.size > max_size:
+        raise market.common.errors.FileTooLargeError(
+            f'File exceeds the maximum size of {max_size} bytes',
         )
-    return image_filename
+    
+    async with contextlib.AsyncExitStack() as stack:
+        # Saving image into the storage. Files are named after their
+        # content, so identical images are stored once
+        try:
+            uploaded_file = await stack.enter_async_context(
+                market.services.media.store_upload(
+                    media_storage,
+                    image.file,
+                    chunk_size=market.config.get_media_chunk_size(),
+                    max_size=max_size,
+                    extension=get_image_extension(image.filename),
+                ),
+            )
+        except (IOError, market.common.errors.StorageError) as e:
+            logging.error(f'Error adding an image: {str(e)}')
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail='Unable to add the image',
+            )
+        
+        yield uploaded_file
+
+
+@functools.lru_cache(maxsize=None)
+def get_media_executor() -> concurrent.futures.Executor:
+    """Returns the process pool which generates image variants. Workers
+    are spawned rather than forked, so they don't inherit database
+    connections and threads of the app
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=market.config.get_media_workers(),
+        mp_context=multiprocessing.get_context('spawn'),
+    )
 
 
 def save_image(
-    image_filename: str = Depends(write_image),
+    background_tasks: BackgroundTasks,
+    uploaded_image: market.common.uploads.UploadedFile = Depends(write_image),
+    media_storage: market.services.storage.Storage = Depends(
+        get_media_storage,
+    ),
     uow: unit_of_work.UnitOfWork = Depends(get_uow),
+    media_executor: concurrent.futures.Executor = Depends(get_media_executor),
+    async_uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork] = Depends(
+        get_async_uow_factory,
+    ),
 ) -> market.modules.image.domain.models.Image:
+    """Records the uploaded image and schedules generation of its variants
+    unless the same content was uploaded before and already has them
+    """
+    variants = uow.images.get_variants_by_content_hash(uploaded_image.sha256)
     instance = market.modules.image.domain.models.Image(
         id=uuid.uuid4(),
-        image=image_filename,
+        image=uploaded_image.name,
+        content_hash=uploaded_image.sha256,
+        variants=dict(variants),
     )
     added_instance = uow.images.add(instance)
     uow.commit()
+
+    generate_variants = (
+        not variants
+        and market.config.get_image_variants_enabled()
+        and market.modules.image.variants.is_supported()
+    )
+
+    if generate_variants:
+        background_tasks.add_task(
+            market.services.media.generate_image_variants,
+            image_id=added_instance.id,
+            image_name=added_instance.image,
+            content_hash=added_instance.content_hash,
+            media_storage=media_storage,
+            executor=media_executor,
+            uow_factory=async_uow_factory,
+        )
+
     return added_instance
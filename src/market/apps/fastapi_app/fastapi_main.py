@@ -1,16 +1,23 @@
+import asyncio
 import contextlib
 import logging
+from datetime import timedelta
+from typing import Optional
 
 from fastapi import FastAPI
 from fastapi import status
 from fastapi import responses
 from fastapi.middleware import cors
 
+import market.apps.fastapi_app.deps
 import market.apps.fastapi_app.routers
 import market.common.errors
 import market.config
 import market.database.orm
 import market.database.mappers
+import market.modules.product.search
+import market.services.media
+import market.services.auth.impl
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
@@ -18,13 +25,52 @@ logger.setLevel(logging.WARNING)
 market.database.mappers.start_mappers()
 
 
+def start_media_gc() -> Optional[asyncio.Task]:
+    """Starts periodic collection of orphaned images unless it's disabled"""
+    settings = market.config.get_media_gc_settings()
+
+    if not settings.interval_seconds:
+        return None
+
+    deps = market.apps.fastapi_app.deps
+    collection = market.services.media.collect_orphaned_images_periodically(
+        settings.interval_seconds,
+        media_storage=deps.get_media_storage(deps.get_media_path()),
+        uow_factory=deps.get_async_uow_factory(),
+        grace_period=timedelta(seconds=settings.grace_period_seconds),
+        batch_size=settings.batch_size,
+    )
+    return asyncio.create_task(collection)
+
+
 @contextlib.asynccontextmanager
 async def app_lifespan(app: FastAPI):
-    market.database.orm.Base.metadata.create_all(
-        bind=market.config.get_database_engine(),
-    )
+    # Reading auth settings and creating the hashing context in advance,
+    # so the first requests don't pay for it
+    market.config.get_auth_settings()
+    market.services.auth.impl.get_password_context()
+
+    engine = market.config.get_database_engine()
+    market.database.orm.Base.metadata.create_all(bind=engine)
+    market.modules.product.search.install(engine)
+    media_gc_task = start_media_gc()
     yield
 
+    if media_gc_task is not None:
+        media_gc_task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await media_gc_task
+
+    market.apps.fastapi_app.deps.get_auth_executor().shutdown()
+    market.apps.fastapi_app.deps.get_media_executor().shutdown()
+
+    if market.apps.fastapi_app.deps.get_s3_storage.cache_info().currsize:
+        await market.apps.fastapi_app.deps.get_s3_storage().close()
+
+    engine.dispose()
+    await market.config.get_async_database_engine().dispose()
+
 app = FastAPI(
     lifespan=app_lifespan,
     default_response_class=responses.ORJSONResponse,
@@ -41,6 +87,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=[
+        'X-Next-Cursor',
+        'Content-Range',
+        'ETag',
+        'Location',
+        'Content-Location',
+        'Preference-Applied',
+    ],
 )
 
 
@@ -70,10 +124,46 @@ def not_found_error_handler(request, exception):
     )
 
 
+@app.exception_handler(market.common.errors.ExecutorOverloadedError)
+def executor_overloaded_error_handler(request, exception):
+    return responses.JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': str(exception)},
+        headers={'Retry-After': '1'},
+    )
+
+
+@app.exception_handler(market.common.errors.OutOfStockError)
+def out_of_stock_error_handler(request, exception):
+    return responses.JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={'detail': str(exception)},
+    )
+
+
+@app.exception_handler(market.common.errors.CartChangedError)
+def cart_changed_error_handler(request, exception):
+    return responses.JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={'detail': str(exception)},
+    )
+
+
+@app.exception_handler(market.common.errors.FileTooLargeError)
+def file_too_large_error_handler(request, exception):
+    return responses.JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={'detail': str(exception)},
+    )
+
+
 # Routes
 app.include_router(market.apps.fastapi_app.routers.auth.router)
 app.include_router(market.apps.fastapi_app.routers.cart.router)
+app.include_router(market.apps.fastapi_app.routers.health.router)
 app.include_router(market.apps.fastapi_app.routers.image.router)
+app.include_router(market.apps.fastapi_app.routers.media.router)
+app.include_router(market.apps.fastapi_app.routers.order.router)
 app.include_router(market.apps.fastapi_app.routers.product.router)
 app.include_router(market.apps.fastapi_app.routers.product_image.router)
 app.include_router(market.apps.fastapi_app.routers.user.router)
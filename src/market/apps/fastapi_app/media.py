@@ -0,0 +1,284 @@
+"""Serving of files of the media folder
+
+Files are sent with strong ETags, support single byte ranges and are
+passed to the server with the `http.response.zerocopysend` ASGI extension
+(sendfile) when the server supports it. Uvicorn doesn't, so under it
+files are read and sent in chunks. Content-addressed files never change,
+so they're cached by clients for good.
+"""
+import email.utils
+import mimetypes
+import os
+import re
+import stat
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+
+ZEROCOPY_EXTENSION = 'http.response.zerocopysend'
+
+# Names of files made by `market.common.uploads.get_content_addressed_name`,
+# including variants of images (e.g. `<sha256>.thumbnail.jpg`)
+CONTENT_ADDRESSED_NAME_PATTERN = re.compile(r'([0-9a-f]{64})(\.[a-z0-9]+)*')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600, must-revalidate'
+
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class MediaFileResponse(Response):
+    """Sends `count` bytes of a file starting from `offset`"""
+    path: str
+    offset: int
+    count: int
+    chunk_size: int
+    send_body: bool
+
+
+    def __init__(
+        self,
+        path: str,
+        status_code: int,
+        headers: dict,
+        offset: int = 0,
+        count: int = 0,
+        chunk_size: int = 64 * 1024,
+        send_body: bool = True,
+    ) -> None:
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.chunk_size = chunk_size
+        self.send_body = send_body
+    
+
+    def init_headers(self, headers=None) -> None:
+        # Content length is set by the caller and must not be replaced with
+        # the length of the empty `body`
+        self.raw_headers = [
+            (key.lower().encode('latin-1'), value.encode('latin-1'))
+            for key, value in (headers or {}).items()
+        ]
+    
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        await send({
+            'type': 'http.response.start',
+            'status': self.status_code,
+            'headers': self.raw_headers,
+        })
+
+        if not self.send_body or self.count == 0:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async with await anyio.open_file(self.path, mode='rb') as file:
+            if ZEROCOPY_EXTENSION in scope.get('extensions', {}):
+                await send({
+                    'type': ZEROCOPY_EXTENSION,
+                    'file': file.wrapped.fileno(),
+                    'offset': self.offset,
+                    'count': self.count,
+                })
+                return
+
+            await file.seek(self.offset)
+            remaining = self.count
+
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+
+                if not chunk:
+                    break
+
+                remaining -= len(chunk)
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': remaining > 0,
+                })
+
+            if remaining > 0:
+                # The file was truncated while it was being sent
+                await send({'type': 'http.response.body', 'body': b''})
+
+
+def is_content_addressed(path: str) -> bool:
+    name = os.path.basename(path)
+    return CONTENT_ADDRESSED_NAME_PATTERN.fullmatch(name) is not None
+
+
+def make_etag(path: str, stat_result: os.stat_result) -> str:
+    """Returns a strong ETag. Content-addressed files are tagged with their
+    content hash, others with their modification time and size
+    """
+    match = CONTENT_ADDRESSED_NAME_PATTERN.fullmatch(os.path.basename(path))
+
+    if match is not None:
+        return f'"{match.group(1)}"'
+
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_etags(header: str) -> List[str]:
+    """Returns ETags of an `If-None-Match` header without weakness
+    indicators (the header uses the weak comparison)
+    """
+    etags = []
+
+    for etag in header.split(','):
+        etag = etag.strip()
+
+        if etag.startswith('W/'):
+            etag = etag[2:]
+
+        if etag:
+            etags.append(etag)
+
+    return etags
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single byte range
+
+    Returns:
+        Start and end (inclusive) of the range, or None if the header can't
+        be parsed or has several ranges, in which case it's ignored
+
+    Raises:
+        ValueError: Range is not satisfiable
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+
+    if match is None:
+        return None
+
+    start, end = match.groups()
+
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last `end` bytes
+        suffix_length = int(end)
+
+        if suffix_length == 0:
+            raise ValueError('Range is not satisfiable')
+
+        return max(size - suffix_length, 0), size - 1
+
+    first = int(start)
+    last = size - 1 if not end else min(int(end), size - 1)
+
+    if first >= size or first > last:
+        raise ValueError('Range is not satisfiable')
+
+    return first, last
+
+
+def make_media_response(
+    request: Request,
+    path: str,
+    chunk_size: int,
+) -> Response:
+    """Makes a response serving the file, honoring `If-None-Match`,
+    `Range` and `If-Range` request headers
+
+    Raises:
+        FileNotFoundError: Path isn't a regular file
+    """
+    stat_result = os.stat(path)
+
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+
+    size = stat_result.st_size
+    etag = make_etag(path, stat_result)
+    content_type, _ = mimetypes.guess_type(path)
+    headers = {
+        'accept-ranges': 'bytes',
+        'etag': etag,
+        'last-modified': email.utils.formatdate(
+            stat_result.st_mtime,
+            usegmt=True,
+        ),
+        'cache-control': (
+            IMMUTABLE_CACHE_CONTROL
+            if is_content_addressed(path) else
+            DEFAULT_CACHE_CONTROL
+        ),
+    }
+    send_body = request.method != 'HEAD'
+    if_none_match = request.headers.get('if-none-match')
+
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+
+        if '*' in etags or etag in etags:
+            return MediaFileResponse(
+                path,
+                status_code=304,
+                headers=headers,
+                send_body=False,
+            )
+
+    headers['content-type'] = content_type or 'application/octet-stream'
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+
+    # Ranges of a changed file are not served, the whole file is sent
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+
+    if range_header is not None:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers['content-range'] = f'bytes */{size}'
+            headers['content-length'] = '0'
+            return MediaFileResponse(
+                path,
+                status_code=416,
+                headers=headers,
+                send_body=False,
+            )
+
+        if byte_range is not None:
+            first, last = byte_range
+            count = last - first + 1
+            headers['content-range'] = f'bytes {first}-{last}/{size}'
+            headers['content-length'] = str(count)
+            return MediaFileResponse(
+                path,
+                status_code=206,
+                headers=headers,
+                offset=first,
+                count=count,
+                chunk_size=chunk_size,
+                send_body=send_body,
+            )
+
+    headers['content-length'] = str(size)
+    return MediaFileResponse(
+        path,
+        status_code=200,
+        headers=headers,
+        count=size,
+        chunk_size=chunk_size,
+        send_body=send_body,
+    )
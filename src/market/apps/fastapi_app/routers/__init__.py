@@ -1,6 +1,9 @@
 from . import auth
 from . import cart
+from . import health
 from . import image
+from . import media
+from . import order
 from . import product
 from . import product_image
 from . import user
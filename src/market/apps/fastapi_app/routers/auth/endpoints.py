@@ -8,7 +8,7 @@ from fastapi import HTTPException
 from fastapi import security
 from fastapi import status
 
-import market.services.auth
+import market.common.executors
 from market.apps.fastapi_app import deps
 from market.apps.fastapi_app.routers.auth import schemas
 from market.services import unit_of_work
@@ -21,11 +21,21 @@ router = APIRouter(
 @router.post('/token', response_model=schemas.Token)
 async def login(
     form_data: security.OAuth2PasswordRequestForm = Depends(),
+    auth_service_factory: deps.AuthServiceFactory = Depends(
+        deps.get_auth_service_factory,
+    ),
+    executor: market.common.executors.BoundedExecutor = Depends(
+        deps.get_auth_executor,
+    ),
     uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
 ):
     """Authorizes user and returns an access token."""
-    auth_service = market.services.auth.AuthServiceImpl(uow.users)
-    token = auth_service.login(form_data.username, form_data.password)
+    auth_service = auth_service_factory(uow.users)
+    token = await executor.run(
+        auth_service.login,
+        form_data.username,
+        form_data.password,
+    )
 
     if token is None:
         raise HTTPException(
@@ -57,19 +67,29 @@ def get_user_create_form_data(
 @router.post('/signup', response_model=schemas.Token)
 async def signup(
     user_schema: schemas.UserCreate = Depends(get_user_create_form_data),
+    auth_service_factory: deps.AuthServiceFactory = Depends(
+        deps.get_auth_service_factory,
+    ),
+    executor: market.common.executors.BoundedExecutor = Depends(
+        deps.get_auth_executor,
+    ),
     uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
 ):
     """Allows user to sign up and returns an access token."""
-    auth_service = market.services.auth.AuthServiceImpl(uow.users)
+    auth_service = auth_service_factory(uow.users)
 
-    auth_service.register_user(
-        user_id=uuid.uuid4(),
-        username=user_schema.username,
-        password=user_schema.password,
-        full_name=user_schema.full_name,
-    )
-    uow.commit()
+    def register_user():
+        user = auth_service.register_user(
+            user_id=uuid.uuid4(),
+            username=user_schema.username,
+            password=user_schema.password,
+            full_name=user_schema.full_name,
+        )
+        uow.commit()
+        return auth_service.create_token(user)
 
-    token = auth_service.login(user_schema.username, user_schema.password)
+    # Hashing the password and the database work around it are blocking,
+    # so they are made outside of the event loop
+    token = await executor.run(register_user)
 
     return schemas.Token.from_orm(token)
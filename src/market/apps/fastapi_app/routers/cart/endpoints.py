@@ -1,14 +1,20 @@
+import collections
 import uuid
 from typing import List
+from typing import Literal
 
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
-from fastapi import responses
+from fastapi import Response
 from fastapi import status
 
+import market.config
 import market.modules.user.domain.models
 from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app import streaming
+from market.apps.fastapi_app import writes
 from market.apps.fastapi_app.routers.cart import schemas
 from market.modules.cart.domain import models
 from market.services import unit_of_work
@@ -20,59 +26,161 @@ router = APIRouter(
 
 
 @router.get('/', response_model=List[schemas.CartItemRead])
-def get_cart_items(
+async def get_cart_items(
+    stream: bool = Depends(deps.get_streaming_requested),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
-    """Returns a list of authorized user's cart items"""
-    instances = uow.cart.list(user_id=user.id)
-    return [schemas.CartItemRead.from_orm(instance) for instance in instances]
+    """Returns a list of authorized user's cart items, which is streamed
+    if requested as NDJSON
+    """
+    if stream:
+        instances = await uow.cart.stream(
+            market.config.get_stream_batch_size(),
+            user_id=user.id,
+        )
+        return streaming.make_ndjson_response(
+            schemas.serialize_cart_item(instance)
+            async for instance in instances
+        )
+
+    instances = await uow.cart.list(user_id=user.id)
+    return serializers.make_list_response(
+        schemas.serialize_cart_item,
+        instances,
+    )
 
 
 @router.post('/', response_model=schemas.CartItemRead)
-def add_cart_item(
+async def add_cart_item(
+    response: Response,
     cart_item_schema: schemas.CartItemCreate,
+    on_conflict: Literal['error', 'replace', 'increment'] = 'error',
+    return_representation: bool = Depends(deps.get_return_representation),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
-    """Adds an item to authorized user's cart"""
-    cart_item_id = uuid.uuid4()
+    """Adds an item to authorized user's cart. If the cart already has the
+    product, `on_conflict` tells whether to fail (`error`), to set the
+    amount (`replace`) or to add it to the existing one (`increment`)
+    """
     cart_item = models.CartItem(
-        id=cart_item_id,
+        id=uuid.uuid4(),
         amount=cart_item_schema.amount,
         user_id=user.id,
         product_id=cart_item_schema.product_id,
     )
+    cart_item_id = await uow.cart.merge(cart_item, on_conflict=on_conflict)
 
-    colliding_items = uow.cart.list(
-        user_id=cart_item.user_id,
-        product_id=cart_item.product_id,
-    )
-
-    if colliding_items:
+    if cart_item_id is None:
         product_id = cart_item_schema.product_id
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f'You already have a product with id={product_id} in cart',
         )
 
-    added_cart_item = uow.cart.add(cart_item)
-    uow.commit()
+    await uow.commit()
+    location = f'/cart/{cart_item_id}'
+
+    if not return_representation:
+        return writes.redirect(location)
+
+    created = cart_item_id == cart_item.id
+    writes.set_representation_headers(response, location, created=created)
+
+    # Only an incremented amount isn't known without reading the item
+    if not created and on_conflict == 'increment':
+        cart_item = await uow.cart.get(cart_item_id)
+        return schemas.CartItemRead.from_orm(cart_item)
+
+    return schemas.CartItemRead(
+        id=cart_item_id,
+        product_id=cart_item.product_id,
+        amount=cart_item.amount,
+    )
+
 
-    return responses.RedirectResponse(
-        url=f'/cart/{cart_item_id}',
-        status_code=status.HTTP_303_SEE_OTHER,
+@router.post('/batch', response_model=List[schemas.CartItemRead])
+async def apply_cart_batch(
+    batch: schemas.CartBatch,
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Applies the operations to authorized user's cart in a single
+    transaction, so either all of them are applied or none. Operations of
+    a kind are applied with a single statement. Returns the updated cart
+    """
+    additions = collections.defaultdict(list)
+    amounts = {}
+    removals = []
+
+    for operation in batch.operations:
+        if operation.op == 'add':
+            additions[operation.on_conflict].append(models.CartItem(
+                id=uuid.uuid4(),
+                amount=operation.amount,
+                user_id=user.id,
+                product_id=operation.product_id,
+            ))
+        elif operation.op == 'update':
+            amounts[operation.product_id] = operation.amount
+        else:
+            removals.append(operation.product_id)
+
+    await uow.cart.delete_products(user.id, removals)
+    updated_product_ids = await uow.cart.update_amounts(user.id, amounts)
+
+    for product_id in amounts:
+        if product_id not in updated_product_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f'You have no product with id={product_id} in cart',
+            )
+
+    for on_conflict, cart_items in additions.items():
+        cart_item_ids = await uow.cart.merge_many(cart_items, on_conflict)
+
+        for cart_item, cart_item_id in zip(cart_items, cart_item_ids):
+            if cart_item_id is None:
+                product_id = cart_item.product_id
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=(
+                        f'You already have a product with id={product_id} '
+                        'in cart'
+                    ),
+                )
+
+    await uow.commit()
+
+    instances = await uow.cart.list(user_id=user.id)
+    return serializers.make_list_response(
+        schemas.serialize_cart_item,
+        instances,
     )
 
 
+# Declared before `/{cart_item_id}`, which would match the path otherwise
+@router.get('/summary', response_model=schemas.CartSummaryRead)
+async def get_cart_summary(
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Returns items of authorized user's cart along with titles, prices
+    and availability of their products, line totals and the cart total
+    """
+    summary = await uow.cart.get_summary(user.id)
+    return schemas.CartSummaryRead.from_orm(summary)
+
+
 @router.get('/{cart_item_id}', response_model=schemas.CartItemRead)
-def get_cart_item(
+async def get_cart_item(
     cart_item_id: uuid.UUID,
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Returns information about specified item in authorized user's cart"""
-    cart_item = uow.cart.get(cart_item_id)
+    cart_item = await uow.cart.get(cart_item_id)
 
     if user.id != cart_item.user_id:
         raise HTTPException(
@@ -84,14 +192,16 @@ def get_cart_item(
 
 
 @router.put('/{cart_item_id}', response_model=schemas.CartItemRead)
-def put_cart_item(
+async def put_cart_item(
+    response: Response,
     cart_item_id: uuid.UUID,
     cart_item_schema: schemas.CartItemUpdate,
+    return_representation: bool = Depends(deps.get_return_representation),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Allows to edit (PUT) an item in authorized user's cart"""
-    instance = uow.cart.get(cart_item_id)
+    instance = await uow.cart.get(cart_item_id)
 
     if instance.user_id != user.id:
         raise HTTPException(
@@ -99,27 +209,29 @@ def put_cart_item(
             detail='You are not an owner of this cart item',
         )
 
-    updated_instance = uow.cart.update(
+    updated_instance = await uow.cart.update(
         instance,
         amount = cart_item_schema.amount,
         product_id = cart_item_schema.product_id,
     )
-    uow.commit()
-    
-    return responses.RedirectResponse(
-        url=f'/cart/{cart_item_id}',
-        status_code=status.HTTP_303_SEE_OTHER,
-    )
+    await uow.commit()
+    location = f'/cart/{cart_item_id}'
+
+    if not return_representation:
+        return writes.redirect(location)
+
+    writes.set_representation_headers(response, location)
+    return schemas.CartItemRead.from_orm(updated_instance)
 
 
 @router.delete('/{cart_item_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_cart_item(
+async def delete_cart_item(
     cart_item_id: uuid.UUID,
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Deletes specified item from authorized user's cart"""
-    cart_item = uow.cart.get(cart_item_id)
+    cart_item = await uow.cart.get(cart_item_id)
     
     if cart_item.user_id != user.id:
         raise HTTPException(
@@ -127,5 +239,5 @@ def delete_cart_item(
             detail='You are not the owner of this cart item',
         )
     
-    uow.cart.delete(cart_item)
-    uow.commit()
+    await uow.cart.delete(cart_item)
+    await uow.commit()
@@ -1,7 +1,12 @@
 import uuid
+from typing import List
+from typing import Literal
+from typing import Optional
 
 import pydantic
 
+from market.apps.fastapi_app import serializers
+
 
 class CartItemBase(pydantic.BaseModel):
     product_id: uuid.UUID
@@ -19,5 +24,65 @@ class CartItemRead(CartItemBase):
         orm_mode = True
 
 
+serialize_cart_item = serializers.make_serializer(CartItemRead)
+
+
 class CartItemUpdate(CartItemCreate):
     pass
+
+
+class CartLineRead(pydantic.BaseModel):
+    cart_item_id: uuid.UUID
+    product_id: uuid.UUID
+    title: str
+    price_rub: float
+    amount: int
+    stock: int
+    is_available: bool
+    total_rub: float
+
+    class Config:
+        orm_mode = True
+
+
+class CartSummaryRead(pydantic.BaseModel):
+    lines: List[CartLineRead]
+    total_rub: float
+
+    class Config:
+        orm_mode = True
+
+
+class CartOperation(pydantic.BaseModel):
+    """Change of the cart item of a product:
+    - `add` adds an item, resolving conflicts like `POST /cart` does
+    - `update` sets the amount of an existing item
+    - `remove` removes the item if it's in the cart
+    """
+    op: Literal['add', 'update', 'remove']
+    product_id: uuid.UUID
+    amount: Optional[int] = pydantic.Field(default=None, gt=0)
+    on_conflict: Literal['error', 'replace', 'increment'] = 'error'
+
+    @pydantic.root_validator(skip_on_failure=True)
+    def check_amount(cls, values):
+        if values['op'] != 'remove' and values['amount'] is None:
+            raise ValueError(f'Amount is required to {values["op"]} an item')
+
+        return values
+
+
+class CartBatch(pydantic.BaseModel):
+    operations: List[CartOperation] = pydantic.Field(
+        min_items=1,
+        max_items=100,
+    )
+
+    @pydantic.validator('operations')
+    def check_products(cls, operations):
+        product_ids = [operation.product_id for operation in operations]
+
+        if len(set(product_ids)) != len(product_ids):
+            raise ValueError('Each product may be changed once per batch')
+
+        return operations
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+import market.config
+import market.database.pool
+from market.apps.fastapi_app.routers.health import schemas
+
+router = APIRouter(
+    prefix='/health',
+    tags=['health'],
+)
+
+
+@router.get('/database', response_model=schemas.DatabasePoolsRead)
+def get_database_pools():
+    """Returns connection pools statistics of the database engines"""
+    engine = market.config.get_database_engine()
+    async_engine = market.config.get_async_database_engine()
+    statistics = market.database.pool.get_pool_statistics(engine.pool)
+    async_statistics = market.database.pool.get_pool_statistics(
+        async_engine.pool,
+    )
+    return schemas.DatabasePoolsRead(
+        engine=schemas.PoolStatisticsRead.from_orm(statistics),
+        async_engine=schemas.PoolStatisticsRead.from_orm(async_statistics),
+    )
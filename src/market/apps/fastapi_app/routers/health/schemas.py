@@ -0,0 +1,23 @@
+from typing import Optional
+
+import pydantic
+
+
+class PoolStatisticsRead(pydantic.BaseModel):
+    pool_class: str
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    timeouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+    class Config:
+        orm_mode = True
+
+
+class DatabasePoolsRead(pydantic.BaseModel):
+    engine: PoolStatisticsRead
+    async_engine: PoolStatisticsRead
@@ -2,10 +2,10 @@ import uuid
 
 from fastapi import APIRouter
 from fastapi import Depends
-from fastapi import responses
-from fastapi import status
+from fastapi import Response
 
 from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import writes
 from market.apps.fastapi_app.routers.image import schemas
 from market.modules.image.domain import models
 from market.services import unit_of_work
@@ -17,19 +17,26 @@ router = APIRouter(
 
 
 @router.get('/{image_id}', response_model=schemas.ImageRead)
-def get_image(
+async def get_image(
     image_id: uuid.UUID,
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Returns information of specified image"""
-    instance = uow.images.get(image_id)
+    instance = await uow.images.get(image_id)
     return schemas.ImageRead.from_orm(instance)
 
 
 @router.post('/', response_model=schemas.ImageRead)
-def add_image(image: models.Image = Depends(deps.save_image)):
+def add_image(
+    response: Response,
+    image: models.Image = Depends(deps.save_image),
+    return_representation: bool = Depends(deps.get_return_representation),
+):
     """Allows to upload an image"""
-    return responses.RedirectResponse(
-        url=f'/images/{image.id}',
-        status_code=status.HTTP_303_SEE_OTHER,
-    )
+    location = f'/images/{image.id}'
+
+    if not return_representation:
+        return writes.redirect(location)
+
+    writes.set_representation_headers(response, location, created=True)
+    return schemas.ImageRead.from_orm(image)
@@ -1,9 +1,13 @@
 import os
 import uuid
+from typing import Dict
+from typing import Optional
 from urllib.parse import urljoin
 
 import pydantic
 
+from market.apps.fastapi_app import serializers
+
 
 class ImageBase(pydantic.BaseModel):
     image: str
@@ -13,16 +17,39 @@ class ImageCreate(ImageBase):
     pass
 
 
+def get_media_url(path: str) -> str:
+    """Making URL to reach the media file"""
+    media_url_root = os.getenv('MEDIA_URL_ROOT')
+    if media_url_root is None:
+        raise RuntimeError('MEDIA_URL_ROOT is not specified')
+    return urljoin(media_url_root, path)
+
+
+def get_media_urls(paths: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Making URLs of media files by their names"""
+    if paths is None:
+        return {}
+    return {name: get_media_url(path) for name, path in paths.items()}
+
+
 class ImageRead(ImageBase):
     id: uuid.UUID
+    variants: Dict[str, str] = {}
 
     @pydantic.validator('image')
     def adjust_media_path(cls, v):
-        """Making URL to reach the image"""
-        media_url_root = os.getenv('MEDIA_URL_ROOT')
-        if media_url_root is None:
-            raise RuntimeError('MEDIA_URL_ROOT is not specified')
-        return urljoin(media_url_root, v)
+        return get_media_url(v)
+    
+    @pydantic.validator('variants', pre=True)
+    def adjust_variants_media_paths(cls, v: Optional[Dict[str, str]]):
+        return get_media_urls(v)
     
     class Config:
         orm_mode = True
+
+
+serialize_image = serializers.make_serializer(
+    ImageRead,
+    image=get_media_url,
+    variants=get_media_urls,
+)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import Response
+from fastapi import status
+
+import market.common.errors
+import market.config
+import market.services.storage
+from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import media
+
+router = APIRouter(
+    prefix='/media',
+    tags=['media'],
+)
+
+
+@router.api_route(
+    '/{media_name:path}',
+    methods=['GET', 'HEAD'],
+    response_class=Response,
+)
+def get_media(
+    media_name: str,
+    request: Request,
+    media_storage: market.services.storage.Storage = Depends(
+        deps.get_media_storage,
+    ),
+):
+    """Returns a file of the media folder. Supports byte ranges and
+    conditional requests
+    """
+    try:
+        path = media_storage.get_local_path(media_name)
+
+        # Remote storages serve their files themselves
+        if path is None:
+            raise FileNotFoundError(media_name)
+
+        return media.make_media_response(
+            request,
+            path,
+            chunk_size=market.config.get_media_chunk_size(),
+        )
+    except (
+        FileNotFoundError,
+        NotADirectoryError,
+        market.common.errors.ObjectNotFoundError,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Media file not found',
+        )
@@ -0,0 +1,92 @@
+import collections
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import HTTPException
+from fastapi import responses
+from fastapi import status
+
+import market.modules.user.domain.models
+import market.services.orders
+from market.apps.fastapi_app import deps
+from market.apps.fastapi_app.routers.order import schemas
+from market.modules.order.domain import models
+from market.services import unit_of_work
+
+router = APIRouter(
+    prefix='/orders',
+    tags=['orders'],
+)
+
+
+def serialize_order(
+    order: models.Order,
+    items: List[models.OrderItem],
+) -> Dict[str, Any]:
+    return {
+        'id': order.id,
+        'total_rub': order.total_rub,
+        'placed': order.placed,
+        'items': [schemas.serialize_order_item(item) for item in items],
+    }
+
+
+@router.get('/', response_model=List[schemas.OrderRead])
+async def get_orders(
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Returns authorized user's orders, most recent first"""
+    orders = await uow.orders.list(user_id=user.id)
+    order_items = await uow.order_items.list_by_orders(
+        order.id for order in orders
+    )
+    items = collections.defaultdict(list)
+
+    for item in order_items:
+        items[item.order_id].append(item)
+
+    return responses.ORJSONResponse([
+        serialize_order(order, items[order.id]) for order in orders
+    ])
+
+
+@router.post(
+    '/',
+    response_model=schemas.OrderRead,
+    status_code=status.HTTP_201_CREATED,
+)
+async def place_order(
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Turns authorized user's cart into an order, taking the products
+    from stock. Fails with 409 if some product is out of stock, in which
+    case neither the cart nor stock are changed
+    """
+    order, items = await market.services.orders.checkout(uow, user.id)
+    await uow.commit()
+    return serialize_order(order, items)
+
+
+@router.get('/{order_id}', response_model=schemas.OrderRead)
+async def get_order(
+    order_id: uuid.UUID,
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Returns specified order of authorized user"""
+    order = await uow.orders.get(order_id)
+
+    if order.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You are not an owner of this order',
+        )
+
+    items = await uow.order_items.list_by_orders([order.id])
+    return serialize_order(order, items)
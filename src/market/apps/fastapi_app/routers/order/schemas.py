@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+from typing import List
+
+import pydantic
+
+from market.apps.fastapi_app import serializers
+
+
+class OrderItemRead(pydantic.BaseModel):
+    id: uuid.UUID
+    product_id: uuid.UUID
+    amount: int
+    price_rub: float
+
+    class Config:
+        orm_mode = True
+
+
+serialize_order_item = serializers.make_serializer(OrderItemRead)
+
+
+class OrderRead(pydantic.BaseModel):
+    id: uuid.UUID
+    total_rub: float
+    placed: datetime
+    items: List[OrderItemRead]
@@ -1,15 +1,32 @@
 import logging
 import uuid
+from typing import Any
+from typing import Dict
 from typing import List
+from typing import Literal
+from typing import Optional
+from typing import Union
 
+import pydantic
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Response
+from fastapi import UploadFile
 from fastapi import responses
 from fastapi import status
 
+import market.common.ndjson
+import market.config
+import market.modules.product.repositories
 import market.modules.user.domain.models
+import market.services.catalog
 from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app import streaming
+from market.apps.fastapi_app import writes
+from market.apps.fastapi_app.routers.image import schemas as image_schemas
 from market.apps.fastapi_app.routers.product import schemas
 from market.modules.product.domain import models
 from market.services import unit_of_work
@@ -22,19 +39,113 @@ router = APIRouter(
     tags=['products'],
 )
 
+# Invalid records reported by an import, all of them are counted anyway
+MAX_IMPORT_ERRORS = 1000
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def validate_import_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns product fields of an imported record
+
+    Raises:
+        ValueError: Record is invalid
+    """
+    try:
+        return schemas.ProductImport.parse_obj(record).dict()
+    except pydantic.ValidationError as error:
+        raise ValueError('; '.join(
+            f'{".".join(map(str, details["loc"]))}: {details["msg"]}'
+            for details in error.errors()
+        )) from None
+
+
+def get_import_format(file: UploadFile) -> str:
+    """Guesses format of an imported file by its type and name"""
+    filename = (file.filename or '').lower()
+
+    if file.content_type == 'text/csv' or filename.endswith('.csv'):
+        return 'csv'
+    
+    return 'ndjson'
+
 
 @router.get('/', response_model=List[schemas.ProductRead])
-def get_products(uow: unit_of_work.UnitOfWork = Depends(deps.get_uow)):
-    """Returns a list of products"""
-    instances = uow.products.list()
-    return [schemas.ProductRead.from_orm(instance) for instance in instances]
+async def get_products(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, gt=0),
+    sort: Literal['added', 'last_updated', 'price'] = 'added',
+    order: Literal['asc', 'desc'] = 'asc',
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    is_active: Optional[bool] = None,
+    in_stock: Optional[bool] = None,
+    owner_id: Optional[uuid.UUID] = None,
+    title: Optional[str] = Query(default=None, min_length=1, max_length=255),
+    stream: bool = Depends(deps.get_streaming_requested),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Returns a page of products matching specified filters (`title` is
+    a title prefix). If there are more products, a cursor of the next page
+    is returned in the `X-Next-Cursor` header.
+
+    Products requested as NDJSON are streamed up to `limit`, which isn't
+    capped, or until the last one rather than returned page by page
+    """
+    options = dict(
+        after=cursor,
+        order_by=sort,
+        descending=order == 'desc',
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        title_prefix=title,
+    )
+
+    if is_active is not None:
+        options['is_active'] = is_active
+    
+    if owner_id is not None:
+        options['owner_id'] = owner_id
+    
+    if stream:
+        instances = await uow.products.stream(
+            market.config.get_stream_batch_size(),
+            limit=limit,
+            **options,
+        )
+        return streaming.make_ndjson_response(
+            schemas.serialize_product(instance) async for instance in instances
+        )
+
+    # Fetching one extra product to find out if there is a next page
+    page_size = deps.get_page_size(limit)
+    instances = await uow.products.list(limit=page_size + 1, **options)
+    headers = {}
+
+    if len(instances) > page_size:
+        instances = instances[:page_size]
+        next_cursor = market.modules.product.repositories.make_cursor(
+            instances[-1],
+            order_by=sort,
+            descending=order == 'desc',
+        )
+        headers['X-Next-Cursor'] = next_cursor
+
+    return serializers.make_list_response(
+        schemas.serialize_product,
+        instances,
+        headers=headers,
+    )
 
 
 @router.post('/', response_model=schemas.ProductRead)
-def add_product(
+async def add_product(
+    response: Response,
     product_schema: schemas.ProductCreate,
+    return_representation: bool = Depends(deps.get_return_representation),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Adds a product"""
     product_id = uuid.uuid4()
@@ -47,34 +158,142 @@ def add_product(
         price_rub=product_schema.price_rub,
         owner_id=user.id,
     )
-    added_instance = uow.products.add(instance)
-    uow.commit()
+    added_instance = await uow.products.add(instance)
+    await uow.commit()
+    location = f'/products/{product_id}'
+
+    if not return_representation:
+        return writes.redirect(location)
+
+    writes.set_representation_headers(response, location, created=True)
+    return schemas.ProductRead.from_orm(added_instance)
+
+
+@router.post('/import', response_model=schemas.ProductImportResult)
+def import_products(
+    file: UploadFile,
+    file_format: Optional[Literal['ndjson', 'csv']] = Query(
+        default=None,
+        alias='format',
+    ),
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+):
+    """Creates products of the records of an NDJSON or CSV file and
+    updates authorized user's products of the records with an `id`.
+    Records are written in batches of separate transactions, invalid ones
+    are skipped and reported. Unless `format` is specified, it's guessed
+    by the file's type and name
+    """
+    if file_format is None:
+        file_format = get_import_format(file)
+    
+    result = market.services.catalog.import_products(
+        uow,
+        owner_id=user.id,
+        records=market.services.catalog.read_records(file.file, file_format),
+        validate=validate_import_record,
+        batch_size=market.config.get_catalog_batch_size(),
+        max_errors=MAX_IMPORT_ERRORS,
+    )
+    return schemas.ProductImportResult.from_orm(result)
+
 
-    return responses.RedirectResponse(
-        url=f'/products/{product_id}',
-        status_code=status.HTTP_303_SEE_OTHER,
+@router.get('/export', response_class=responses.StreamingResponse)
+async def export_products(
+    file_format: Literal['ndjson', 'csv'] = Query(
+        default='ndjson',
+        alias='format',
+    ),
+    user: market.modules.user.domain.models.User = Depends(deps.get_user),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Streams authorized user's products as NDJSON or CSV, which can be
+    imported back
+    """
+    products = await uow.products.stream(
+        batch_size=market.config.get_catalog_batch_size(),
+        owner_id=user.id,
+    )
+    records = (
+        schemas.serialize_product(product) async for product in products
     )
 
+    if file_format == 'csv':
+        content = market.services.catalog.write_csv(
+            records,
+            fields=list(schemas.ProductRead.__fields__),
+            chunk_size=EXPORT_CHUNK_SIZE,
+        )
+    else:
+        content = market.common.ndjson.encode_async(
+            records,
+            chunk_size=EXPORT_CHUNK_SIZE,
+        )
+    
+    return responses.StreamingResponse(
+        content,
+        media_type=market.services.catalog.MEDIA_TYPES[file_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="products.{file_format}"'
+            ),
+        },
+    )
+
+
+@router.get('/search', response_model=List[schemas.ProductRead])
+async def search_products(
+    q: str = Query(min_length=1, max_length=255),
+    offset: int = Query(default=0, ge=0),
+    page_size: int = Depends(deps.get_page_size),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
+):
+    """Returns products containing all of the words of the query in their
+    title or description, the most relevant first
+    """
+    instances = await uow.products.search(q, limit=page_size, offset=offset)
+    return serializers.make_list_response(schemas.serialize_product, instances)
 
-@router.get('/{product_id}', response_model=schemas.ProductRead)
-def get_product(
+
+@router.get(
+    '/{product_id}',
+    response_model=Union[schemas.ProductWithImagesRead, schemas.ProductRead],
+)
+async def get_product(
     product_id: uuid.UUID,
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    expand: Optional[Literal['images']] = None,
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
-    """Returns information of specified product"""
-    instance = uow.products.get(product_id)
-    return schemas.ProductRead.from_orm(instance)
+    """Returns information of specified product. With `expand=images`
+    images of the product are included, which takes a single additional
+    query
+    """
+    instance = await uow.products.get(product_id)
+
+    if expand != 'images':
+        return schemas.ProductRead.from_orm(instance)
+
+    images = await uow.images.list_by_products([instance.id])
+    return responses.ORJSONResponse({
+        **schemas.serialize_product(instance),
+        'images': [
+            image_schemas.serialize_image(image) for _, image in images
+        ],
+    })
 
 
 @router.put('/{product_id}', response_model=schemas.ProductRead)
-def put_product(
+async def put_product(
+    response: Response,
     product_id: uuid.UUID,
     product_scheme: schemas.ProductPut,
+    return_representation: bool = Depends(deps.get_return_representation),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Allows to edit (PUT) specified product's info"""
-    instance = uow.products.get(product_id)
+    instance = await uow.products.get(product_id)
     
     if user.id != instance.owner_id:
         raise HTTPException(
@@ -82,7 +301,7 @@ def put_product(
             detail='You are not the product owner',
         )
 
-    updated_instance = uow.products.update(
+    updated_instance = await uow.products.update(
         instance,
         title = product_scheme.title,
         description = product_scheme.description,
@@ -90,22 +309,24 @@ def put_product(
         price_rub = product_scheme.price_rub,
         is_active = product_scheme.is_active,
     )
-    uow.commit()
+    await uow.commit()
+    location = f'/products/{product_id}'
 
-    return responses.RedirectResponse(
-        url=f'/products/{product_id}',
-        status_code=status.HTTP_303_SEE_OTHER,
-    )
+    if not return_representation:
+        return writes.redirect(location)
+
+    writes.set_representation_headers(response, location)
+    return schemas.ProductRead.from_orm(updated_instance)
 
 
 @router.delete('/{product_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: uuid.UUID,
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
     """Deletes specified product"""
-    instance = uow.products.get(product_id)
+    instance = await uow.products.get(product_id)
 
     if instance.owner_id != user.id:
         raise HTTPException(
@@ -113,5 +334,5 @@ def delete_product(
             detail='You are not the product owner',
         )
     
-    uow.products.delete(instance)
-    uow.commit()
+    await uow.products.delete(instance)
+    await uow.commit()
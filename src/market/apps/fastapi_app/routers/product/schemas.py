@@ -1,8 +1,13 @@
 import uuid
 from datetime import datetime
+from typing import List
+from typing import Optional
 
 import pydantic
 
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app.routers.image import schemas as image_schemas
+
 
 class ProductBase(pydantic.BaseModel):
     title: str = pydantic.Field(min_length=8, max_length=255)
@@ -26,5 +31,34 @@ class ProductRead(ProductBase):
         orm_mode = True
 
 
+serialize_product = serializers.make_serializer(ProductRead)
+
+
 class ProductPut(ProductCreate):
     pass
+
+
+class ProductWithImagesRead(ProductRead):
+    images: List[image_schemas.ImageRead]
+
+
+class ProductImport(ProductBase):
+    id: Optional[uuid.UUID] = None
+
+
+class ProductImportError(pydantic.BaseModel):
+    record: int
+    detail: str
+
+    class Config:
+        orm_mode = True
+
+
+class ProductImportResult(pydantic.BaseModel):
+    created: int
+    updated: int
+    failed: int
+    errors: List[ProductImportError]
+
+    class Config:
+        orm_mode = True
@@ -5,11 +5,15 @@ from typing import List
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
-from fastapi import responses
+from fastapi import Response
 from fastapi import status
 
+import market.config
 import market.modules.user.domain.models
 from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app import streaming
+from market.apps.fastapi_app import writes
 from market.apps.fastapi_app.routers.product_image import schemas
 from market.modules.product_image.domain import models
 from market.services import unit_of_work
@@ -24,18 +28,36 @@ router = APIRouter(
 
 
 @router.get('/', response_model=List[schemas.ProductImageRead])
-def get_product_images(
+async def get_product_images(
     product_id: uuid.UUID,
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    stream: bool = Depends(deps.get_streaming_requested),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
-    """Returns list of product images filtered by specified product"""
-    instances = uow.product_images.list(product_id=product_id)
-    return [schemas.ProductImageRead.from_orm(inst) for inst in instances]
+    """Returns list of product images filtered by specified product,
+    which is streamed if requested as NDJSON
+    """
+    if stream:
+        instances = await uow.product_images.stream(
+            market.config.get_stream_batch_size(),
+            product_id=product_id,
+        )
+        return streaming.make_ndjson_response(
+            schemas.serialize_product_image(instance)
+            async for instance in instances
+        )
+
+    instances = await uow.product_images.list(product_id=product_id)
+    return serializers.make_list_response(
+        schemas.serialize_product_image,
+        instances,
+    )
 
 
 @router.post('/', response_model=schemas.ProductImageRead)
 def add_product_image(
+    response: Response,
     product_image_schema: schemas.ProductImageCreate,
+    return_representation: bool = Depends(deps.get_return_representation),
     user: market.modules.user.domain.models.User = Depends(deps.get_user),
     uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
 ):
@@ -54,21 +76,23 @@ def add_product_image(
         product_id=product_instance.id,
         image_id=image_instance.id,
     )
-    uow.product_images.add(product_image_instance)
+    added_instance = uow.product_images.add(product_image_instance)
     uow.commit()
-    
-    return responses.RedirectResponse(
-        url=f'/productimages/{product_image_id}',
-        status_code=status.HTTP_303_SEE_OTHER,
-    )
+    location = f'/productimages/{product_image_id}'
+
+    if not return_representation:
+        return writes.redirect(location)
+
+    writes.set_representation_headers(response, location, created=True)
+    return schemas.ProductImageRead.from_orm(added_instance)
 
 
 @router.get('/{product_image_id}', response_model=schemas.ProductImageRead)
-def get_product_image(
+async def get_product_image(
     product_image_id: uuid.UUID,
-    uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
+    uow: unit_of_work.AsyncUnitOfWork = Depends(deps.get_async_uow),
 ):
-    instance = uow.product_images.get(product_image_id)
+    instance = await uow.product_images.get(product_image_id)
     return schemas.ProductImageRead.from_orm(instance)
 
 
@@ -2,6 +2,8 @@ import uuid
 
 import pydantic
 
+from market.apps.fastapi_app import serializers
+
 
 class ProductImageBase(pydantic.BaseModel):
     product_id: uuid.UUID
@@ -16,4 +18,7 @@ class ProductImageRead(ProductImageBase):
     id: uuid.UUID
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+serialize_product_image = serializers.make_serializer(ProductImageRead)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 from fastapi import Depends
-from fastapi import responses
-from fastapi import status
+from fastapi import Response
 
+import market.services.auth
 from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import writes
 from market.apps.fastapi_app.routers.user import schemas
 from market.modules.user.domain import models
 from market.services import unit_of_work
@@ -25,16 +26,24 @@ def get_user(
 
 @router.put('/', response_model=schemas.UserRead)
 def put_username(
+    response: Response,
     user_schema: schemas.UserDataUpdate,
+    return_representation: bool = Depends(deps.get_return_representation),
     user: models.User = Depends(deps.get_user),
+    user_cache: market.services.auth.UserCache = Depends(deps.get_user_cache),
     uow: unit_of_work.UnitOfWork = Depends(deps.get_uow),
 ):
     """Allows to edit (PUT) the authorized user's information"""
-    for key, value in user_schema.dict().items():
-        setattr(user, key, value)
-
-    updated_user = uow.users.update(user)
+    # Authorized user might be a cached copy, so the instance
+    # of the current session is updated
+    instance = uow.users.get(user.id)
+    updated_user = uow.users.update(instance, **user_schema.dict())
     
     uow.commit()
-    
-    return responses.RedirectResponse('/user', status.HTTP_303_SEE_OTHER)
+    user_cache.invalidate_user(user.id)
+
+    if not return_representation:
+        return writes.redirect('/user')
+
+    writes.set_representation_headers(response, '/user')
+    return schemas.UserRead.from_orm(updated_user)
@@ -0,0 +1,89 @@
+"""Serialization of listed rows without validation
+
+Listing rows with `Schema.from_orm(row)` validates every row, and FastAPI
+validates it once again against the `response_model` before encoding. The
+rows come from the database, so list endpoints turn them into dicts with
+serializers made of read schemas instead, and return them in a response
+which is encoded with orjson right away. The `response_model` is still
+declared for the documentation.
+
+Serializers read the schema's fields as attributes, so they accept domain
+models as well as rows of `select()` results. Values are taken as they are
+(orjson encodes UUIDs and datetimes), except for fields with converters.
+"""
+import operator
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Type
+
+import pydantic
+from fastapi import responses
+
+
+Serializer = Callable[[Any], Dict[str, Any]]
+
+
+def make_serializer(
+    schema: Type[pydantic.BaseModel],
+    **converters: Callable[[Any], Any],
+) -> Serializer:
+    """Makes a serializer of rows to dicts with the fields of the schema
+
+    Args:
+        converters: Functions converting values of fields, by field names.
+            Fields with validators must have one, since validators aren't
+            run
+
+    Raises:
+        ValueError: Field with validators has no converter, or a converter
+            is given for an unknown field
+    """
+    names = tuple(schema.__fields__)
+    unknown = set(converters) - set(names)
+
+    if unknown:
+        raise ValueError(
+            f'{schema.__name__} has no fields {", ".join(sorted(unknown))}',
+        )
+
+    unconverted = [
+        name for name in schema.__validators__ if name not in converters
+    ]
+
+    if unconverted:
+        raise ValueError(
+            f'Fields {", ".join(unconverted)} of {schema.__name__} '
+            f'have validators, but no converters',
+        )
+
+    get_values = operator.attrgetter(*names)
+    conversions = tuple(converters.items())
+
+    # attrgetter of a single attribute doesn't return a tuple
+    if len(names) == 1:
+        get_value = get_values
+        get_values = lambda row: (get_value(row),)
+
+    def serialize(row: Any) -> Dict[str, Any]:
+        record = dict(zip(names, get_values(row)))
+
+        for name, convert in conversions:
+            record[name] = convert(record[name])
+
+        return record
+
+    return serialize
+
+
+def make_list_response(
+    serialize: Serializer,
+    rows: Iterable[Any],
+    headers: Optional[Dict[str, str]] = None,
+) -> responses.ORJSONResponse:
+    return responses.ORJSONResponse(
+        [serialize(row) for row in rows],
+        headers=headers,
+    )
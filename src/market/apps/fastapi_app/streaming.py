@@ -0,0 +1,63 @@
+"""Streaming of listings as NDJSON
+
+Listings are streamed when they're requested with the
+`Accept: application/x-ndjson` header. Rows are fetched from the database
+in batches and sent in chunks as they're serialized, so memory usage
+doesn't depend on the size of a listing and the first rows are sent
+before the last ones are fetched.
+"""
+import collections.abc
+from typing import Any
+from typing import AsyncIterable
+from typing import Iterable
+from typing import Optional
+from typing import Union
+
+from fastapi import responses
+
+import market.common.ndjson
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def accepts_ndjson(header: Optional[str]) -> bool:
+    """Tells whether an `Accept` header lists NDJSON (without `q=0`)"""
+    if header is None:
+        return False
+
+    for media_range in header.split(','):
+        media_type, *parameters = media_range.split(';')
+
+        if media_type.strip().lower() != market.common.ndjson.MEDIA_TYPE:
+            continue
+
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+
+            if name.strip().lower() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+
+        return True
+
+    return False
+
+
+def make_ndjson_response(
+    records: Union[Iterable[Any], AsyncIterable[Any]],
+) -> responses.StreamingResponse:
+    """Makes a response streaming the records. Records of a synchronous
+    iterable are serialized in a thread pool, chunk by chunk
+    """
+    if isinstance(records, collections.abc.AsyncIterable):
+        content = market.common.ndjson.encode_async(records, CHUNK_SIZE)
+    else:
+        content = market.common.ndjson.encode(records, CHUNK_SIZE)
+
+    return responses.StreamingResponse(
+        content,
+        media_type=market.common.ndjson.MEDIA_TYPE,
+    )
@@ -0,0 +1,68 @@
+"""Responses of endpoints which create or update resources
+
+Writes redirect to the written resource (303 See Other) by default, so
+clients make another request to read it. With the `return=representation`
+preference (RFC 7240) of the `Prefer` request header, or with the
+`RETURN_REPRESENTATION` setting, the resource is returned right away.
+`return=minimal` asks for the redirect regardless of the setting.
+"""
+from typing import Dict
+from typing import Optional
+
+from fastapi import Response
+from fastapi import responses
+from fastapi import status
+
+
+def parse_prefer(header: str) -> Dict[str, str]:
+    """Returns preferences of a `Prefer` header by their lowercase names.
+    Parameters of preferences are ignored, preferences without a value
+    have an empty one
+    """
+    preferences = {}
+
+    for preference in header.split(','):
+        preference = preference.split(';', 1)[0]
+        name, _, value = preference.partition('=')
+        name = name.strip().lower()
+
+        # The first occurrence of a preference takes precedence
+        if name and name not in preferences:
+            preferences[name] = value.strip().strip('"')
+
+    return preferences
+
+
+def get_return_preference(header: Optional[str]) -> Optional[str]:
+    """Returns the `return` preference (`representation` or `minimal`), or
+    None if the header doesn't have a known one
+    """
+    if header is None:
+        return None
+
+    value = parse_prefer(header).get('return', '').lower()
+    return value if value in ('representation', 'minimal') else None
+
+
+def redirect(location: str) -> responses.RedirectResponse:
+    return responses.RedirectResponse(
+        url=location,
+        status_code=status.HTTP_303_SEE_OTHER,
+    )
+
+
+def set_representation_headers(
+    response: Response,
+    location: str,
+    created: bool = False,
+) -> None:
+    """Sets headers of a response returning the written resource. Created
+    resources are returned with `201 Created`
+    """
+    response.headers['Preference-Applied'] = 'return=representation'
+
+    if created:
+        response.status_code = status.HTTP_201_CREATED
+        response.headers['Location'] = location
+    else:
+        response.headers['Content-Location'] = location
@@ -0,0 +1,83 @@
+"""Collects images no product refers to
+
+Usage: python -m market.apps.media_gc [--grace-period-seconds N]
+    [--batch-size N] [--max-batches N]
+
+Defaults are taken from `MEDIA_GC_*` environment variables.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from typing import List
+from typing import Optional
+
+import market.config
+import market.database.mappers
+import market.database.orm
+import market.services.media
+import market.services.storage
+from market.services import unit_of_work
+
+
+def parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    settings = market.config.get_media_gc_settings()
+    parser = argparse.ArgumentParser(
+        prog='python -m market.apps.media_gc',
+        description='Deletes images no product refers to and their files',
+    )
+    parser.add_argument(
+        '--grace-period-seconds',
+        type=float,
+        default=settings.grace_period_seconds,
+        help='Keep images added within this period',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=settings.batch_size,
+        help='Images deleted per transaction',
+    )
+    parser.add_argument(
+        '--max-batches',
+        type=int,
+        default=None,
+        help='Stop after this many batches',
+    )
+    return parser.parse_args(argv)
+
+
+async def run(
+    args: argparse.Namespace,
+) -> market.services.media.CollectionResult:
+    media_storage = market.services.storage.create_storage(
+        market.config.get_media_storage_backend(),
+        os.getenv('MEDIA_PATH'),
+    )
+
+    try:
+        return await market.services.media.collect_orphaned_images(
+            media_storage,
+            uow_factory=lambda: unit_of_work.AsyncSQLAlchemyUnitOfWork(
+                market.database.orm.DEFAULT_ASYNC_SESSION_FACTORY,
+            ),
+            grace_period=timedelta(seconds=args.grace_period_seconds),
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+        )
+    finally:
+        await media_storage.close()
+        await market.config.get_async_database_engine().dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+    market.database.mappers.start_mappers()
+    result = asyncio.run(run(args))
+    print(f'Deleted {result.images} images and {result.files} files')
+
+
+if __name__ == '__main__':
+    main()
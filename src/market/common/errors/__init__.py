@@ -2,3 +2,16 @@ from market.common.errors import repositories
 from market.common.errors.repositories import RepositoryError
 from market.common.errors.repositories import NotFoundError
 from market.common.errors.repositories import AlreadyExistsError
+from market.common.errors import executors
+from market.common.errors.executors import ExecutorError
+from market.common.errors.executors import ExecutorOverloadedError
+from market.common.errors import files
+from market.common.errors.files import FileError
+from market.common.errors.files import FileTooLargeError
+from market.common.errors import storage
+from market.common.errors.storage import StorageError
+from market.common.errors.storage import ObjectNotFoundError
+from market.common.errors import orders
+from market.common.errors.orders import OrderError
+from market.common.errors.orders import OutOfStockError
+from market.common.errors.orders import CartChangedError
@@ -0,0 +1,6 @@
+class ExecutorError(Exception):
+    pass
+
+
+class ExecutorOverloadedError(ExecutorError):
+    pass
@@ -0,0 +1,6 @@
+class FileError(Exception):
+    pass
+
+
+class FileTooLargeError(FileError):
+    pass
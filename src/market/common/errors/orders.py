@@ -0,0 +1,10 @@
+class OrderError(Exception):
+    pass
+
+
+class OutOfStockError(OrderError):
+    pass
+
+
+class CartChangedError(OrderError):
+    pass
@@ -0,0 +1,6 @@
+class StorageError(Exception):
+    pass
+
+
+class ObjectNotFoundError(StorageError):
+    pass
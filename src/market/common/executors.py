@@ -0,0 +1,71 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any
+from typing import Callable
+from typing import TypeVar
+
+import market.common.errors
+
+
+T = TypeVar('T')
+
+
+class BoundedExecutor:
+    """Runs blocking calls in a thread pool, so they don't block the event
+    loop. Amount of calls waiting for a free worker is limited: when the
+    queue is full, new calls are rejected instead of piling up
+    """
+    executor: concurrent.futures.ThreadPoolExecutor
+    max_pending: int
+    pending: int
+
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        thread_name_prefix: str = '',
+    ) -> None:
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+        self.max_pending = max_workers + max_queue_size
+        self.pending = 0
+        self.lock = threading.Lock()
+    
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Runs the function in the pool and waits for its result
+
+        Raises:
+            market.common.errors.ExecutorOverloadedError: Queue is full
+        """
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise market.common.errors.ExecutorOverloadedError(
+                    'Too many requests are being processed, try again later',
+                )
+            
+            self.pending += 1
+        
+        try:
+            future = self.executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        
+        # The call is released only once it's done, even if the waiting
+        # request is cancelled, so the limit holds for running calls too
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+    
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+    
+
+    def _release(self) -> None:
+        with self.lock:
+            self.pending -= 1
@@ -0,0 +1,49 @@
+"""Encoding of records as NDJSON, a JSON document per line
+
+Records are serialized one by one and joined into chunks of about
+`chunk_size` bytes, so they can be sent as they're produced without
+keeping all of them in memory.
+"""
+from typing import Any
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import Iterable
+from typing import Iterator
+
+import orjson
+
+
+MEDIA_TYPE = 'application/x-ndjson'
+
+
+def encode(records: Iterable[Any], chunk_size: int) -> Iterator[bytes]:
+    chunk = bytearray()
+
+    for record in records:
+        chunk += orjson.dumps(record)
+        chunk += b'\n'
+
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if chunk:
+        yield bytes(chunk)
+
+
+async def encode_async(
+    records: AsyncIterable[Any],
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+
+    async for record in records:
+        chunk += orjson.dumps(record)
+        chunk += b'\n'
+
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if chunk:
+        yield bytes(chunk)
@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any
+from typing import List
+from typing import Sequence
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Packs keyset values into an opaque URL-safe cursor
+
+    Values are serialized as strings, so it's up to the caller to convert
+    them back into the required types after decoding.
+    """
+    payload = json.dumps([str(value) for value in values])
+    cursor = base64.urlsafe_b64encode(payload.encode())
+    return cursor.decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[str]:
+    """Unpacks keyset values from a cursor made by `encode_cursor`
+
+    Raises:
+        ValueError: Cursor is malformed
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = base64.urlsafe_b64decode(cursor + padding)
+        values = json.loads(payload)
+    except ValueError:
+        raise ValueError('Invalid cursor') from None
+
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+
+    return [str(value) for value in values]
@@ -0,0 +1,257 @@
+import logging
+import uuid
+from typing import AsyncIterator
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Type
+from typing import TypeVar
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import market.common.errors
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def get_identity_map_instances(
+    session: Session,
+    model: type,
+    instance_ids: Iterable[uuid.UUID],
+) -> Dict[uuid.UUID, object]:
+    """Returns instances already loaded into the session by their ids"""
+    instances = {}
+
+    for instance_id in instance_ids:
+        key = session.identity_key(model, instance_id)
+        instance = session.identity_map.get(key)
+
+        if instance is not None:
+            instances[instance_id] = instance
+
+    return instances
+
+
+def order_instances(
+    instances: Dict[uuid.UUID, T],
+    instance_ids: List[uuid.UUID],
+    entity_name: str,
+) -> List[T]:
+    """Returns instances in order of the ids
+
+    Raises:
+        NotFoundError: Some of the instances are missing
+    """
+    for instance_id in instance_ids:
+        if instance_id not in instances:
+            raise market.common.errors.NotFoundError(
+                f'Unable to find {entity_name} with id={instance_id}',
+            )
+
+    return [instances[instance_id] for instance_id in instance_ids]
+
+
+class SQLAlchemyRepository(Generic[T]):
+    """Base SQLAlchemy repository
+
+    Subclasses specify the mapped `model` and its `entity_name` used in
+    error messages (e.g. 'a product'). Lookups by id go through the session
+    identity map, so instances loaded in the same unit of work aren't
+    fetched again.
+    """
+    model: Type[T]
+    entity_name: str
+    session: Session
+
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+    
+
+    def get(self, instance_id: uuid.UUID) -> T:
+        instance = self.session.get(self.model, instance_id)
+
+        if instance is None:
+            raise market.common.errors.NotFoundError(
+                f'Unable to find {self.entity_name} with id={instance_id}',
+            )
+
+        return instance
+    
+
+    def get_many(self, instance_ids: Iterable[uuid.UUID]) -> List[T]:
+        """Returns instances in order of the ids. Instances missing in the
+        identity map are fetched with a single query
+
+        Raises:
+            NotFoundError: Some of the instances don't exist
+        """
+        instance_ids = list(instance_ids)
+        instances = get_identity_map_instances(
+            self.session,
+            self.model,
+            instance_ids,
+        )
+        missing_ids = set(instance_ids).difference(instances)
+
+        if missing_ids:
+            id_column = getattr(self.model, 'id')
+            statement = sqlalchemy.select(self.model)
+            statement = statement.where(id_column.in_(missing_ids))
+
+            for instance in self.session.scalars(statement):
+                instances[instance.id] = instance
+
+        return order_instances(instances, instance_ids, self.entity_name)
+    
+
+    def add(self, instance: T) -> T:
+        self.session.add(instance)
+        return instance
+    
+
+    def list(self, **filters) -> List[T]:
+        statement = sqlalchemy.select(self.model)
+
+        if filters:
+            statement = statement.filter_by(**filters)
+
+        return list(self.session.scalars(statement))
+    
+
+    def iterate(self, batch_size: int, **filters) -> Iterator[T]:
+        """Returns an iterator of instances which fetches `batch_size` rows
+        at a time rather than loading all of them
+        """
+        statement = sqlalchemy.select(self.model)
+
+        if filters:
+            statement = statement.filter_by(**filters)
+
+        statement = statement.execution_options(yield_per=batch_size)
+        return iter(self.session.scalars(statement))
+    
+
+    def delete(self, instance: T) -> None:
+        self.session.delete(instance)
+    
+
+    def update(self, instance: T, **fields) -> T:
+        for attribute, value in fields.items():
+            setattr(instance, attribute, value)
+
+        return instance
+
+
+class AsyncSQLAlchemyRepository(Generic[T]):
+    """Base asyncio SQLAlchemy repository
+
+    Subclasses specify the mapped `model` and its `entity_name` used in
+    error messages (e.g. 'a product'). Subclasses with a
+    `sync_repository_class` may run its methods with `run_sync`.
+    """
+    model: Type[T]
+    entity_name: str
+    sync_repository_class: Type[SQLAlchemyRepository[T]]
+    session: AsyncSession
+
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+    
+
+    async def get(self, instance_id: uuid.UUID) -> T:
+        instance = await self.session.get(self.model, instance_id)
+
+        if instance is None:
+            raise market.common.errors.NotFoundError(
+                f'Unable to find {self.entity_name} with id={instance_id}',
+            )
+
+        return instance
+    
+
+    async def get_many(self, instance_ids: Iterable[uuid.UUID]) -> List[T]:
+        """Returns instances in order of the ids. Instances missing in the
+        identity map are fetched with a single query
+
+        Raises:
+            NotFoundError: Some of the instances don't exist
+        """
+        instance_ids = list(instance_ids)
+        instances = get_identity_map_instances(
+            self.session.sync_session,
+            self.model,
+            instance_ids,
+        )
+        missing_ids = set(instance_ids).difference(instances)
+
+        if missing_ids:
+            id_column = getattr(self.model, 'id')
+            statement = sqlalchemy.select(self.model)
+            statement = statement.where(id_column.in_(missing_ids))
+
+            for instance in await self.session.scalars(statement):
+                instances[instance.id] = instance
+
+        return order_instances(instances, instance_ids, self.entity_name)
+    
+
+    async def add(self, instance: T) -> T:
+        self.session.add(instance)
+        return instance
+    
+
+    async def list(self, **filters) -> List[T]:
+        statement = sqlalchemy.select(self.model)
+
+        if filters:
+            statement = statement.filter_by(**filters)
+
+        instances = await self.session.scalars(statement)
+        return list(instances)
+    
+
+    async def stream(self, batch_size: int, **filters) -> AsyncIterator[T]:
+        """Returns an iterator of instances which fetches `batch_size` rows
+        at a time rather than loading all of them
+        """
+        statement = sqlalchemy.select(self.model)
+
+        if filters:
+            statement = statement.filter_by(**filters)
+
+        statement = statement.execution_options(yield_per=batch_size)
+        return await self.session.stream_scalars(statement)
+    
+
+    async def delete(self, instance: T) -> None:
+        await self.session.delete(instance)
+    
+
+    async def update(self, instance: T, **fields) -> T:
+        for attribute, value in fields.items():
+            setattr(instance, attribute, value)
+
+        return instance
+    
+
+    async def run_sync(self, method: Callable[..., R], *args, **kwargs) -> R:
+        """Runs a method of `sync_repository_class` over the session.
+        SQLAlchemy runs it in a greenlet, so its queries are awaited on the
+        event loop rather than blocking it, and the statements are shared
+        with the synchronous repository rather than repeated
+        """
+        def run(session: Session) -> R:
+            return method(self.sync_repository_class(session), *args, **kwargs)
+
+        return await self.session.run_sync(run)
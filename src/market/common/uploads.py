@@ -0,0 +1,82 @@
+import dataclasses
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO
+from typing import Optional
+from typing import Tuple
+
+import market.common.errors
+
+
+# Prefix of temporary files, which are moved to the storage once fully
+# written
+TEMP_FILE_PREFIX = '.upload-'
+
+
+@dataclasses.dataclass(frozen=True)
+class UploadedFile:
+    """Stored upload
+
+    Attributes:
+        name: Name of the file in the media storage
+    """
+    name: str
+    size: int
+    sha256: str
+
+
+def get_content_addressed_name(sha256: str, extension: str = '') -> str:
+    """Returns a name of a file named after its content hash, sharded into
+    two levels of subdirectories (e.g. `ab/cd/abcd...ef.png`), so no
+    directory gets too big
+    """
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def write_temp_file(
+    source: BinaryIO,
+    directory: str,
+    chunk_size: int,
+    max_size: Optional[int] = None,
+) -> Tuple[str, int, str]:
+    """Copies the source into a temporary file in the directory
+
+    Returns:
+        Temporary file path, its size and SHA-256 hex digest
+
+    Raises:
+        FileTooLargeError: Source is bigger than `max_size` bytes
+    """
+    descriptor, temp_path = tempfile.mkstemp(
+        prefix=TEMP_FILE_PREFIX,
+        dir=directory,
+    )
+    content_hash = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            while True:
+                chunk = source.read(chunk_size)
+
+                if not chunk:
+                    break
+
+                size += len(chunk)
+
+                if max_size is not None and size > max_size:
+                    raise market.common.errors.FileTooLargeError(
+                        f'File exceeds the maximum size of {max_size} bytes',
+                    )
+
+                content_hash.update(chunk)
+                f.write(chunk)
+
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return temp_path, size, content_hash.hexdigest()
@@ -1,7 +1,53 @@
+import dataclasses
+import functools
 import os
 
 import sqlalchemy
+import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
+import sqlalchemy.pool
+
+import market.database.pool
+
+
+@dataclasses.dataclass(frozen=True)
+class DatabasePoolSettings:
+    pool_size: int
+    max_overflow: int
+    recycle_seconds: int
+    pre_ping: bool
+    timeout_seconds: float
+
+
+@dataclasses.dataclass(frozen=True)
+class S3Settings:
+    endpoint_url: str
+    bucket: str
+    access_key_id: str
+    secret_access_key: str
+    region: str
+    part_size: int
+
+
+@dataclasses.dataclass(frozen=True)
+class MediaGCSettings:
+    """
+    Attributes:
+        grace_period_seconds: How long unreferenced images are kept after
+            upload, so they can be attached to products
+        interval_seconds: Period of collections run by the app, 0 disables
+            them
+    """
+    grace_period_seconds: float
+    batch_size: int
+    interval_seconds: float
+
+
+@dataclasses.dataclass(frozen=True)
+class AuthSettings:
+    hash_algorithm: str
+    hash_secret_key: str
+    access_token_expire_minutes: int
 
 
 def get_hash_algorithm() -> str:
@@ -16,11 +62,217 @@ def get_access_token_expire_minutes() -> int:
     return int(os.environ['ACCESS_TOKEN_EXPIRE_MINUTES'])
 
 
+@functools.lru_cache(maxsize=None)
+def get_auth_settings() -> AuthSettings:
+    """Returns auth settings, which are read from the environment once
+    per process
+    """
+    return AuthSettings(
+        hash_algorithm=get_hash_algorithm(),
+        hash_secret_key=get_hash_secret_key(),
+        access_token_expire_minutes=get_access_token_expire_minutes(),
+    )
+
+
+def get_user_cache_size() -> int:
+    return int(os.getenv('USER_CACHE_SIZE', '10000'))
+
+
+def get_user_cache_ttl_seconds() -> float:
+    return float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+
+
+def get_auth_workers() -> int:
+    return int(os.getenv('AUTH_WORKERS', '4'))
+
+
+def get_auth_queue_size() -> int:
+    return int(os.getenv('AUTH_QUEUE_SIZE', '64'))
+
+
+def get_products_page_size() -> int:
+    return int(os.getenv('PRODUCTS_PAGE_SIZE', '50'))
+
+
+def get_products_max_page_size() -> int:
+    return int(os.getenv('PRODUCTS_MAX_PAGE_SIZE', '500'))
+
+
+def get_catalog_batch_size() -> int:
+    """Products written per transaction by imports and fetched per round
+    trip by exports
+    """
+    return int(os.getenv('CATALOG_BATCH_SIZE', '1000'))
+
+
+def get_stream_batch_size() -> int:
+    """Rows fetched per round trip by listings streamed as NDJSON"""
+    return int(os.getenv('STREAM_BATCH_SIZE', '1000'))
+
+
+def get_return_representation() -> bool:
+    """Whether writes respond with the written resource rather than with
+    a redirect to it, unless a request prefers otherwise
+    """
+    value = os.getenv('RETURN_REPRESENTATION', 'false')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def get_media_chunk_size() -> int:
+    return int(os.getenv('MEDIA_CHUNK_SIZE', str(64 * 1024)))
+
+
+def get_max_image_size() -> int:
+    return int(os.getenv('MAX_IMAGE_SIZE', str(10 * 1024 * 1024)))
+
+
+def get_media_storage_backend() -> str:
+    """Returns one of `local`, `mmap` or `s3`"""
+    return os.getenv('MEDIA_STORAGE', 'local')
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_settings() -> S3Settings:
+    return S3Settings(
+        endpoint_url=os.environ['MEDIA_S3_ENDPOINT_URL'],
+        bucket=os.environ['MEDIA_S3_BUCKET'],
+        access_key_id=os.environ['MEDIA_S3_ACCESS_KEY_ID'],
+        secret_access_key=os.environ['MEDIA_S3_SECRET_ACCESS_KEY'],
+        region=os.getenv('MEDIA_S3_REGION', 'us-east-1'),
+        part_size=int(os.getenv('MEDIA_S3_PART_SIZE', str(8 * 1024 * 1024))),
+    )
+
+
+def get_media_workers() -> int:
+    return int(os.getenv('MEDIA_WORKERS', '2'))
+
+
+def get_image_variants_enabled() -> bool:
+    value = os.getenv('IMAGE_VARIANTS_ENABLED', 'true')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def get_media_gc_grace_period_seconds() -> float:
+    return float(os.getenv('MEDIA_GC_GRACE_PERIOD_SECONDS', str(24 * 60 * 60)))
+
+
+def get_media_gc_batch_size() -> int:
+    return int(os.getenv('MEDIA_GC_BATCH_SIZE', '100'))
+
+
+def get_media_gc_interval_seconds() -> float:
+    return float(os.getenv('MEDIA_GC_INTERVAL_SECONDS', '0'))
+
+
+@functools.lru_cache(maxsize=None)
+def get_media_gc_settings() -> MediaGCSettings:
+    return MediaGCSettings(
+        grace_period_seconds=get_media_gc_grace_period_seconds(),
+        batch_size=get_media_gc_batch_size(),
+        interval_seconds=get_media_gc_interval_seconds(),
+    )
+
+
 def get_database_connection_url() -> str:
     return os.environ['DATABASE_CONNECTION_URL']
 
 
+# Asyncio drivers used in place of the default ones
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+def get_async_database_connection_url() -> str:
+    """Returns ASYNC_DATABASE_CONNECTION_URL if it's set, otherwise
+    DATABASE_CONNECTION_URL with the driver replaced by an asyncio one
+    """
+    connection_url = os.getenv('ASYNC_DATABASE_CONNECTION_URL')
+
+    if connection_url is not None:
+        return connection_url
+    
+    url = sqlalchemy.make_url(get_database_connection_url())
+    backend_name = url.get_backend_name()
+
+    if backend_name not in ASYNC_DRIVERS:
+        raise RuntimeError(
+            f'Unable to pick an asyncio driver for {backend_name}, '
+            'ASYNC_DATABASE_CONNECTION_URL has to be specified',
+        )
+
+    url = url.set(drivername=ASYNC_DRIVERS[backend_name])
+    return url.render_as_string(hide_password=False)
+
+
+def get_database_pool_size() -> int:
+    return int(os.getenv('DATABASE_POOL_SIZE', '5'))
+
+
+def get_database_max_overflow() -> int:
+    return int(os.getenv('DATABASE_MAX_OVERFLOW', '10'))
+
+
+def get_database_pool_recycle_seconds() -> int:
+    """Returns connections max age, -1 means they are never recycled"""
+    return int(os.getenv('DATABASE_POOL_RECYCLE_SECONDS', '1800'))
+
+
+def get_database_pool_pre_ping() -> bool:
+    value = os.getenv('DATABASE_POOL_PRE_PING', 'true')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def get_database_pool_timeout_seconds() -> float:
+    return float(os.getenv('DATABASE_POOL_TIMEOUT_SECONDS', '30'))
+
+
+@functools.lru_cache(maxsize=None)
+def get_database_pool_settings() -> DatabasePoolSettings:
+    return DatabasePoolSettings(
+        pool_size=get_database_pool_size(),
+        max_overflow=get_database_max_overflow(),
+        recycle_seconds=get_database_pool_recycle_seconds(),
+        pre_ping=get_database_pool_pre_ping(),
+        timeout_seconds=get_database_pool_timeout_seconds(),
+    )
+
+
+def get_database_pool_options(connection_url: str, is_async: bool) -> dict:
+    """Returns engine pool arguments for the connection url
+
+    Pool size, overflow and timeout are only applied when the dialect pools
+    connections in a queue. E.g. SQLite in-memory databases use
+    single-connection pools which don't accept them.
+    """
+    settings = get_database_pool_settings()
+    options = {
+        'pool_recycle': settings.recycle_seconds,
+        'pool_pre_ping': settings.pre_ping,
+    }
+
+    url = sqlalchemy.make_url(connection_url)
+    pool_class = url.get_dialect().get_pool_class(url)
+
+    if issubclass(pool_class, sqlalchemy.pool.QueuePool):
+        if is_async:
+            options['poolclass'] = market.database.pool.\
+                InstrumentedAsyncAdaptedQueuePool
+        else:
+            options['poolclass'] = market.database.pool.InstrumentedQueuePool
+
+        options['pool_size'] = settings.pool_size
+        options['max_overflow'] = settings.max_overflow
+        options['pool_timeout'] = settings.timeout_seconds
+
+    return options
+
+
+@functools.lru_cache(maxsize=None)
 def get_database_engine() -> sqlalchemy.Engine:
+    """Returns the engine shared by the whole process"""
     connection_url = get_database_connection_url()
     connect_args = {}
 
@@ -30,6 +282,17 @@ def get_database_engine() -> sqlalchemy.Engine:
     engine = sqlalchemy.create_engine(
         url=connection_url,
         connect_args=connect_args,
+        **get_database_pool_options(connection_url, is_async=False),
     )
 
     return engine
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_database_engine() -> sqlalchemy.ext.asyncio.AsyncEngine:
+    """Returns the asyncio engine shared by the whole process"""
+    connection_url = get_async_database_connection_url()
+    return sqlalchemy.ext.asyncio.create_async_engine(
+        url=connection_url,
+        **get_database_pool_options(connection_url, is_async=True),
+    )
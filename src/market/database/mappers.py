@@ -3,6 +3,7 @@ from sqlalchemy.orm import registry
 import market.database.models
 import market.modules.cart.domain.models
 import market.modules.image.domain.models
+import market.modules.order.domain.models
 import market.modules.product.domain.models
 import market.modules.product_image.domain.models
 import market.modules.user.domain.models
@@ -19,6 +20,14 @@ def start_mappers() -> None:
         market.modules.image.domain.models.Image,
         market.database.models.Image,
     )
+    mapper_registry.map_imperatively(
+        market.modules.order.domain.models.Order,
+        market.database.models.Order,
+    )
+    mapper_registry.map_imperatively(
+        market.modules.order.domain.models.OrderItem,
+        market.database.models.OrderItem,
+    )
     mapper_registry.map_imperatively(
         market.modules.product.domain.models.Product,
         market.database.models.Product,
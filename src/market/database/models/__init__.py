@@ -5,3 +5,5 @@ from .cart import CartItem
 from .media import Image
 from .product import Product
 from .product import ProductImage
+from .order import Order
+from .order import OrderItem
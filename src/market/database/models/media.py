@@ -1,13 +1,52 @@
 import uuid
+from datetime import datetime
+from typing import Dict
+from typing import Optional
 
+from sqlalchemy import DateTime
+from sqlalchemy import JSON
+from sqlalchemy import String
+from sqlalchemy import TypeDecorator
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 
 import market.database.orm
 
 
+class ImageVariants(TypeDecorator):
+    """JSON of image variants. Images without variants have NULL rather
+    than an empty object, so they're told apart with `IS NULL`
+    """
+    impl = JSON(none_as_null=True)
+    cache_ok = True
+
+
+    def process_bind_param(self, value, dialect):
+        return value or None
+    
+
+    def process_result_value(self, value, dialect):
+        return value or {}
+
+
 class Image(market.database.orm.Base):
     __tablename__ = 'images'
     
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
     image: Mapped[str]
+    # SHA-256 of the file. Images with the same content share the file
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        index=True,
+    )
+    # Variant names (e.g. 'thumbnail') mapped to their file names
+    variants: Mapped[Optional[Dict[str, str]]] = mapped_column(
+        ImageVariants,
+    )
+    # Images are collected once they have been unreferenced for a while
+    # after upload. Images uploaded before the column was added have none
+    added: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        default=market.database.orm.utcnow,
+        index=True,
+    )
@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+
+import market.database.orm
+
+
+class Order(market.database.orm.Base):
+    __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_user_id_placed', 'user_id', 'placed'),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.id'))
+    total_rub: Mapped[float]
+    placed: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=market.database.orm.utcnow,
+    )
+
+
+class OrderItem(market.database.orm.Base):
+    __tablename__ = 'orderitems'
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    order_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey('orders.id'),
+        index=True,
+    )
+    product_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('products.id'))
+    amount: Mapped[int]
+    # Price of the product at the moment of checkout
+    price_rub: Mapped[float]
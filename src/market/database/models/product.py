@@ -2,9 +2,9 @@ import uuid
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import func
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
@@ -28,6 +28,27 @@ class ProductImage(market.database.orm.Base):
 
 class Product(market.database.orm.Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Keyset pagination orders, unfiltered and for the storefront
+        # (active products only) and seller (products of an owner) lists
+        Index('ix_products_added_id', 'added', 'id'),
+        Index('ix_products_is_active_added_id', 'is_active', 'added', 'id'),
+        Index(
+            'ix_products_is_active_price_rub_id',
+            'is_active',
+            'price_rub',
+            'id',
+        ),
+        Index(
+            'ix_products_is_active_last_updated_id',
+            'is_active',
+            'last_updated',
+            'id',
+        ),
+        Index('ix_products_owner_id_added_id', 'owner_id', 'added', 'id'),
+        # Title prefix lookups
+        Index('ix_products_title', 'title'),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(255))
@@ -37,12 +58,12 @@ class Product(market.database.orm.Base):
     is_active: Mapped[bool] = mapped_column(default=True)
     added: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        default=func.now()
+        default=market.database.orm.utcnow
     )
     last_updated: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        default=func.now(),
-        onupdate=func.now()
+        default=market.database.orm.utcnow,
+        onupdate=market.database.orm.utcnow
     )
     owner_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('users.id'))
     owner: Mapped['User'] = relationship()
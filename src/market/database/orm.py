@@ -1,12 +1,33 @@
+from datetime import datetime
+from datetime import timezone
+
 import sqlalchemy
+import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
 
 import market.config
 
 
+# Objects aren't expired on commit, so responses of writes are made of the
+# written objects without loading them again
 DEFAULT_SESSION_FACTORY = sqlalchemy.orm.sessionmaker(
     bind=market.config.get_database_engine(),
+    expire_on_commit=False,
+)
+
+# Objects aren't expired on commit, as accessing expired attributes would
+# require implicit IO which isn't possible with asyncio
+DEFAULT_ASYNC_SESSION_FACTORY = sqlalchemy.ext.asyncio.async_sessionmaker(
+    bind=market.config.get_async_database_engine(),
+    expire_on_commit=False,
 )
 
 
 Base = sqlalchemy.orm.declarative_base()
+
+
+def utcnow() -> datetime:
+    # Timestamps are generated on the application side, so they have the
+    # same precision and format as the values used in keyset comparisons
+    # (SQLite's CURRENT_TIMESTAMP has no fractional part)
+    return datetime.now(timezone.utc)
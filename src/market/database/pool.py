@@ -0,0 +1,92 @@
+import dataclasses
+import threading
+import time
+from typing import Optional
+
+import sqlalchemy
+import sqlalchemy.exc
+import sqlalchemy.pool
+
+
+@dataclasses.dataclass(frozen=True)
+class PoolStatistics:
+    """Snapshot of a connection pool state
+
+    Connection counters are None for pools which don't keep them (e.g.
+    SQLite in-memory ones). Wait time includes establishing new connections
+    when the pool grows.
+    """
+    pool_class: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class InstrumentedQueuePool(sqlalchemy.pool.QueuePool):
+    """Queue pool which keeps track of time spent waiting for connections"""
+
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+
+        try:
+            connection = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+
+        wait_seconds = time.perf_counter() - started_at
+
+        with self._stats_lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+        return connection
+
+
+class InstrumentedAsyncAdaptedQueuePool(
+    InstrumentedQueuePool,
+    sqlalchemy.pool.AsyncAdaptedQueuePool,
+):
+    """Instrumented queue pool for asyncio engines"""
+
+
+def get_pool_statistics(pool: sqlalchemy.pool.Pool) -> PoolStatistics:
+    if not isinstance(pool, sqlalchemy.pool.QueuePool):
+        return PoolStatistics(pool_class=type(pool).__name__)
+
+    statistics = PoolStatistics(
+        pool_class=type(pool).__name__,
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+    )
+
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            statistics = dataclasses.replace(
+                statistics,
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                total_wait_seconds=pool.total_wait_seconds,
+                max_wait_seconds=pool.max_wait_seconds,
+            )
+
+    return statistics
@@ -1,5 +1,6 @@
 import dataclasses
 import uuid
+from typing import List
 
 
 @dataclasses.dataclass
@@ -8,3 +9,27 @@ class CartItem:
     amount: int
     product_id: uuid.UUID
     user_id: uuid.UUID
+
+
+@dataclasses.dataclass
+class CartLine:
+    """Cart item with information about its product
+
+    Attributes:
+        is_available: Product is active and has enough stock for the item
+        total_rub: Price of the product times the amount
+    """
+    cart_item_id: uuid.UUID
+    product_id: uuid.UUID
+    title: str
+    price_rub: float
+    amount: int
+    stock: int
+    is_available: bool
+    total_rub: float
+
+
+@dataclasses.dataclass
+class CartSummary:
+    lines: List[CartLine]
+    total_rub: float = 0.0
@@ -1,59 +1,355 @@
 import logging
 import uuid
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Set
 
-from sqlalchemy.orm import Session
+import sqlalchemy
+import sqlalchemy.dialects.postgresql
+import sqlalchemy.dialects.sqlite
 
-import market.common.errors
+import market.common.repositories
+import market.modules.product.domain.models
 from market.modules.cart.domain import models
 
 
 logger = logging.getLogger(__name__)
 
+# Ways of resolving a conflict with an item of the same product
+MERGE_MODES = ('error', 'replace', 'increment')
 
-class CartRepository:
+# Inserts of dialects supporting `INSERT ... ON CONFLICT`
+UPSERT_INSERTS = {
+    'postgresql': sqlalchemy.dialects.postgresql.insert,
+    'sqlite': sqlalchemy.dialects.sqlite.insert,
+}
+
+# Columns of `user_product_unique_constraint`
+CONFLICT_COLUMNS = ['product_id', 'user_id']
+
+
+class CartRepository(
+    market.common.repositories.SQLAlchemyRepository[models.CartItem],
+):
     """SQLAlchemy repository of user cart data"""
-    session: Session
+    model = models.CartItem
+    entity_name = 'a cart item'
 
 
-    def __init__(self, session: Session) -> None:
-        self.session = session
+    def merge(
+        self,
+        cart_item: models.CartItem,
+        on_conflict: str = 'error',
+    ) -> Optional[uuid.UUID]:
+        """Adds the item to the cart with a single `INSERT ... ON CONFLICT`
+        statement, so concurrent additions of a product don't collide.
+        If the cart already has the product, depending on `on_conflict`:
+        - `error` keeps the existing item
+        - `replace` sets amount of the existing item
+        - `increment` adds the amount to the existing item
+
+        Dialects without upserts look the existing item up first.
+
+        Returns:
+            Id of the cart item with the product, or None if the cart
+            already has it and `on_conflict` is `error`
+        """
+        cart_item_id, = self.merge_many([cart_item], on_conflict)
+        return cart_item_id
     
 
-    def get(self, cart_item_id: uuid.UUID) -> models.CartItem:
-        queryset = self.session.query(models.CartItem)
-        queryset = queryset.filter_by(id=cart_item_id)
-        instance = queryset.first()
+    def merge_many(
+        self,
+        cart_items: List[models.CartItem],
+        on_conflict: str = 'error',
+    ) -> List[Optional[uuid.UUID]]:
+        """Adds the items like `merge` does, with a single statement.
+        Items must be of different products or users
+
+        Returns:
+            Ids of the cart items with the products in order of the items
+        """
+        if on_conflict not in MERGE_MODES:
+            raise ValueError(f'Unknown conflict resolution: {on_conflict}')
 
-        if instance is None:
-            raise market.common.errors.NotFoundError(
-                f'Unable to find a cart item with id={cart_item_id}',
+        if not cart_items:
+            return []
+
+        dialect = self.session.get_bind().dialect
+        insert = UPSERT_INSERTS.get(dialect.name)
+
+        if insert is None or not dialect.insert_returning:
+            return [
+                self._merge_with_lookup(cart_item, on_conflict)
+                for cart_item in cart_items
+            ]
+
+        statement = insert(models.CartItem).values([
+            {
+                'id': cart_item.id,
+                'amount': cart_item.amount,
+                'product_id': cart_item.product_id,
+                'user_id': cart_item.user_id,
+            }
+            for cart_item in cart_items
+        ])
+
+        if on_conflict == 'error':
+            statement = statement.on_conflict_do_nothing(
+                index_elements=CONFLICT_COLUMNS,
             )
+        else:
+            amount = statement.excluded.amount
+
+            if on_conflict == 'increment':
+                amount = models.CartItem.amount + amount
 
-        return instance
+            statement = statement.on_conflict_do_update(
+                index_elements=CONFLICT_COLUMNS,
+                set_={'amount': amount},
+            )
+
+        statement = statement.returning(
+            models.CartItem.id,
+            models.CartItem.user_id,
+            models.CartItem.product_id,
+        )
+        merged_ids = {
+            (row.user_id, row.product_id): row.id
+            for row in self.session.execute(statement)
+        }
+        return [
+            merged_ids.get((cart_item.user_id, cart_item.product_id))
+            for cart_item in cart_items
+        ]
     
 
-    def add(self, cart_item: models.CartItem) -> models.CartItem:
-        self.session.add(cart_item)
-        return cart_item
+    def update_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> Set[uuid.UUID]:
+        """Sets amounts of items of the user cart by their product ids with
+        a single statement
+
+        Returns:
+            Ids of products which items were updated
+        """
+        if not amounts:
+            return set()
+
+        statement = sqlalchemy.update(models.CartItem)
+        statement = statement.where(models.CartItem.user_id == user_id)
+        statement = statement.where(models.CartItem.product_id.in_(amounts))
+        statement = statement.values(amount=sqlalchemy.case(
+            amounts,
+            value=models.CartItem.product_id,
+        ))
+        statement = statement.execution_options(synchronize_session='fetch')
+
+        if not self.session.get_bind().dialect.update_returning:
+            lookup = sqlalchemy.select(models.CartItem.product_id)
+            lookup = lookup.where(models.CartItem.user_id == user_id)
+            lookup = lookup.where(models.CartItem.product_id.in_(amounts))
+            product_ids = set(self.session.scalars(lookup.with_for_update()))
+            self.session.execute(statement)
+            return product_ids
+
+        statement = statement.returning(models.CartItem.product_id)
+        return set(self.session.scalars(statement))
     
 
-    def list(self, **filters) -> List[models.CartItem]:
-        cart_item_set = self.session.query(models.CartItem)
+    def delete_products(
+        self,
+        user_id: uuid.UUID,
+        product_ids: Iterable[uuid.UUID],
+    ) -> None:
+        """Deletes items of the products from the user cart with a single
+        statement. Products missing in the cart are ignored
+        """
+        product_ids = list(product_ids)
+
+        if not product_ids:
+            return
 
-        if filters:
-            cart_item_set = cart_item_set.filter_by(**filters)
-        
-        return cart_item_set.all()
+        statement = sqlalchemy.delete(models.CartItem)
+        statement = statement.where(models.CartItem.user_id == user_id)
+        statement = statement.where(models.CartItem.product_id.in_(product_ids))
+        statement = statement.execution_options(synchronize_session='fetch')
+        self.session.execute(statement)
     
 
-    def delete(self, cart_item: models.CartItem) -> None:
-        self.session.delete(cart_item)
+    def delete_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> int:
+        """Deletes items of the user cart by their ids with a single
+        statement, unless their amounts differ from the given ones
+
+        Returns:
+            Number of deleted items
+        """
+        if not amounts:
+            return 0
+
+        statement = sqlalchemy.delete(models.CartItem)
+        statement = statement.where(models.CartItem.user_id == user_id)
+        statement = statement.where(
+            sqlalchemy.tuple_(models.CartItem.id, models.CartItem.amount).in_(
+                list(amounts.items()),
+            ),
+        )
+        statement = statement.execution_options(synchronize_session='fetch')
+        return self.session.execute(statement).rowcount
     
 
-    def update(self, cart_item: models.CartItem, **fields) -> models.CartItem:
-        for attribute, value in fields.items():
-            setattr(cart_item, attribute, value)
-        
-        return cart_item
+    def get_summary(self, user_id: uuid.UUID) -> models.CartSummary:
+        """Returns items of the user cart with their products and totals,
+        computed with a single query
+        """
+        product = market.modules.product.domain.models.Product
+        cart_item = models.CartItem
+        line_total = (product.price_rub * cart_item.amount).label('total_rub')
+        statement = sqlalchemy.select(
+            cart_item.id.label('cart_item_id'),
+            cart_item.product_id,
+            product.title,
+            product.price_rub,
+            cart_item.amount,
+            product.stock,
+            sqlalchemy.and_(
+                product.is_active,
+                product.stock >= cart_item.amount,
+            ).label('is_available'),
+            line_total,
+            sqlalchemy.func.sum(line_total).over().label('cart_total_rub'),
+        )
+        statement = statement.join(product, product.id == cart_item.product_id)
+        statement = statement.where(cart_item.user_id == user_id)
+        statement = statement.order_by(product.title, cart_item.id)
+        rows = self.session.execute(statement).all()
+
+        if not rows:
+            return models.CartSummary(lines=[])
+
+        return models.CartSummary(
+            lines=[
+                models.CartLine(
+                    cart_item_id=row.cart_item_id,
+                    product_id=row.product_id,
+                    title=row.title,
+                    price_rub=row.price_rub,
+                    amount=row.amount,
+                    stock=row.stock,
+                    is_available=bool(row.is_available),
+                    total_rub=row.total_rub,
+                )
+                for row in rows
+            ],
+            total_rub=rows[0].cart_total_rub,
+        )
+    
+
+    def _merge_with_lookup(
+        self,
+        cart_item: models.CartItem,
+        on_conflict: str,
+    ) -> Optional[uuid.UUID]:
+        statement = sqlalchemy.select(models.CartItem).filter_by(
+            user_id=cart_item.user_id,
+            product_id=cart_item.product_id,
+        )
+        existing = self.session.scalars(statement.with_for_update()).first()
+
+        if existing is None:
+            self.session.add(cart_item)
+            self.session.flush()
+            return cart_item.id
+
+        if on_conflict == 'error':
+            return None
+
+        if on_conflict == 'increment':
+            existing.amount += cart_item.amount
+        else:
+            existing.amount = cart_item.amount
+
+        return existing.id
+
+
+class AsyncCartRepository(
+    market.common.repositories.AsyncSQLAlchemyRepository[models.CartItem],
+):
+    """Asyncio SQLAlchemy repository of user cart data. Methods of
+    `CartRepository` are run with `run_sync`, see them for details
+    """
+    model = models.CartItem
+    entity_name = 'a cart item'
+    sync_repository_class = CartRepository
+
+
+    async def merge(
+        self,
+        cart_item: models.CartItem,
+        on_conflict: str = 'error',
+    ) -> Optional[uuid.UUID]:
+        return await self.run_sync(
+            CartRepository.merge,
+            cart_item,
+            on_conflict,
+        )
+    
+
+    async def merge_many(
+        self,
+        cart_items: List[models.CartItem],
+        on_conflict: str = 'error',
+    ) -> List[Optional[uuid.UUID]]:
+        return await self.run_sync(
+            CartRepository.merge_many,
+            cart_items,
+            on_conflict,
+        )
+    
+
+    async def update_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> Set[uuid.UUID]:
+        return await self.run_sync(
+            CartRepository.update_amounts,
+            user_id,
+            amounts,
+        )
+    
+
+    async def delete_products(
+        self,
+        user_id: uuid.UUID,
+        product_ids: Iterable[uuid.UUID],
+    ) -> None:
+        await self.run_sync(
+            CartRepository.delete_products,
+            user_id,
+            list(product_ids),
+        )
+    
+
+    async def delete_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> int:
+        return await self.run_sync(
+            CartRepository.delete_amounts,
+            user_id,
+            amounts,
+        )
+    
 
+    async def get_summary(self, user_id: uuid.UUID) -> models.CartSummary:
+        return await self.run_sync(CartRepository.get_summary, user_id)
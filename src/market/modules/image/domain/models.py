@@ -1,8 +1,14 @@
 import dataclasses
 import uuid
+from datetime import datetime
+from typing import Dict
+from typing import Optional
 
 
 @dataclasses.dataclass
 class Image:
     id: uuid.UUID
     image: str
+    content_hash: Optional[str] = None
+    variants: Dict[str, str] = dataclasses.field(default_factory=dict)
+    added: Optional[datetime] = None
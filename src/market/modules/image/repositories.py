@@ -1,58 +1,138 @@
 import logging
 import uuid
+from datetime import datetime
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Set
+from typing import Tuple
 
-from sqlalchemy.orm import Session
+import sqlalchemy
 
-import market.common.errors
+import market.common.repositories
+import market.modules.product_image.domain.models
 from market.modules.image.domain import models
 
 
 logger = logging.getLogger(__name__)
 
 
-class ImageRepository:
-    """SQLAlchemy repository of image data"""
-    session: Session
-
-
-    def __init__(self, session: Session) -> None:
-        self.session = session
-    
+def is_referenced() -> sqlalchemy.Exists:
+    """Returns a clause telling whether a product refers to the image"""
+    product_image = market.modules.product_image.domain.models.ProductImage
+    return sqlalchemy.exists().where(product_image.image_id == models.Image.id)
 
-    def get(self, image_id: uuid.UUID) -> models.Image:
-        queryset = self.session.query(models.Image)
-        queryset = queryset.filter_by(id=image_id)
-        instance = queryset.first()
 
-        if instance is None:
-            raise market.common.errors.NotFoundError(
-                f'Unable to find an image with id={image_id}',
-            )
-
-        return instance
+class ImageRepository(
+    market.common.repositories.SQLAlchemyRepository[models.Image],
+):
+    """SQLAlchemy repository of image data"""
+    model = models.Image
+    entity_name = 'an image'
+
+
+    def get_variants_by_content_hash(
+        self,
+        content_hash: str,
+    ) -> Dict[str, str]:
+        """Returns variants of some image with the content, or an empty
+        dict if none of such images has them. Loads a single row however
+        many images share the content
+        """
+        statement = sqlalchemy.select(models.Image.variants)
+        statement = statement.where(models.Image.content_hash == content_hash)
+        # Images without variants have NULL (see `ImageVariants`)
+        statement = statement.where(models.Image.variants.is_not(None))
+        statement = statement.limit(1)
+        return self.session.scalar(statement) or {}
+
+
+class AsyncImageRepository(
+    market.common.repositories.AsyncSQLAlchemyRepository[models.Image],
+):
+    """Asyncio SQLAlchemy repository of image data"""
+    model = models.Image
+    entity_name = 'an image'
+
+
+    async def list_by_products(
+        self,
+        product_ids: Iterable[uuid.UUID],
+    ) -> List[Tuple[uuid.UUID, models.Image]]:
+        """Returns images of the products along with ids of the products
+        they belong to, in order of upload, with a single query
+        """
+        product_image = market.modules.product_image.domain.models.ProductImage
+        statement = sqlalchemy.select(product_image.product_id, models.Image)
+        statement = statement.join(
+            product_image,
+            product_image.image_id == models.Image.id,
+        )
+        statement = statement.where(
+            product_image.product_id.in_(list(product_ids)),
+        )
+        statement = statement.order_by(models.Image.added, models.Image.id)
+        result = await self.session.execute(statement)
+        return [(product_id, image) for product_id, image in result]
     
 
-    def add(self, image: models.Image) -> models.Image:
-        self.session.add(image)
-        return image
+    async def list_orphans(
+        self,
+        added_before: datetime,
+        limit: int,
+    ) -> List[models.Image]:
+        """Returns images which no product refers to, added before the
+        time. Images without the time are treated as old ones
+        """
+        statement = sqlalchemy.select(models.Image)
+        statement = statement.where(~is_referenced())
+        statement = statement.where(sqlalchemy.or_(
+            models.Image.added.is_(None),
+            models.Image.added < added_before,
+        ))
+        statement = statement.limit(limit)
+        instances = await self.session.scalars(statement)
+        return list(instances)
     
 
-    def list(self, **filters) -> List[models.Image]:
-        image_set = self.session.query(models.Image)
-
-        if filters:
-            image_set = image_set.filter_by(**filters)
-        
-        return image_set.all()
+    async def delete_orphans(
+        self,
+        image_ids: Iterable[uuid.UUID],
+    ) -> Set[uuid.UUID]:
+        """Deletes images which are still not referred to by products
+
+        Returns:
+            Ids of deleted images
+        """
+        image_ids = list(image_ids)
+        statement = sqlalchemy.delete(models.Image)
+        statement = statement.where(models.Image.id.in_(image_ids))
+        statement = statement.where(~is_referenced())
+        await self.session.execute(
+            statement,
+            execution_options={'synchronize_session': False},
+        )
+
+        statement = sqlalchemy.select(models.Image.id)
+        statement = statement.where(models.Image.id.in_(image_ids))
+        remaining_ids = await self.session.scalars(statement)
+        return set(image_ids).difference(remaining_ids)
     
 
-    def delete(self, image: models.Image) -> None:
-        self.session.delete(image)
+    async def get_stored_content_hashes(
+        self,
+        content_hashes: Iterable[str],
+    ) -> Set[str]:
+        """Returns which of the hashes some images have"""
+        statement = sqlalchemy.select(models.Image.content_hash).distinct()
+        statement = statement.where(
+            models.Image.content_hash.in_(list(content_hashes)),
+        )
+        return set(await self.session.scalars(statement))
     
 
-    def update(self, image: models.Image, **fields) -> models.Image:
-        for attribute, value in fields.items():
-            setattr(image, attribute, value)
-        
-        return image
+    async def get_stored_names(self, names: Iterable[str]) -> Set[str]:
+        """Returns which of the file names some images have"""
+        statement = sqlalchemy.select(models.Image.image).distinct()
+        statement = statement.where(models.Image.image.in_(list(names)))
+        return set(await self.session.scalars(statement))
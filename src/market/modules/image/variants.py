@@ -0,0 +1,108 @@
+"""Resized and re-encoded variants of uploaded images
+
+Variants are generated with Pillow, which is an optional dependency: when
+it isn't installed, images are served in their original form only.
+Generation is CPU-bound and doesn't touch the storage, so it's meant to
+be run in a process pool.
+"""
+import dataclasses
+import io
+from typing import List
+from typing import Optional
+
+try:
+    import PIL.Image
+    import PIL.ImageOps
+except ImportError:
+    PIL = None
+
+
+@dataclasses.dataclass(frozen=True)
+class VariantSpec:
+    """
+    Files of variants are named after the source image and the spec name,
+    and served as immutable, so changing how a variant is encoded needs a
+    new name
+
+    Attributes:
+        max_size: Maximum width and height in pixels, None keeps the
+            original size
+        format: Pillow format name
+    """
+    name: str
+    max_size: Optional[int]
+    format: str
+    extension: str
+    quality: int = 85
+
+
+@dataclasses.dataclass(frozen=True)
+class EncodedVariant:
+    name: str
+    extension: str
+    data: bytes
+
+
+VARIANTS = (
+    VariantSpec('thumbnail', max_size=256, format='JPEG', extension='.jpg'),
+    VariantSpec('medium', max_size=1024, format='JPEG', extension='.jpg'),
+    VariantSpec('webp', max_size=None, format='WEBP', extension='.webp'),
+)
+
+
+def is_supported() -> bool:
+    return PIL is not None
+
+
+def generate_variants(data: bytes) -> List[EncodedVariant]:
+    """Makes variants of the image
+
+    Raises:
+        RuntimeError: Pillow isn't installed
+        OSError: Image can't be decoded
+    """
+    if not is_supported():
+        raise RuntimeError('Pillow is required to generate image variants')
+
+    with PIL.Image.open(io.BytesIO(data)) as source:
+        # Applying EXIF orientation, as it's lost on re-encoding
+        image = PIL.ImageOps.exif_transpose(source)
+        image.load()
+
+    return [
+        EncodedVariant(
+            name=spec.name,
+            extension=spec.extension,
+            data=encode_variant(image, spec),
+        )
+        for spec in VARIANTS
+    ]
+
+
+def encode_variant(image: 'PIL.Image.Image', spec: VariantSpec) -> bytes:
+    variant = image
+
+    if spec.max_size is not None:
+        variant = image.copy()
+        variant.thumbnail(
+            (spec.max_size, spec.max_size),
+            PIL.Image.Resampling.LANCZOS,
+        )
+
+    if spec.format == 'JPEG' and variant.mode != 'RGB':
+        variant = flatten(variant)
+
+    data = io.BytesIO()
+    variant.save(data, format=spec.format, quality=spec.quality, optimize=True)
+    return data.getvalue()
+
+
+def flatten(image: 'PIL.Image.Image') -> 'PIL.Image.Image':
+    """Converts the image to RGB, placing transparent ones on white"""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = PIL.Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+
+    return image.convert('RGB')
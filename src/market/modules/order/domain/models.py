@@ -0,0 +1,21 @@
+import dataclasses
+import uuid
+from datetime import datetime
+from typing import Optional
+
+
+@dataclasses.dataclass
+class Order:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    total_rub: float
+    placed: Optional[datetime] = None
+
+
+@dataclasses.dataclass
+class OrderItem:
+    id: uuid.UUID
+    order_id: uuid.UUID
+    product_id: uuid.UUID
+    amount: int
+    price_rub: float
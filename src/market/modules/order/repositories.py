@@ -0,0 +1,88 @@
+import logging
+import uuid
+from typing import Iterable
+from typing import List
+
+import sqlalchemy
+
+import market.common.repositories
+from market.modules.order.domain import models
+
+
+logger = logging.getLogger(__name__)
+
+
+class OrderRepository(
+    market.common.repositories.SQLAlchemyRepository[models.Order],
+):
+    """SQLAlchemy repository of order data"""
+    model = models.Order
+    entity_name = 'an order'
+
+
+    def list(self, **filters) -> List[models.Order]:
+        """Returns orders, most recent first"""
+        statement = sqlalchemy.select(models.Order)
+
+        if filters:
+            statement = statement.filter_by(**filters)
+
+        statement = statement.order_by(
+            models.Order.placed.desc(),
+            models.Order.id,
+        )
+        return list(self.session.scalars(statement))
+
+
+class OrderItemRepository(
+    market.common.repositories.SQLAlchemyRepository[models.OrderItem],
+):
+    """SQLAlchemy repository of order item data"""
+    model = models.OrderItem
+    entity_name = 'an order item'
+
+
+    def list_by_orders(
+        self,
+        order_ids: Iterable[uuid.UUID],
+    ) -> List[models.OrderItem]:
+        """Returns items of the orders with a single query"""
+        statement = sqlalchemy.select(models.OrderItem)
+        statement = statement.where(
+            models.OrderItem.order_id.in_(list(order_ids)),
+        )
+        return list(self.session.scalars(statement))
+
+
+class AsyncOrderRepository(
+    market.common.repositories.AsyncSQLAlchemyRepository[models.Order],
+):
+    """Asyncio SQLAlchemy repository of order data"""
+    model = models.Order
+    entity_name = 'an order'
+    sync_repository_class = OrderRepository
+
+
+    async def list(self, **filters) -> List[models.Order]:
+        """Returns orders, most recent first"""
+        return await self.run_sync(OrderRepository.list, **filters)
+
+
+class AsyncOrderItemRepository(
+    market.common.repositories.AsyncSQLAlchemyRepository[models.OrderItem],
+):
+    """Asyncio SQLAlchemy repository of order item data"""
+    model = models.OrderItem
+    entity_name = 'an order item'
+    sync_repository_class = OrderItemRepository
+
+
+    async def list_by_orders(
+        self,
+        order_ids: Iterable[uuid.UUID],
+    ) -> List[models.OrderItem]:
+        """Returns items of the orders with a single query"""
+        return await self.run_sync(
+            OrderItemRepository.list_by_orders,
+            list(order_ids),
+        )
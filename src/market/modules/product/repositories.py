@@ -1,58 +1,428 @@
 import logging
+import sys
 import uuid
+from datetime import datetime
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
 
-from sqlalchemy.orm import Session
+import sqlalchemy
+import sqlalchemy.orm
 
-import market.common.errors
+import market.common.repositories
+import market.common.pagination
+from market.modules.product import search
 from market.modules.product.domain import models
 
 
 logger = logging.getLogger(__name__)
 
 
-class ProductRepository:
+# Public sort keys mapped to product attributes
+SORT_ATTRIBUTES = {
+    'added': 'added',
+    'last_updated': 'last_updated',
+    'price': 'price_rub',
+}
+
+
+def make_cursor(
+    product: models.Product,
+    order_by: str = 'added',
+    descending: bool = False,
+) -> str:
+    """Returns a cursor pointing right after the specified product"""
+    value = getattr(product, SORT_ATTRIBUTES[order_by])
+
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    return market.common.pagination.encode_cursor([
+        order_by,
+        'desc' if descending else 'asc',
+        value,
+        product.id.hex,
+    ])
+
+
+def parse_cursor(
+    cursor: str,
+    order_by: str = 'added',
+    descending: bool = False,
+) -> Tuple[Any, uuid.UUID]:
+    """Returns `(sort value, id)` keyset values stored in a cursor
+
+    Raises:
+        ValueError: Cursor is malformed or made for another ordering
+    """
+    values = market.common.pagination.decode_cursor(cursor)
+    direction = 'desc' if descending else 'asc'
+
+    try:
+        cursor_order_by, cursor_direction, value, product_id = values
+    except ValueError:
+        raise ValueError('Invalid cursor') from None
+    
+    if (cursor_order_by, cursor_direction) != (order_by, direction):
+        raise ValueError('Cursor does not match the requested ordering')
+    
+    try:
+        if order_by == 'price':
+            return float(value), uuid.UUID(product_id)
+        
+        return datetime.fromisoformat(value), uuid.UUID(product_id)
+    except ValueError:
+        raise ValueError('Invalid cursor') from None
+
+
+def get_prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Returns the smallest string greater than any string starting
+    with the prefix, so prefix lookups can be made as index range scans
+    """
+    last_char_code = ord(prefix[-1])
+
+    if last_char_code == sys.maxunicode:
+        return None
+
+    return prefix[:-1] + chr(last_char_code + 1)
+
+
+class ProductRepository(
+    market.common.repositories.SQLAlchemyRepository[models.Product],
+):
     """SQLAlchemy repository of product data"""
-    session: Session
+    model = models.Product
+    entity_name = 'a product'
+
 
+    def list(
+        self,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        order_by: str = 'added',
+        descending: bool = False,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        title_prefix: Optional[str] = None,
+        **filters,
+    ) -> List[models.Product]:
+        """Returns products ordered by `(<order_by>, id)`
 
-    def __init__(self, session: Session) -> None:
-        self.session = session
+        Args:
+            after: Cursor (see `make_cursor`) of the last product of
+                the previous page
+            limit: Maximum amount of products to return
+            order_by: One of `SORT_ATTRIBUTES` keys
+            descending: Whether the order is descending
+            min_price: Lowest price (inclusive)
+            max_price: Highest price (inclusive)
+            in_stock: Whether the product must be (or must not be) in stock
+            title_prefix: Case-sensitive title prefix
+            filters: Exact match filters
+        
+        Raises:
+            ValueError: Cursor is malformed
+        """
+        product_set = self._query(
+            after,
+            limit,
+            order_by,
+            descending,
+            min_price,
+            max_price,
+            in_stock,
+            title_prefix,
+            **filters,
+        )
+        return product_set.all()
     
 
-    def get(self, product_id: uuid.UUID) -> models.Product:
-        queryset = self.session.query(models.Product)
-        queryset = queryset.filter_by(id=product_id)
-        instance = queryset.first()
+    def iterate(self, batch_size: int, **options) -> Iterator[models.Product]:
+        """Returns an iterator of products listed as by `list`, which
+        takes the same `options`. Rows are fetched `batch_size` at a time
+        rather than all at once
 
-        if instance is None:
-            raise market.common.errors.NotFoundError(
-                f'Unable to find a product with id={product_id}',
-            )
+        Raises:
+            ValueError: Cursor is malformed
+        """
+        return iter(self._query(**options).yield_per(batch_size))
+    
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+    ) -> List[models.Product]:
+        """Returns products containing all of the query terms in their
+        title or description, the most relevant first
+        """
+        bind = self.session.get_bind()
+
+        if search.is_fts_supported(bind):
+            return self._search_fts(query, limit, offset)
+        
+        product_ids = search.DEFAULT_INVERTED_INDEX.search(query, limit, offset)
+
+        if not product_ids:
+            return []
+        
+        product_set = self.session.query(models.Product)
+        product_set = product_set.filter(models.Product.id.in_(product_ids))
+        products = {product.id: product for product in product_set}
 
-        return instance
+        # Products might have been deleted by other processes
+        return [
+            products[product_id] for product_id in product_ids
+            if product_id in products
+        ]
     
 
-    def add(self, product: models.Product) -> models.Product:
-        self.session.add(product)
-        return product
+    def add_many(self, products: List[Dict[str, Any]]) -> None:
+        """Inserts products given as column values with a single
+        executemany statement
+        """
+        if not products:
+            return
+        
+        self.session.execute(sqlalchemy.insert(models.Product), products)
+        self._record_search_changes(products)
     
 
-    def list(self, **filters) -> List[models.Product]:
+    def update_many(
+        self,
+        owner_id: uuid.UUID,
+        products: List[Dict[str, Any]],
+    ) -> Set[uuid.UUID]:
+        """Updates products of the owner given as column values, including
+        `id`, with a single executemany statement. Products which don't
+        exist or belong to other users are skipped
+
+        Returns:
+            Ids of updated products
+        """
+        product_ids = {product['id'] for product in products}
+
+        if not product_ids:
+            return set()
+        
+        statement = sqlalchemy.select(models.Product.id)
+        statement = statement.where(models.Product.owner_id == owner_id)
+        statement = statement.where(models.Product.id.in_(product_ids))
+        owned_ids = set(self.session.scalars(statement))
+        owned_products = [
+            product for product in products if product['id'] in owned_ids
+        ]
+
+        if owned_products:
+            self.session.execute(
+                sqlalchemy.update(models.Product),
+                owned_products,
+            )
+            self._record_search_changes(owned_products)
+        
+        return owned_ids
+    
+
+    def reserve_stock(self, product_id: uuid.UUID, amount: int) -> bool:
+        """Takes the amount from stock of an active product with a single
+        conditional `UPDATE ... WHERE stock >= :amount`, so concurrent
+        reservations can't oversell and the row stays locked only until
+        the end of the transaction
+
+        Returns:
+            Whether the product had enough stock
+        """
+        statement = sqlalchemy.update(models.Product)
+        statement = statement.where(models.Product.id == product_id)
+        statement = statement.where(models.Product.is_active.is_(True))
+        statement = statement.where(models.Product.stock >= amount)
+        statement = statement.values(stock=models.Product.stock - amount)
+        result = self.session.execute(statement)
+        return result.rowcount == 1
+    
+
+    def _query(
+        self,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        order_by: str = 'added',
+        descending: bool = False,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        title_prefix: Optional[str] = None,
+        **filters,
+    ) -> sqlalchemy.orm.Query:
+        sort_column = getattr(models.Product, SORT_ATTRIBUTES[order_by])
         product_set = self.session.query(models.Product)
 
         if filters:
             product_set = product_set.filter_by(**filters)
         
-        return product_set.all()
+        if min_price is not None:
+            product_set = product_set.filter(
+                models.Product.price_rub >= min_price,
+            )
+        
+        if max_price is not None:
+            product_set = product_set.filter(
+                models.Product.price_rub <= max_price,
+            )
+        
+        if in_stock is not None:
+            if in_stock:
+                product_set = product_set.filter(models.Product.stock > 0)
+            else:
+                product_set = product_set.filter(models.Product.stock <= 0)
+        
+        if title_prefix:
+            # The range condition is what makes the title index usable,
+            # while LIKE keeps the result exact
+            product_set = product_set.filter(
+                models.Product.title >= title_prefix,
+                models.Product.title.startswith(title_prefix, autoescape=True),
+            )
+            upper_bound = get_prefix_upper_bound(title_prefix)
+
+            if upper_bound is not None:
+                product_set = product_set.filter(
+                    models.Product.title < upper_bound,
+                )
+        
+        # Keyset pagination: the cost of a page doesn't depend on how
+        # far it is from the beginning, unlike with OFFSET
+        if after is not None:
+            value, product_id = parse_cursor(after, order_by, descending)
+            keyset = sqlalchemy.tuple_(sort_column, models.Product.id)
+
+            if descending:
+                product_set = product_set.filter(keyset < (value, product_id))
+            else:
+                product_set = product_set.filter(keyset > (value, product_id))
+        
+        if descending:
+            product_set = product_set.order_by(
+                sort_column.desc(),
+                models.Product.id.desc(),
+            )
+        else:
+            product_set = product_set.order_by(sort_column, models.Product.id)
+
+        if limit is not None:
+            product_set = product_set.limit(limit)
+        
+        return product_set
     
 
-    def delete(self, product: models.Product) -> None:
-        self.session.delete(product)
+    def _record_search_changes(self, products: List[Dict[str, Any]]) -> None:
+        # The FTS5 index is kept in sync by triggers
+        if not search.is_fts_supported(self.session.get_bind()):
+            search.record_changes(self.session, products)
     
 
-    def update(self, product: models.Product, **fields) -> models.Product:
-        for attribute, value in fields.items():
-            setattr(product, attribute, value)
+    def _search_fts(
+        self,
+        query: str,
+        limit: int,
+        offset: int,
+    ) -> List[models.Product]:
+        fts_query = search.make_fts_query(query)
+
+        if fts_query is None:
+            return []
         
-        return product
+        fts_table = sqlalchemy.literal_column(search.FTS_TABLE_NAME)
+        fts_rowid = sqlalchemy.literal_column(f'{search.FTS_TABLE_NAME}.rowid')
+        fts_ids = sqlalchemy.table(
+            search.FTS_IDS_TABLE_NAME,
+            sqlalchemy.column('rowid'),
+            sqlalchemy.column('product_id', sqlalchemy.Uuid),
+        )
+        rank = sqlalchemy.func.bm25(
+            fts_table,
+            search.TITLE_WEIGHT,
+            search.DESCRIPTION_WEIGHT,
+        )
+
+        product_set = self.session.query(models.Product)
+        product_set = product_set.join(
+            fts_ids,
+            fts_ids.c.product_id == models.Product.id,
+        )
+        product_set = product_set.join(
+            sqlalchemy.table(search.FTS_TABLE_NAME),
+            fts_rowid == fts_ids.c.rowid,
+        )
+        product_set = product_set.filter(fts_table.op('MATCH')(fts_query))
+        # BM25 scores are negative in FTS5: the better the match, the lower
+        product_set = product_set.order_by(rank)
+        product_set = product_set.limit(limit).offset(offset)
+
+        return product_set.all()
+
+
+class AsyncProductRepository(
+    market.common.repositories.AsyncSQLAlchemyRepository[models.Product],
+):
+    """Asyncio SQLAlchemy repository of product data. Methods of
+    `ProductRepository` are run with `run_sync`, see them for details
+    """
+    model = models.Product
+    entity_name = 'a product'
+    sync_repository_class = ProductRepository
+
+
+    async def list(self, **options) -> List[models.Product]:
+        """Returns products as `ProductRepository.list` does
+
+        Raises:
+            ValueError: Cursor is malformed
+        """
+        return await self.run_sync(ProductRepository.list, **options)
+    
+
+    async def stream(
+        self,
+        batch_size: int,
+        **options,
+    ) -> AsyncIterator[models.Product]:
+        """Returns an iterator of products listed as by `list`, which
+        takes the same `options`. Rows are fetched `batch_size` at a time
+        rather than all at once
+
+        Raises:
+            ValueError: Cursor is malformed
+        """
+        repository = ProductRepository(self.session.sync_session)
+        statement = repository._query(**options).statement
+        statement = statement.execution_options(yield_per=batch_size)
+        return await self.session.stream_scalars(statement)
+    
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+    ) -> List[models.Product]:
+        return await self.run_sync(
+            ProductRepository.search,
+            query,
+            limit,
+            offset,
+        )
+    
+
+    async def reserve_stock(self, product_id: uuid.UUID, amount: int) -> bool:
+        return await self.run_sync(
+            ProductRepository.reserve_stock,
+            product_id,
+            amount,
+        )
@@ -0,0 +1,369 @@
+"""Full-text search over product titles and descriptions
+
+On SQLite the search is made by a contentless FTS5 index kept in sync
+with the `products` table by triggers. Other engines use an in-process inverted
+index which is built on startup and updated on session commits.
+"""
+import collections
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+import uuid
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+
+import sqlalchemy
+import sqlalchemy.event
+from sqlalchemy.orm import Session
+
+from market.modules.product.domain import models
+
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE_NAME = 'products_fts'
+FTS_IDS_TABLE_NAME = 'products_fts_ids'
+
+# Term frequencies in a title are weighted more than in a description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Session.info key of products changes pending until commit
+SESSION_CHANGES_KEY = 'product_search_changes'
+
+SQLITE_INDEX_DDL = [
+    # FTS5 rows are linked to products by integer rowids. The implicit
+    # rowids of `products` may be renumbered by VACUUM, since its primary
+    # key is a UUID, so the index has its own table of stable ones
+    f"""
+    CREATE TABLE {FTS_IDS_TABLE_NAME} (
+        rowid INTEGER PRIMARY KEY,
+        product_id CHAR(32) NOT NULL UNIQUE
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE_NAME} USING fts5(
+        title,
+        description,
+        content='',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE_NAME}_ai
+    AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_IDS_TABLE_NAME}(product_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, description)
+        VALUES (last_insert_rowid(), new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE_NAME}_ad
+    AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, description)
+        SELECT 'delete', rowid, old.title, old.description
+        FROM {FTS_IDS_TABLE_NAME} WHERE product_id = old.id;
+        DELETE FROM {FTS_IDS_TABLE_NAME} WHERE product_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE_NAME}_au
+    AFTER UPDATE OF title, description ON products BEGIN
+        INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, title, description)
+        SELECT 'delete', rowid, old.title, old.description
+        FROM {FTS_IDS_TABLE_NAME} WHERE product_id = old.id;
+        INSERT INTO {FTS_TABLE_NAME}(rowid, title, description)
+        SELECT rowid, new.title, new.description
+        FROM {FTS_IDS_TABLE_NAME} WHERE product_id = new.id;
+    END
+    """,
+    # Indexing products which existed before the index was created
+    f"""
+    INSERT INTO {FTS_IDS_TABLE_NAME}(product_id) SELECT id FROM products
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE_NAME}(rowid, title, description)
+    SELECT {FTS_IDS_TABLE_NAME}.rowid, products.title, products.description
+    FROM products
+    JOIN {FTS_IDS_TABLE_NAME} ON {FTS_IDS_TABLE_NAME}.product_id = products.id
+    """,
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase terms with diacritics removed
+    (the same way the FTS5 `unicode61` tokenizer does)
+    """
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(stripped)
+
+
+def make_fts_query(query: str) -> Optional[str]:
+    """Converts user input into an FTS5 query matching all of the terms.
+    Every term is quoted, so FTS5 query syntax can't be injected
+
+    Returns:
+        FTS5 query or None if the input has no terms
+    """
+    terms = tokenize(query)
+
+    if not terms:
+        return None
+
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+class InvertedIndex:
+    """In-process BM25-ranked inverted index of products"""
+    k1: float = 1.2
+    b: float = 0.75
+    postings: Dict[str, Dict[uuid.UUID, float]]
+    document_terms: Dict[uuid.UUID, Set[str]]
+    document_lengths: Dict[uuid.UUID, float]
+    total_length: float
+
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.clear()
+    
+
+    def clear(self) -> None:
+        with self.lock:
+            self.postings = collections.defaultdict(dict)
+            self.document_terms = {}
+            self.document_lengths = {}
+            self.total_length = 0.0
+    
+
+    def add(self, product_id: uuid.UUID, title: str, description: str) -> None:
+        """Adds a product to the index or reindexes it"""
+        frequencies: Dict[str, float] = collections.defaultdict(float)
+
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+
+        for term in tokenize(description):
+            frequencies[term] += DESCRIPTION_WEIGHT
+
+        with self.lock:
+            self.remove(product_id)
+
+            for term, frequency in frequencies.items():
+                self.postings[term][product_id] = frequency
+
+            length = sum(frequencies.values())
+            self.document_terms[product_id] = set(frequencies)
+            self.document_lengths[product_id] = length
+            self.total_length += length
+    
+
+    def remove(self, product_id: uuid.UUID) -> None:
+        with self.lock:
+            terms = self.document_terms.pop(product_id, None)
+
+            if terms is None:
+                return
+
+            for term in terms:
+                term_postings = self.postings[term]
+                del term_postings[product_id]
+
+                if not term_postings:
+                    del self.postings[term]
+
+            self.total_length -= self.document_lengths.pop(product_id)
+    
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+    ) -> List[uuid.UUID]:
+        """Returns ids of products containing all of the query terms,
+        the most relevant first
+        """
+        terms = set(tokenize(query))
+
+        if not terms:
+            return []
+
+        with self.lock:
+            term_postings = [self.postings.get(term, {}) for term in terms]
+            # Intersecting from the rarest term keeps candidate sets small
+            term_postings.sort(key=len)
+            candidates = set(term_postings[0])
+
+            for postings in term_postings[1:]:
+                candidates.intersection_update(postings)
+
+                if not candidates:
+                    return []
+
+            documents_count = len(self.document_lengths)
+            average_length = self.total_length / max(documents_count, 1)
+            scores = {product_id: 0.0 for product_id in candidates}
+
+            for postings in term_postings:
+                document_frequency = len(postings)
+                idf = math.log(
+                    1 + (documents_count - document_frequency + 0.5) /
+                    (document_frequency + 0.5)
+                )
+
+                for product_id in candidates:
+                    frequency = postings[product_id]
+                    length = self.document_lengths[product_id]
+                    norm = self.k1 * (
+                        1 - self.b + self.b * length / average_length
+                    )
+                    scores[product_id] += (
+                        idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    )
+
+        ranked = heapq.nlargest(
+            offset + limit,
+            scores.items(),
+            key=lambda item: item[1],
+        )
+        return [product_id for product_id, _ in ranked[offset:]]
+    
+
+    def subscribe(self) -> None:
+        """Keeps the index in sync with products changes committed
+        by ORM sessions
+        """
+        for event_name, listener in self._get_session_listeners():
+            if not sqlalchemy.event.contains(Session, event_name, listener):
+                sqlalchemy.event.listen(Session, event_name, listener)
+    
+
+    def unsubscribe(self) -> None:
+        for event_name, listener in self._get_session_listeners():
+            if sqlalchemy.event.contains(Session, event_name, listener):
+                sqlalchemy.event.remove(Session, event_name, listener)
+    
+
+    def _get_session_listeners(self):
+        return [
+            ('after_flush', self.collect_changes),
+            ('after_commit', self.apply_changes),
+            ('after_rollback', self.discard_changes),
+        ]
+    
+
+    def collect_changes(self, session: Session, *args) -> None:
+        """Remembers flushed products changes until the session is
+        committed
+        """
+        changes = session.info.setdefault(SESSION_CHANGES_KEY, {})
+
+        for instance in _iter_products(session.new, session.dirty):
+            changes[instance.id] = (instance.title, instance.description)
+
+        for instance in _iter_products(session.deleted):
+            changes[instance.id] = None
+    
+
+    def apply_changes(self, session: Session) -> None:
+        changes = session.info.pop(SESSION_CHANGES_KEY, {})
+
+        for product_id, fields in changes.items():
+            if fields is None:
+                self.remove(product_id)
+            else:
+                self.add(product_id, *fields)
+    
+
+    def discard_changes(self, session: Session) -> None:
+        session.info.pop(SESSION_CHANGES_KEY, None)
+
+
+def record_changes(
+    session: Session,
+    products: Iterable[Dict[str, Any]],
+) -> None:
+    """Remembers products written with bulk statements, which bypass
+    session objects, until the session is committed. Products are given
+    as column values, including `id`, `title` and `description`
+    """
+    changes = session.info.setdefault(SESSION_CHANGES_KEY, {})
+
+    for product in products:
+        changes[product['id']] = (product['title'], product['description'])
+
+
+DEFAULT_INVERTED_INDEX = InvertedIndex()
+
+
+def is_fts_supported(bind: sqlalchemy.Engine) -> bool:
+    return bind.dialect.name == 'sqlite'
+
+
+def install(engine: sqlalchemy.Engine) -> None:
+    """Prepares the search index for the engine. Must be called once
+    the tables are created
+    """
+    if is_fts_supported(engine):
+        install_sqlite_index(engine)
+    else:
+        install_inverted_index(engine, DEFAULT_INVERTED_INDEX)
+
+
+def install_sqlite_index(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        inspector = sqlalchemy.inspect(connection)
+
+        if inspector.has_table(FTS_IDS_TABLE_NAME):
+            return
+
+        for statement in SQLITE_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def install_inverted_index(
+    engine: sqlalchemy.Engine,
+    index: InvertedIndex,
+) -> None:
+    """Fills the index with existing products and subscribes it to
+    products changes committed by ORM sessions
+    """
+    products_table = sqlalchemy.table(
+        'products',
+        sqlalchemy.column('id', sqlalchemy.Uuid),
+        sqlalchemy.column('title'),
+        sqlalchemy.column('description'),
+    )
+    statement = sqlalchemy.select(
+        products_table.c.id,
+        products_table.c.title,
+        products_table.c.description,
+    )
+
+    index.clear()
+
+    with engine.connect() as connection:
+        rows = connection.execution_options(yield_per=1000).execute(statement)
+
+        for product_id, title, description in rows:
+            index.add(product_id, title, description)
+
+    index.subscribe()
+
+
+def _iter_products(*instance_sets: Iterable[object]) -> Iterable[models.Product]:
+    for instances in instance_sets:
+        for instance in instances:
+            if isinstance(instance, models.Product):
+                yield instance
@@ -1,2 +1,3 @@
 from .abstract import AuthService
 from .impl import AuthServiceImpl
+from .cache import UserCache
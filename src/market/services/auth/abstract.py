@@ -21,6 +21,10 @@ class AuthService:
         ...
     
 
+    def create_token(self, user: models.User) -> models.Token:
+        ...
+    
+
     def login(self, username: str, password: str) -> Optional[models.Token]:
         ...
     
@@ -30,6 +34,13 @@ class AuthService:
         token: str,
     ) -> Optional[models.User]:
         ...
+    
+
+    async def get_user_async(
+        self,
+        token: str,
+    ) -> Optional[models.User]:
+        ...
 
 
     def register_user(
@@ -0,0 +1,117 @@
+import collections
+import dataclasses
+import threading
+import time
+import uuid
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import OrderedDict
+from typing import Set
+from typing import Tuple
+
+from market.modules.user.domain import models
+
+
+class UserCache:
+    """Bounded LRU cache of users authenticated by access tokens
+
+    An entry lives until the token expires or for `ttl` seconds, whichever
+    comes first. Users are stored as detached copies, so the cached data
+    doesn't depend on the session it was loaded with.
+    """
+    max_size: int
+    ttl: float
+    clock: Callable[[], float]
+    entries: OrderedDict[str, Tuple[models.User, float]]
+    user_tokens: Dict[uuid.UUID, Set[str]]
+
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+        self.user_tokens = collections.defaultdict(set)
+        self.lock = threading.Lock()
+    
+
+    def get(self, token: str) -> Optional[models.User]:
+        with self.lock:
+            entry = self.entries.get(token)
+
+            if entry is None:
+                return None
+
+            user, expires_at = entry
+
+            if expires_at <= self.clock():
+                self._remove(token)
+                return None
+
+            self.entries.move_to_end(token)
+
+        return dataclasses.replace(user)
+    
+
+    def put(
+        self,
+        token: str,
+        user: models.User,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Caches the user authenticated by the token
+
+        Args:
+            expires_at: Token expiration unix timestamp
+        """
+        if self.max_size <= 0:
+            return
+
+        entry_expires_at = self.clock() + self.ttl
+
+        if expires_at is not None:
+            entry_expires_at = min(entry_expires_at, expires_at)
+
+        user_copy = dataclasses.replace(user)
+
+        with self.lock:
+            self._remove(token)
+            self.entries[token] = (user_copy, entry_expires_at)
+            self.user_tokens[user_copy.id].add(token)
+
+            while len(self.entries) > self.max_size:
+                oldest_token = next(iter(self.entries))
+                self._remove(oldest_token)
+    
+
+    def invalidate_user(self, user_id: uuid.UUID) -> None:
+        """Drops all cached entries of the user"""
+        with self.lock:
+            for token in list(self.user_tokens.get(user_id, ())):
+                self._remove(token)
+    
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.user_tokens.clear()
+    
+
+    def _remove(self, token: str) -> None:
+        entry = self.entries.pop(token, None)
+
+        if entry is None:
+            return
+
+        user, _ = entry
+        tokens = self.user_tokens[user.id]
+        tokens.discard(token)
+
+        if not tokens:
+            del self.user_tokens[user.id]
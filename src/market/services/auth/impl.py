@@ -1,9 +1,11 @@
 import datetime
+import functools
 import logging
 import uuid
 from typing import Any
 from typing import Dict
 from typing import Optional
+from typing import Union
 
 import passlib.context
 from jose import jwt
@@ -13,22 +15,51 @@ from market.modules.user.domain import models
 from market.modules.user import repositories
 
 from market.services.auth import abstract
+from market.services.auth import cache
 
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def get_password_context() -> passlib.context.CryptContext:
+    """Returns the process-wide password hashing context"""
+    return passlib.context.CryptContext(
+        schemes=['bcrypt'],
+        deprecated='auto',
+    )
+
+
 class AuthServiceImpl(abstract.AuthService):
     pwd_context: passlib.context.CryptContext
-    repo: repositories.UserRepository
+    settings: market.config.AuthSettings
+    repo: Union[repositories.UserRepository, repositories.AsyncUserRepository]
+    user_cache: Optional[cache.UserCache]
 
 
-    def __init__(self, repo: repositories.UserRepository) -> None:
-        self.pwd_context = passlib.context.CryptContext(
-            schemes=['bcrypt'],
-            deprecated='auto',
-        )
+    def __init__(
+        self,
+        repo: Union[
+            repositories.UserRepository,
+            repositories.AsyncUserRepository,
+        ],
+        user_cache: Optional[cache.UserCache] = None,
+        settings: Optional[market.config.AuthSettings] = None,
+        pwd_context: Optional[passlib.context.CryptContext] = None,
+    ) -> None:
+        """Creates the service. Settings and hashing context default
+        to the process-wide ones, so creating a service is cheap
+        """
+        if settings is None:
+            settings = market.config.get_auth_settings()
+        
+        if pwd_context is None:
+            pwd_context = get_password_context()
+
+        self.pwd_context = pwd_context
+        self.settings = settings
         self.repo = repo
+        self.user_cache = user_cache
 
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
@@ -83,9 +114,11 @@ class AuthServiceImpl(abstract.AuthService):
         expire = datetime.datetime.utcnow() + expires_delta
         to_encode.update({'exp': expire})
 
-        secret_key = market.config.get_hash_secret_key()
-        algorithm = market.config.get_hash_algorithm()
-        encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
+        encoded_jwt = jwt.encode(
+            to_encode,
+            self.settings.hash_secret_key,
+            algorithm=self.settings.hash_algorithm,
+        )
 
         return encoded_jwt
 
@@ -96,18 +129,20 @@ class AuthServiceImpl(abstract.AuthService):
         Raises:
             jose.JWTError:
         """
-        secret_key = market.config.get_hash_secret_key()
-        algorithm = market.config.get_hash_algorithm()
-        return jwt.decode(token, secret_key, algorithms=[algorithm])
+        return jwt.decode(
+            token,
+            self.settings.hash_secret_key,
+            algorithms=[self.settings.hash_algorithm],
+        )
 
 
-    def login(self, username: str, password: str) -> Optional[models.Token]:
-        user = self.authenticate_user(username, password)
-        if user is None:
-            return None
-        
-        expire_minutes = market.config.get_access_token_expire_minutes()
-        access_token_expires = datetime.timedelta(minutes=expire_minutes)
+    def create_token(self, user: models.User) -> models.Token:
+        """Issues an access token for the user without checking
+        their credentials
+        """
+        access_token_expires = datetime.timedelta(
+            minutes=self.settings.access_token_expire_minutes,
+        )
         access_token = self.create_access_token(
             data={'sub': user.username},
             expires_delta=access_token_expires
@@ -115,6 +150,14 @@ class AuthServiceImpl(abstract.AuthService):
         return models.Token(access_token=access_token, token_type='bearer')
 
 
+    def login(self, username: str, password: str) -> Optional[models.Token]:
+        user = self.authenticate_user(username, password)
+        if user is None:
+            return None
+        
+        return self.create_token(user)
+
+
     def get_user(
         self,
         token: str,
@@ -122,10 +165,41 @@ class AuthServiceImpl(abstract.AuthService):
         """Reads the token and returns the corresponding user
         Reads the token and returns the corresponding user. If user is not active
         or token is expired (not implemented for simplicity) None is returned.
+        If a user cache is set, users of recently seen tokens are returned
+        without decoding the token and querying the repository.
         """
+        if self.user_cache is not None:
+            cached_user = self.user_cache.get(token)
+
+            if cached_user is not None:
+                return cached_user
+
         decoded_data = self.decode_token(token)
         username = decoded_data['sub']
         user = self.get_user_by_username(username)
+        self._cache_user(token, user, decoded_data)
+        return user
+
+
+    async def get_user_async(
+        self,
+        token: str,
+    ) -> Optional[models.User]:
+        """Same as `get_user` for services made over an asyncio repository
+        (`AsyncUserRepository`), so the user is looked up on the event loop
+        """
+        if self.user_cache is not None:
+            cached_user = self.user_cache.get(token)
+
+            if cached_user is not None:
+                return cached_user
+
+        decoded_data = self.decode_token(token)
+        matching_users_list = await self.repo.list(
+            username=decoded_data['sub'],
+        )
+        user = matching_users_list[0] if matching_users_list else None
+        self._cache_user(token, user, decoded_data)
         return user
 
 
@@ -150,3 +224,14 @@ class AuthServiceImpl(abstract.AuthService):
         added_instance = self.repo.add(instance)
 
         return added_instance
+
+
+    def _cache_user(
+        self,
+        token: str,
+        user: Optional[models.User],
+        decoded_data: Dict[str, Any],
+    ) -> None:
+        if user is not None and self.user_cache is not None:
+            expires_at = decoded_data.get('exp')
+            self.user_cache.put(token, user, expires_at=expires_at)
@@ -0,0 +1,7 @@
+from .formats import FORMATS
+from .formats import MEDIA_TYPES
+from .formats import read_records
+from .formats import write_csv
+from .imports import ImportResult
+from .imports import RecordError
+from .imports import import_products
@@ -0,0 +1,133 @@
+"""Reading of product catalogs as NDJSON or CSV and writing as CSV
+(NDJSON is written with `market.common.ndjson`)
+
+Files are read record by record and written in chunks, so memory usage
+doesn't depend on the size of a catalog. Malformed records are returned
+as errors instead of stopping the reading.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+from typing import Union
+
+import orjson
+
+import market.common.ndjson
+
+
+# Fields of a record, or the error which made it unreadable
+Record = Union[Dict[str, Any], ValueError]
+
+FORMATS = ('ndjson', 'csv')
+
+MEDIA_TYPES = {
+    'ndjson': market.common.ndjson.MEDIA_TYPE,
+    'csv': 'text/csv',
+}
+
+
+def read_ndjson(file: BinaryIO) -> Iterator[Tuple[int, Record]]:
+    """Yields JSON objects of the lines along with line numbers. Blank
+    lines are skipped
+    """
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            fields = orjson.loads(line)
+        except orjson.JSONDecodeError as error:
+            yield line_number, ValueError(f'Invalid JSON: {error}')
+            continue
+
+        if not isinstance(fields, dict):
+            yield line_number, ValueError('Line is not a JSON object')
+            continue
+
+        yield line_number, fields
+
+
+def read_csv(file: BinaryIO) -> Iterator[Tuple[int, Record]]:
+    """Yields UTF-8 CSV rows as fields named by the header row, along with
+    row numbers (the header is row 0). Empty values are left out, so
+    defaults apply to them
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+
+    try:
+        reader = csv.DictReader(text)
+
+        for row_number, row in enumerate(reader, start=1):
+            if None in row:
+                yield row_number, ValueError(
+                    'Row has more values than columns',
+                )
+                continue
+
+            yield row_number, {
+                name: value for name, value in row.items()
+                if value not in (None, '')
+            }
+    finally:
+        # The file belongs to the caller
+        text.detach()
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def read_records(
+    file: BinaryIO,
+    file_format: str,
+) -> Iterator[Tuple[int, Record]]:
+    """Reads records of a file of one of `FORMATS`"""
+    return READERS[file_format](file)
+
+
+async def write_csv(
+    records: AsyncIterable[Dict[str, Any]],
+    fields: List[str],
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """Yields chunks of about `chunk_size` bytes of UTF-8 CSV rows, the
+    first of which is the header. Values are written as they're written to
+    JSON, e.g. booleans as `true` and `false`
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    async for record in records:
+        writer.writerow([format_csv_value(record[field]) for field in fields])
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def format_csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
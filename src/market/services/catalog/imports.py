@@ -0,0 +1,121 @@
+"""Bulk creation and update of products
+
+Records are validated one by one as they're read and written in batches,
+each with a couple of executemany statements in its own transaction. A
+failed import therefore keeps the batches written before the failure.
+Invalid records are skipped and reported along with their numbers.
+"""
+import dataclasses
+import itertools
+import uuid
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from market.services import unit_of_work
+from market.services.catalog import formats
+
+
+@dataclasses.dataclass(frozen=True)
+class RecordError:
+    record: int
+    detail: str
+
+
+@dataclasses.dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[RecordError] = dataclasses.field(default_factory=list)
+
+
+def import_products(
+    uow: unit_of_work.UnitOfWork,
+    owner_id: uuid.UUID,
+    records: Iterable[Tuple[int, formats.Record]],
+    validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+    batch_size: int,
+    max_errors: int,
+) -> ImportResult:
+    """Creates products of the records without `id` and updates products
+    of the owner with the given `id`, committing every `batch_size` records
+
+    Args:
+        records: Numbered records (see `formats.read_records`)
+        validate: Returns product fields of a record, raises ValueError
+            if it's invalid
+        max_errors: Limit of reported errors, failed records are counted
+            anyway
+    """
+    result = ImportResult()
+
+    def add_error(record_number: int, detail: str) -> None:
+        result.failed += 1
+
+        if len(result.errors) < max_errors:
+            result.errors.append(RecordError(record_number, detail))
+
+    for batch in iter_batches(records, batch_size):
+        created = []
+        updated = []
+
+        for record_number, record in batch:
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+
+                fields = validate(record)
+            except ValueError as error:
+                add_error(record_number, str(error))
+                continue
+
+            if fields.get('id') is None:
+                fields['id'] = uuid.uuid4()
+                fields['owner_id'] = owner_id
+                created.append(fields)
+            else:
+                updated.append((record_number, fields))
+
+        uow.products.add_many(created)
+        updated_ids = uow.products.update_many(
+            owner_id,
+            [fields for _, fields in updated],
+        )
+        uow.commit()
+
+        missing = [
+            (record_number, fields['id']) for record_number, fields in updated
+            if fields['id'] not in updated_ids
+        ]
+
+        for record_number, product_id in missing:
+            add_error(
+                record_number,
+                f'Unable to find your product with id={product_id}',
+            )
+
+        result.created += len(created)
+        result.updated += len(updated) - len(missing)
+
+    result.errors.sort(key=lambda error: error.record)
+    return result
+
+
+def iter_batches(
+    records: Iterable[Tuple[int, formats.Record]],
+    batch_size: int,
+) -> Iterator[List[Tuple[int, formats.Record]]]:
+    iterator = iter(records)
+
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+
+        if not batch:
+            return
+
+        yield batch
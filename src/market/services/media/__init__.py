@@ -0,0 +1,5 @@
+from .gc import CollectionResult
+from .gc import collect_orphaned_images
+from .gc import collect_orphaned_images_periodically
+from .uploads import store_upload
+from .variants import generate_image_variants
@@ -0,0 +1,208 @@
+"""Collection of images no product refers to
+
+Images are uploaded before they're attached to products and stay behind
+when product images or products are deleted. Images unreferenced for
+longer than a grace period after upload are deleted in batches, each in a
+short transaction, and then their files are deleted unless other images
+share them. Files are named after the content of images (see
+`get_content_addressed_name`), so images share files only when they have
+the same content hash.
+
+Images may be uploaded with the same content while their files are
+collected. References of each file are checked again right before it's
+deleted, and uploads check that their file is still stored once their
+image is committed (see `store_upload`), storing it again otherwise.
+"""
+import asyncio
+import dataclasses
+import logging
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import market.common.errors
+from market.modules.image.domain import models
+from market.services import storage
+from market.services import unit_of_work
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class CollectionResult:
+    images: int = 0
+    files: int = 0
+
+
+async def collect_orphaned_images(
+    media_storage: storage.Storage,
+    uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork],
+    grace_period: timedelta,
+    batch_size: int,
+    max_batches: Optional[int] = None,
+) -> CollectionResult:
+    """Deletes images which were added before the grace period and no
+    product refers to, along with their files
+
+    Args:
+        max_batches: Limit of batches to collect, None collects all the
+            orphaned images
+
+    Returns:
+        Numbers of deleted images and files
+    """
+    added_before = datetime.now(timezone.utc) - grace_period
+    result = CollectionResult()
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        orphans, shared_names = await delete_orphans(
+            uow_factory,
+            added_before,
+            batch_size,
+        )
+
+        if orphans is None:
+            break
+
+        names = get_file_names(orphans).difference(shared_names)
+        deleted_files = await delete_files(
+            media_storage,
+            uow_factory,
+            orphans,
+            names,
+        )
+        result = CollectionResult(
+            images=result.images + len(orphans),
+            files=result.files + deleted_files,
+        )
+        batches += 1
+
+    if result.images:
+        logger.info(
+            f'Collected {result.images} orphaned images '
+            f'and {result.files} files',
+        )
+
+    return result
+
+
+async def delete_orphans(
+    uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork],
+    added_before: datetime,
+    limit: int,
+) -> Tuple[Optional[List[models.Image]], Set[str]]:
+    """Deletes a batch of orphaned images in a single transaction
+
+    Returns:
+        Deleted images and names of their files which remaining images
+        still have, or None and an empty set if there are no orphans left
+    """
+    async with uow_factory() as uow:
+        orphans = await uow.images.list_orphans(added_before, limit)
+
+        if not orphans:
+            return None, set()
+
+        deleted_ids = await uow.images.delete_orphans(
+            orphan.id for orphan in orphans
+        )
+        orphans = [orphan for orphan in orphans if orphan.id in deleted_ids]
+        shared_names = await get_shared_file_names(uow, orphans)
+        await uow.commit()
+
+    return orphans, shared_names
+
+
+async def get_shared_file_names(
+    uow: unit_of_work.AsyncUnitOfWork,
+    images: List[models.Image],
+) -> Set[str]:
+    """Returns names of files of the images which other images have"""
+    hashed = [image for image in images if image.content_hash is not None]
+    unhashed = [image for image in images if image.content_hash is None]
+    shared_hashes = await uow.images.get_stored_content_hashes(
+        image.content_hash for image in hashed
+    )
+    shared_names = await uow.images.get_stored_names(
+        image.image for image in unhashed
+    )
+    shared_images = [
+        image for image in hashed if image.content_hash in shared_hashes
+    ]
+    shared_images.extend(
+        image for image in unhashed if image.image in shared_names
+    )
+    return get_file_names(shared_images)
+
+
+def get_file_names(images: List[models.Image]) -> Set[str]:
+    names = set()
+
+    for image in images:
+        names.add(image.image)
+        names.update(image.variants.values())
+
+    return names
+
+
+async def delete_files(
+    media_storage: storage.Storage,
+    uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork],
+    images: List[models.Image],
+    names: Set[str],
+) -> int:
+    """Deletes the files of deleted images, checking right before each
+    file is deleted that no image uploaded meanwhile has it. Failures are
+    logged, so a storage hiccup leaves files behind rather than stopping
+    the collection
+
+    Returns:
+        Number of deleted files
+    """
+    deleted = 0
+
+    for name in sorted(names):
+        owners = [image for image in images if name in get_file_names([image])]
+
+        async with uow_factory() as uow:
+            if name in await get_shared_file_names(uow, owners):
+                continue
+
+        try:
+            await media_storage.delete(name)
+        except market.common.errors.StorageError:
+            logger.exception(f'Unable to delete {name}')
+            continue
+
+        deleted += 1
+
+    return deleted
+
+
+async def collect_orphaned_images_periodically(
+    interval_seconds: float,
+    media_storage: storage.Storage,
+    uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork],
+    grace_period: timedelta,
+    batch_size: int,
+) -> None:
+    """Collects orphaned images every interval until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+
+        try:
+            await collect_orphaned_images(
+                media_storage,
+                uow_factory,
+                grace_period,
+                batch_size,
+            )
+        except Exception:
+            logger.exception('Unable to collect orphaned images')
@@ -0,0 +1,98 @@
+import contextlib
+import functools
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator
+from typing import BinaryIO
+from typing import Optional
+
+import anyio.to_thread
+
+import market.common.uploads
+from market.services import storage
+
+
+@contextlib.asynccontextmanager
+async def store_upload(
+    media_storage: storage.Storage,
+    source: BinaryIO,
+    chunk_size: int,
+    max_size: Optional[int] = None,
+    extension: str = '',
+) -> AsyncIterator[market.common.uploads.UploadedFile]:
+    """Stores the source under its content-addressed name (see
+    `get_content_addressed_name`). The source is copied chunk by chunk into
+    a temporary file and hashed on the fly; if the same content is already
+    stored, the copy isn't stored again
+
+    The image of the upload is meant to be committed within the context.
+    The collector of orphaned images might delete a file of the same
+    content before it sees the image, so the temporary copy is kept until
+    the context exits, and the file is stored again then if it's missing
+
+    Raises:
+        FileTooLargeError: Source is bigger than `max_size` bytes
+    """
+    write = functools.partial(
+        market.common.uploads.write_temp_file,
+        source,
+        media_storage.temp_directory or tempfile.gettempdir(),
+        chunk_size,
+        max_size,
+    )
+    temp_path, size, sha256 = await anyio.to_thread.run_sync(write)
+    name = market.common.uploads.get_content_addressed_name(sha256, extension)
+
+    try:
+        # Concurrent uploads of the same content replace the file with
+        # identical data, so there's no need to lock
+        await put_missing_file(media_storage, name, temp_path)
+        yield market.common.uploads.UploadedFile(
+            name=name,
+            size=size,
+            sha256=sha256,
+        )
+        await put_missing_file(media_storage, name, temp_path)
+    finally:
+        await anyio.to_thread.run_sync(remove_file, temp_path)
+
+
+async def put_missing_file(
+    media_storage: storage.Storage,
+    name: str,
+    path: str,
+) -> None:
+    """Stores the file unless it's stored already. Storages may move
+    files they store, so another link to the file is stored instead
+    """
+    if await media_storage.exists(name):
+        return
+
+    link_path = await anyio.to_thread.run_sync(link_file, path)
+
+    try:
+        await media_storage.put_file(name, link_path)
+    finally:
+        await anyio.to_thread.run_sync(remove_file, link_path)
+
+
+def link_file(path: str) -> str:
+    """Returns a path of a new hard link to the file next to it, or of
+    a copy where hard links aren't supported
+    """
+    link_path = f'{path}.link'
+
+    try:
+        os.link(path, link_path)
+    except OSError:
+        shutil.copyfile(path, link_path)
+
+    return link_path
+
+
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,63 @@
+import asyncio
+import concurrent.futures
+import logging
+import uuid
+from typing import Callable
+
+import market.common.errors
+import market.common.uploads
+import market.modules.image.variants
+from market.services import storage
+from market.services import unit_of_work
+
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_image_variants(
+    image_id: uuid.UUID,
+    image_name: str,
+    content_hash: str,
+    media_storage: storage.Storage,
+    executor: concurrent.futures.Executor,
+    uow_factory: Callable[[], unit_of_work.AsyncUnitOfWork],
+) -> None:
+    """Makes variants of an uploaded image in the executor, stores them
+    and records them against the image. Meant to be run as a background
+    task, so errors are logged instead of being raised
+
+    Variants are named after the content of the image (e.g.
+    `ab/cd/abcd...ef.thumbnail.jpg`), so all files of images with the same
+    content are shared and can be collected together.
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        data = await media_storage.get(image_name)
+        encoded_variants = await loop.run_in_executor(
+            executor,
+            market.modules.image.variants.generate_variants,
+            data,
+        )
+        variants = {}
+
+        for variant in encoded_variants:
+            name = market.common.uploads.get_content_addressed_name(
+                content_hash,
+                f'.{variant.name}{variant.extension}',
+            )
+            await media_storage.put(name, variant.data)
+            variants[variant.name] = name
+    except Exception:
+        logger.exception(f'Unable to generate variants of {image_name}')
+        return
+
+    async with uow_factory() as uow:
+        try:
+            image = await uow.images.get(image_id)
+        except market.common.errors.NotFoundError:
+            # The image was deleted while the variants were generated
+            return
+
+        await uow.images.update(image, variants=variants)
+        await uow.commit()
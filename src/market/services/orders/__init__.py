@@ -0,0 +1 @@
+from .checkout import checkout
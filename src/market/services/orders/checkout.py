@@ -0,0 +1,71 @@
+import uuid
+from typing import List
+from typing import Tuple
+
+import market.common.errors
+from market.modules.order.domain import models
+from market.services import unit_of_work
+
+
+async def checkout(
+    uow: unit_of_work.AsyncUnitOfWork,
+    user_id: uuid.UUID,
+) -> Tuple[models.Order, List[models.OrderItem]]:
+    """Turns the user cart into an order, taking amounts of its items from
+    stock of their products. Changes are left for the caller to commit
+
+    Stock is reserved with conditional updates rather than read and
+    written back, so parallel checkouts never oversell. Products are
+    reserved in order of their ids, so checkouts of the same products lock
+    their rows in the same order and don't deadlock.
+
+    The cart is read without locks, so its items are deleted only if
+    they still have the ordered amounts. A cart changed in the meantime
+    fails the checkout rather than being lost.
+
+    Raises:
+        ValueError: Cart is empty
+        OutOfStockError: Some product is inactive or doesn't have enough
+            stock, nothing should be committed then
+        CartChangedError: Some item was changed or removed since the cart
+            was read, nothing should be committed then
+    """
+    summary = await uow.cart.get_summary(user_id)
+
+    if not summary.lines:
+        raise ValueError('Your cart is empty')
+
+    lines = sorted(summary.lines, key=lambda line: line.product_id)
+
+    for line in lines:
+        if not await uow.products.reserve_stock(line.product_id, line.amount):
+            raise market.common.errors.OutOfStockError(
+                f'Not enough stock of a product with id={line.product_id}',
+            )
+
+    order = await uow.orders.add(models.Order(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        total_rub=summary.total_rub,
+    ))
+    items = [
+        await uow.order_items.add(models.OrderItem(
+            id=uuid.uuid4(),
+            order_id=order.id,
+            product_id=line.product_id,
+            amount=line.amount,
+            price_rub=line.price_rub,
+        ))
+        for line in lines
+    ]
+    deleted = await uow.cart.delete_amounts(
+        user_id,
+        {line.cart_item_id: line.amount for line in lines},
+    )
+
+    if deleted != len(lines):
+        raise market.common.errors.CartChangedError(
+            'Your cart was changed during the checkout, please try again',
+        )
+
+    return order, items
@@ -0,0 +1,7 @@
+from .abstract import Storage
+from .abstract import StoredObject
+from .local import LocalStorage
+from .local import MmapStorage
+from .s3 import S3Storage
+from .factory import create_s3_storage
+from .factory import create_storage
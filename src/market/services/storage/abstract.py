@@ -0,0 +1,85 @@
+import dataclasses
+from datetime import datetime
+from typing import AsyncIterator
+from typing import Optional
+
+
+@dataclasses.dataclass(frozen=True)
+class StoredObject:
+    name: str
+    size: int
+    modified_at: datetime
+
+
+class Storage:
+    """Abstract media storage
+
+    Objects are addressed by names which are `/` separated relative paths
+    (e.g. `ab/cd/abcd...ef.png`).
+    """
+    # Directory for temporary files which are cheap to `put_file` from,
+    # None means the system default one
+    temp_directory: Optional[str] = None
+
+
+    async def exists(self, name: str) -> bool:
+        ...
+    
+
+    async def stat(self, name: str) -> StoredObject:
+        """
+        Raises:
+            ObjectNotFoundError: Object doesn't exist
+        """
+        ...
+    
+
+    async def get(self, name: str) -> bytes:
+        """
+        Raises:
+            ObjectNotFoundError: Object doesn't exist
+        """
+        ...
+    
+
+    def iter_chunks(
+        self,
+        name: str,
+        chunk_size: int,
+        offset: int = 0,
+        count: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Reads `count` bytes of the object (up to its end by default)
+        starting from `offset`
+
+        Raises:
+            ObjectNotFoundError: Object doesn't exist
+        """
+        ...
+    
+
+    async def put(self, name: str, data: bytes) -> None:
+        ...
+    
+
+    async def put_file(self, name: str, path: str) -> None:
+        """Stores contents of a local file. The file may be moved by the
+        storage, so it must not be used afterwards
+        """
+        ...
+    
+
+    async def delete(self, name: str) -> None:
+        """Deletes the object, does nothing if it doesn't exist"""
+        ...
+    
+
+    def get_local_path(self, name: str) -> Optional[str]:
+        """Returns the path of the object in the local file system, or None
+        if the storage isn't local
+        """
+        ...
+    
+
+    async def close(self) -> None:
+        ...
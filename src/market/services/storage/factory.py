@@ -0,0 +1,46 @@
+from typing import Optional
+
+import market.config
+from market.services.storage import abstract
+from market.services.storage import local
+from market.services.storage import s3
+
+
+# Storages of files in the media folder
+LOCAL_STORAGES = {
+    'local': local.LocalStorage,
+    'mmap': local.MmapStorage,
+}
+
+
+def create_s3_storage(settings: market.config.S3Settings) -> s3.S3Storage:
+    return s3.S3Storage(
+        endpoint_url=settings.endpoint_url,
+        bucket=settings.bucket,
+        access_key_id=settings.access_key_id,
+        secret_access_key=settings.secret_access_key,
+        region=settings.region,
+        part_size=settings.part_size,
+    )
+
+
+def create_storage(
+    backend: str,
+    media_path: Optional[str],
+) -> abstract.Storage:
+    """Creates a storage of the backend (see `get_media_storage_backend`)
+
+    Raises:
+        RuntimeError: Backend is unknown or the media folder of a local
+            one is not specified
+    """
+    if backend == 's3':
+        return create_s3_storage(market.config.get_s3_settings())
+
+    if backend not in LOCAL_STORAGES:
+        raise RuntimeError(f'Unknown media storage: {backend}')
+
+    if media_path is None:
+        raise RuntimeError('MEDIA_PATH is not specified')
+
+    return LOCAL_STORAGES[backend](media_path)
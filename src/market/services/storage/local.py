@@ -0,0 +1,242 @@
+import functools
+import mmap
+import os
+import tempfile
+from datetime import datetime
+from datetime import timezone
+from typing import AsyncIterator
+from typing import Optional
+
+import anyio.to_thread
+
+import market.common.errors
+from market.services.storage import abstract
+
+
+class LocalStorage(abstract.Storage):
+    """Storage of files in a local folder. Blocking file system calls are
+    made in worker threads
+    """
+    root: str
+
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.realpath(root)
+        self.temp_directory = self.root
+    
+
+    def get_local_path(self, name: str) -> str:
+        """
+        Raises:
+            ObjectNotFoundError: Name points outside of the storage folder
+                or to a hidden (e.g. temporary) file
+        """
+        parts = name.split('/')
+
+        if any(not part or part.startswith('.') for part in parts):
+            raise market.common.errors.ObjectNotFoundError(
+                f'Invalid object name: {name}',
+            )
+
+        path = os.path.realpath(os.path.join(self.root, *parts))
+
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise market.common.errors.ObjectNotFoundError(
+                f'Invalid object name: {name}',
+            )
+
+        return path
+    
+
+    async def exists(self, name: str) -> bool:
+        path = self.get_local_path(name)
+        return await anyio.to_thread.run_sync(os.path.isfile, path)
+    
+
+    async def stat(self, name: str) -> abstract.StoredObject:
+        path = self.get_local_path(name)
+
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise market.common.errors.ObjectNotFoundError(
+                f'Unable to find an object with name={name}',
+            ) from None
+
+        return abstract.StoredObject(
+            name=name,
+            size=stat_result.st_size,
+            modified_at=datetime.fromtimestamp(
+                stat_result.st_mtime,
+                tz=timezone.utc,
+            ),
+        )
+    
+
+    async def get(self, name: str) -> bytes:
+        path = self.get_local_path(name)
+        return await anyio.to_thread.run_sync(self._read, path, name)
+    
+
+    async def iter_chunks(
+        self,
+        name: str,
+        chunk_size: int,
+        offset: int = 0,
+        count: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        path = self.get_local_path(name)
+
+        try:
+            file = await anyio.open_file(path, 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            raise market.common.errors.ObjectNotFoundError(
+                f'Unable to find an object with name={name}',
+            ) from None
+
+        async with file:
+            await file.seek(offset)
+
+            while count is None or count > 0:
+                size = chunk_size if count is None else min(chunk_size, count)
+                chunk = await file.read(size)
+
+                if not chunk:
+                    break
+
+                if count is not None:
+                    count -= len(chunk)
+
+                yield chunk
+    
+
+    async def put(self, name: str, data: bytes) -> None:
+        path = self.get_local_path(name)
+        await anyio.to_thread.run_sync(self._write, path, data)
+    
+
+    async def put_file(self, name: str, path: str) -> None:
+        destination = self.get_local_path(name)
+        await anyio.to_thread.run_sync(self._move, path, destination)
+    
+
+    async def delete(self, name: str) -> None:
+        path = self.get_local_path(name)
+        await anyio.to_thread.run_sync(self._remove, path)
+    
+
+    async def close(self) -> None:
+        pass
+    
+
+    def _read(self, path: str, name: str) -> bytes:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, NotADirectoryError):
+            raise market.common.errors.ObjectNotFoundError(
+                f'Unable to find an object with name={name}',
+            ) from None
+    
+
+    def _write(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(prefix='.', dir=directory)
+
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(data)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove(temp_path)
+            raise
+    
+
+    def _move(self, source: str, destination: str) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+
+        try:
+            # Atomic when both paths are on the same file system
+            os.replace(source, destination)
+        except OSError:
+            with open(source, 'rb') as f:
+                self._write(destination, f.read())
+
+            os.remove(source)
+    
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class MmapStorage(LocalStorage):
+    """Local storage which reads files through memory maps
+
+    Chunks are sliced from maps of the files instead of being read with
+    system calls, which pays off for hot files read many times (e.g.
+    thumbnails) and for ranges of big ones.
+    """
+
+
+    async def get(self, name: str) -> bytes:
+        path = self.get_local_path(name)
+        read = functools.partial(self._read_range, path, name, 0, None)
+        return await anyio.to_thread.run_sync(read)
+    
+
+    async def iter_chunks(
+        self,
+        name: str,
+        chunk_size: int,
+        offset: int = 0,
+        count: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        path = self.get_local_path(name)
+        view = await anyio.to_thread.run_sync(self._map, path, name)
+
+        try:
+            end = len(view) if count is None else min(len(view), offset + count)
+
+            for start in range(offset, end, chunk_size):
+                yield bytes(view[start:min(start + chunk_size, end)])
+        finally:
+            view.release()
+    
+
+    def _read_range(
+        self,
+        path: str,
+        name: str,
+        offset: int,
+        count: Optional[int],
+    ) -> bytes:
+        view = self._map(path, name)
+
+        try:
+            end = len(view) if count is None else offset + count
+            return bytes(view[offset:end])
+        finally:
+            view.release()
+    
+
+    def _map(self, path: str, name: str) -> memoryview:
+        """Maps the file into memory. The map stays alive until the returned
+        view is released
+        """
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b'')
+
+                file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, NotADirectoryError):
+            raise market.common.errors.ObjectNotFoundError(
+                f'Unable to find an object with name={name}',
+            ) from None
+
+        return memoryview(file_map)
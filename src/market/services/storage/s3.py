@@ -0,0 +1,430 @@
+"""Storage in S3-compatible object stores
+
+Requests are signed with AWS Signature Version 4 and sent through a shared
+HTTP client, so connections are reused between requests. Files bigger than
+a part are uploaded in parts with multipart uploads.
+"""
+import email.utils
+import hashlib
+import hmac
+import os
+import urllib.parse
+import xml.etree.ElementTree
+import xml.sax.saxutils
+from datetime import datetime
+from datetime import timezone
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import anyio
+import anyio.to_thread
+import httpx
+
+import market.common.errors
+from market.services.storage import abstract
+
+
+# Minimum part size allowed by S3, except for the last part
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+XML_NAMESPACE = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+
+
+def quote(value: str, safe: str = '-_.~') -> str:
+    """Percent-encodes a value the way SigV4 canonical requests expect"""
+    return urllib.parse.quote(value, safe=safe)
+
+
+def sign_request(
+    method: str,
+    host: str,
+    path: str,
+    params: Dict[str, str],
+    headers: Dict[str, str],
+    payload_hash: str,
+    access_key_id: str,
+    secret_access_key: str,
+    region: str,
+    now: datetime,
+    service: str = 's3',
+) -> Dict[str, str]:
+    """Signs a request with AWS Signature Version 4
+
+    Args:
+        path: URL-encoded request path
+        headers: Headers to sign besides `host` and `x-amz-*` ones, which
+            are always signed
+
+    Returns:
+        Headers to add to the request, including `Authorization`
+    """
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = now.strftime('%Y%m%d')
+    signed_headers = {
+        name.lower(): ' '.join(value.split())
+        for name, value in headers.items()
+    }
+    signed_headers['host'] = host
+    signed_headers['x-amz-content-sha256'] = payload_hash
+    signed_headers['x-amz-date'] = amz_date
+    header_names = sorted(signed_headers)
+
+    canonical_query = '&'.join(
+        f'{quote(key)}={quote(value)}'
+        for key, value in sorted(params.items())
+    )
+    canonical_headers = ''.join(
+        f'{name}:{signed_headers[name]}\n' for name in header_names
+    )
+    canonical_request = '\n'.join([
+        method,
+        path,
+        canonical_query,
+        canonical_headers,
+        ';'.join(header_names),
+        payload_hash,
+    ])
+
+    scope = f'{date}/{region}/{service}/aws4_request'
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256',
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+
+    key = f'AWS4{secret_access_key}'.encode()
+
+    for message in (date, region, service, 'aws4_request'):
+        key = hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+    signature = hmac.new(
+        key,
+        string_to_sign.encode(),
+        hashlib.sha256,
+    ).hexdigest()
+
+    return {
+        'x-amz-content-sha256': payload_hash,
+        'x-amz-date': amz_date,
+        'authorization': (
+            f'AWS4-HMAC-SHA256 Credential={access_key_id}/{scope}, '
+            f'SignedHeaders={";".join(header_names)}, '
+            f'Signature={signature}'
+        ),
+    }
+
+
+class S3Storage(abstract.Storage):
+    """Storage in a bucket of an S3-compatible object store. Objects are
+    addressed with path-style URLs (`<endpoint>/<bucket>/<name>`)
+    """
+    endpoint_url: str
+    bucket: str
+    access_key_id: str
+    secret_access_key: str
+    region: str
+    part_size: int
+    client: httpx.AsyncClient
+
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = 'us-east-1',
+        part_size: int = 8 * 1024 * 1024,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f'Part size must be at least {MIN_PART_SIZE}')
+
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.part_size = part_size
+        self.owns_client = client is None
+        self.client = client if client is not None else httpx.AsyncClient()
+    
+
+    def get_local_path(self, name: str) -> Optional[str]:
+        return None
+    
+
+    async def exists(self, name: str) -> bool:
+        response = await self._request('HEAD', name, expected=(200, 404))
+        return response.status_code == 200
+    
+
+    async def stat(self, name: str) -> abstract.StoredObject:
+        response = await self._request('HEAD', name)
+        return abstract.StoredObject(
+            name=name,
+            size=int(response.headers['content-length']),
+            modified_at=parse_http_date(response.headers.get('last-modified')),
+        )
+    
+
+    async def get(self, name: str) -> bytes:
+        response = await self._request('GET', name)
+        return response.content
+    
+
+    async def iter_chunks(
+        self,
+        name: str,
+        chunk_size: int,
+        offset: int = 0,
+        count: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        headers = {}
+
+        if offset or count is not None:
+            end = '' if count is None else str(offset + count - 1)
+            headers['range'] = f'bytes={offset}-{end}'
+
+        request = self._build_request('GET', name, headers=headers)
+
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            raise market.common.errors.StorageError(
+                f'Unable to reach the storage: {e}',
+            ) from e
+
+        try:
+            self._check_response(response, name, expected=(200, 206))
+
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+        except httpx.HTTPError as e:
+            raise market.common.errors.StorageError(
+                f'Unable to read {name} from the storage: {e}',
+            ) from e
+        finally:
+            await response.aclose()
+    
+
+    async def put(self, name: str, data: bytes) -> None:
+        await self._request('PUT', name, content=data)
+    
+
+    async def put_file(self, name: str, path: str) -> None:
+        size = await anyio.to_thread.run_sync(os.path.getsize, path)
+
+        async with await anyio.open_file(path, 'rb') as f:
+            if size <= self.part_size:
+                await self.put(name, await f.read())
+                return
+
+            upload_id = await self._create_multipart_upload(name)
+
+            try:
+                etags = []
+
+                while True:
+                    part = await f.read(self.part_size)
+
+                    if not part:
+                        break
+
+                    etag = await self._upload_part(
+                        name,
+                        upload_id,
+                        len(etags) + 1,
+                        part,
+                    )
+                    etags.append(etag)
+
+                await self._complete_multipart_upload(name, upload_id, etags)
+            except BaseException:
+                with anyio.CancelScope(shield=True):
+                    await self._abort_multipart_upload(name, upload_id)
+
+                raise
+    
+
+    async def delete(self, name: str) -> None:
+        await self._request('DELETE', name, expected=(200, 204, 404))
+    
+
+    async def close(self) -> None:
+        if self.owns_client:
+            await self.client.aclose()
+    
+
+    async def _create_multipart_upload(self, name: str) -> str:
+        response = await self._request('POST', name, params={'uploads': ''})
+        root = xml.etree.ElementTree.fromstring(response.content)
+        upload_id = root.findtext(f'{XML_NAMESPACE}UploadId')
+
+        if upload_id is None:
+            # Some stores don't qualify elements with the namespace
+            upload_id = root.findtext('UploadId')
+
+        if not upload_id:
+            raise market.common.errors.StorageError(
+                f'Unable to start a multipart upload of {name}',
+            )
+
+        return upload_id
+    
+
+    async def _upload_part(
+        self,
+        name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+    ) -> str:
+        response = await self._request(
+            'PUT',
+            name,
+            params={'partNumber': str(part_number), 'uploadId': upload_id},
+            content=data,
+        )
+        return response.headers['etag']
+    
+
+    async def _complete_multipart_upload(
+        self,
+        name: str,
+        upload_id: str,
+        etags: List[str],
+    ) -> None:
+        parts = ''.join(
+            f'<Part><PartNumber>{number}</PartNumber>'
+            f'<ETag>{xml.sax.saxutils.escape(etag)}</ETag></Part>'
+            for number, etag in enumerate(etags, start=1)
+        )
+        body = (
+            f'<CompleteMultipartUpload xmlns="{XML_NAMESPACE[1:-1]}">'
+            f'{parts}</CompleteMultipartUpload>'
+        )
+        response = await self._request(
+            'POST',
+            name,
+            params={'uploadId': upload_id},
+            content=body.encode(),
+        )
+
+        # Completion errors may be reported with 200 and an error document
+        if b'<Error>' in response.content:
+            raise market.common.errors.StorageError(
+                f'Unable to complete a multipart upload of {name}',
+            )
+    
+
+    async def _abort_multipart_upload(self, name: str, upload_id: str) -> None:
+        """Drops uploaded parts. Failures are ignored, as the upload has
+        already failed and stores clean up abandoned uploads anyway
+        """
+        try:
+            await self._request(
+                'DELETE',
+                name,
+                params={'uploadId': upload_id},
+                expected=(204, 404),
+            )
+        except market.common.errors.StorageError:
+            pass
+    
+
+    def _get_object_path(self, name: str) -> str:
+        return '/' + quote(f'{self.bucket}/{name}', safe='-_.~/')
+    
+
+    def _build_request(
+        self,
+        method: str,
+        name: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: bytes = b'',
+    ) -> httpx.Request:
+        params = params or {}
+        headers = dict(headers or {})
+        path = self._get_object_path(name)
+        url = httpx.URL(self.endpoint_url + path)
+        query = '&'.join(
+            f'{quote(key)}={quote(value)}' for key, value in params.items()
+        )
+
+        if query:
+            url = url.copy_with(query=query.encode())
+
+        payload_hash = hashlib.sha256(content).hexdigest()
+        headers.update(sign_request(
+            method=method,
+            host=url.netloc.decode(),
+            path=path,
+            params=params,
+            headers=headers,
+            payload_hash=payload_hash,
+            access_key_id=self.access_key_id,
+            secret_access_key=self.secret_access_key,
+            region=self.region,
+            now=datetime.now(timezone.utc),
+        ))
+        return self.client.build_request(
+            method,
+            url,
+            headers=headers,
+            content=content if content else None,
+        )
+    
+
+    async def _request(
+        self,
+        method: str,
+        name: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: bytes = b'',
+        expected: Tuple[int, ...] = (200,),
+    ) -> httpx.Response:
+        request = self._build_request(method, name, params, headers, content)
+
+        try:
+            response = await self.client.send(request)
+        except httpx.HTTPError as e:
+            raise market.common.errors.StorageError(
+                f'Unable to reach the storage: {e}',
+            ) from e
+
+        self._check_response(response, name, expected)
+        return response
+    
+
+    def _check_response(
+        self,
+        response: httpx.Response,
+        name: str,
+        expected: Tuple[int, ...],
+    ) -> None:
+        if response.status_code in expected:
+            return
+
+        if response.status_code == 404:
+            raise market.common.errors.ObjectNotFoundError(
+                f'Unable to find an object with name={name}',
+            )
+
+        raise market.common.errors.StorageError(
+            f'Storage responded with {response.status_code} to a request '
+            f'of {name}',
+        )
+
+
+def parse_http_date(value: Optional[str]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+
+    return email.utils.parsedate_to_datetime(value)
@@ -1,2 +1,4 @@
+from .abstract import AsyncUnitOfWork
 from .abstract import UnitOfWork
+from .sqlalchemy import AsyncSQLAlchemyUnitOfWork
 from .sqlalchemy import SQLAlchemyUnitOfWork
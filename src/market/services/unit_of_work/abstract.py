@@ -1,5 +1,6 @@
 import market.modules.cart.repositories
 import market.modules.image.repositories
+import market.modules.order.repositories
 import market.modules.product.repositories
 import market.modules.product_image.repositories
 import market.modules.user.repositories
@@ -9,6 +10,8 @@ class UnitOfWork:
     """Abstract Unit Of Work pattern class"""
     cart: market.modules.cart.repositories.CartRepository
     images: market.modules.image.repositories.ImageRepository
+    orders: market.modules.order.repositories.OrderRepository
+    order_items: market.modules.order.repositories.OrderItemRepository
     products: market.modules.product.repositories.ProductRepository
     product_images: market.modules.product_image.\
         repositories.ProductImageRepository
@@ -29,3 +32,31 @@ class UnitOfWork:
 
     def rollback(self) -> None:
         ...
+
+
+class AsyncUnitOfWork:
+    """Abstract asynchronous Unit Of Work pattern class"""
+    cart: market.modules.cart.repositories.AsyncCartRepository
+    images: market.modules.image.repositories.AsyncImageRepository
+    orders: market.modules.order.repositories.AsyncOrderRepository
+    order_items: market.modules.order.repositories.AsyncOrderItemRepository
+    products: market.modules.product.repositories.AsyncProductRepository
+    product_images: market.modules.product_image.\
+        repositories.AsyncProductImageRepository
+    users: market.modules.user.repositories.AsyncUserRepository
+
+
+    async def __aenter__(self) -> 'AsyncUnitOfWork':
+        ...
+    
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        ...
+    
+
+    async def commit(self) -> None:
+        ...
+    
+
+    async def rollback(self) -> None:
+        ...
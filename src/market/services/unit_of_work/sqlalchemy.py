@@ -1,9 +1,14 @@
+from typing import Any
 from typing import Callable
+from typing import Dict
+from typing import Optional
 
+import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
 
 import market.modules.cart.repositories
 import market.modules.image.repositories
+import market.modules.order.repositories
 import market.modules.product.repositories
 import market.modules.product_image.repositories
 import market.modules.user.repositories
@@ -11,10 +16,56 @@ import market.modules.user.repositories
 from market.services.unit_of_work import abstract
 
 
+class LazyRepository:
+    """Unit of work attribute which creates a repository over the unit of
+    work session the first time it's accessed
+    """
+    repository_class: type
+    name: str
+
+
+    def __init__(self, repository_class: type) -> None:
+        self.repository_class = repository_class
+    
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+    
+
+    def __get__(self, uow, owner: type):
+        if uow is None:
+            return self
+
+        repository = uow.repositories.get(self.name)
+
+        if repository is None:
+            repository = self.repository_class(uow.session)
+            uow.repositories[self.name] = repository
+
+        return repository
+
+
 class SQLAlchemyUnitOfWork(abstract.UnitOfWork):
-    """Unit Of Work wrapper over SQLAlchemy"""
+    """Unit Of Work wrapper over SQLAlchemy
+
+    The session and repositories are created on first access, so units of
+    work which don't touch the database cost nothing.
+    """
     session_factory: Callable[[], sqlalchemy.orm.Session]
-    session: sqlalchemy.orm.Session
+    repositories: Dict[str, Any]
+    cart = LazyRepository(market.modules.cart.repositories.CartRepository)
+    images = LazyRepository(market.modules.image.repositories.ImageRepository)
+    orders = LazyRepository(market.modules.order.repositories.OrderRepository)
+    order_items = LazyRepository(
+        market.modules.order.repositories.OrderItemRepository,
+    )
+    products = LazyRepository(
+        market.modules.product.repositories.ProductRepository,
+    )
+    product_images = LazyRepository(
+        market.modules.product_image.repositories.ProductImageRepository,
+    )
+    users = LazyRepository(market.modules.user.repositories.UserRepository)
 
 
     def __init__(
@@ -22,34 +73,105 @@ class SQLAlchemyUnitOfWork(abstract.UnitOfWork):
         session_factory: Callable[[], sqlalchemy.orm.Session],
     ) -> None:
         self.session_factory = session_factory
+        self._session: Optional[sqlalchemy.orm.Session] = None
+        self.repositories = {}
+    
 
+    @property
+    def session(self) -> sqlalchemy.orm.Session:
+        if self._session is None:
+            self._session = self.session_factory()
+
+        return self._session
+    
 
     def __enter__(self) -> abstract.UnitOfWork:
-        self.session = self.session_factory()
-        self.cart = market.modules.cart.repositories.CartRepository(
-            self.session,
-        )
-        self.images = market.modules.image.repositories.ImageRepository(
-            self.session,
-        )
-        self.products = market.modules.product.repositories.ProductRepository(
-            self.session,
-        )
-        self.product_images = market.modules.product_image.\
-            repositories.ProductImageRepository(self.session)
-        self.users = market.modules.user.repositories.UserRepository(
-            self.session,
-        )
         return self
     
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.close()
+        if self._session is not None:
+            self._session.close()
+
+        self._session = None
+        self.repositories.clear()
     
 
     def commit(self) -> None:
-        self.session.commit()
+        if self._session is not None:
+            self._session.commit()
     
 
     def rollback(self) -> None:
-        self.session.rollback()
+        if self._session is not None:
+            self._session.rollback()
+
+
+class AsyncSQLAlchemyUnitOfWork(abstract.AsyncUnitOfWork):
+    """Unit Of Work wrapper over asyncio SQLAlchemy
+
+    The session and repositories are created on first access, so units of
+    work which don't touch the database cost nothing.
+    """
+    session_factory: Callable[[], sqlalchemy.ext.asyncio.AsyncSession]
+    repositories: Dict[str, Any]
+    cart = LazyRepository(
+        market.modules.cart.repositories.AsyncCartRepository,
+    )
+    images = LazyRepository(
+        market.modules.image.repositories.AsyncImageRepository,
+    )
+    orders = LazyRepository(
+        market.modules.order.repositories.AsyncOrderRepository,
+    )
+    order_items = LazyRepository(
+        market.modules.order.repositories.AsyncOrderItemRepository,
+    )
+    products = LazyRepository(
+        market.modules.product.repositories.AsyncProductRepository,
+    )
+    product_images = LazyRepository(
+        market.modules.product_image.repositories.AsyncProductImageRepository,
+    )
+    users = LazyRepository(
+        market.modules.user.repositories.AsyncUserRepository,
+    )
+
+
+    def __init__(
+        self,
+        session_factory: Callable[[], sqlalchemy.ext.asyncio.AsyncSession],
+    ) -> None:
+        self.session_factory = session_factory
+        self._session: Optional[sqlalchemy.ext.asyncio.AsyncSession] = None
+        self.repositories = {}
+    
+
+    @property
+    def session(self) -> sqlalchemy.ext.asyncio.AsyncSession:
+        if self._session is None:
+            self._session = self.session_factory()
+
+        return self._session
+    
+
+    async def __aenter__(self) -> abstract.AsyncUnitOfWork:
+        return self
+    
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._session is not None:
+            await self._session.close()
+
+        self._session = None
+        self.repositories.clear()
+    
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+    
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
@@ -1,9 +1,15 @@
 from .auth import LightAuthService
 from .auth import TokenAuth
+from .database import create_async_session_factory
 from .repositories import FakeRepository
 from .repositories import FakeCartRepository
 from .repositories import FakeImageRepository
+from .repositories import FakeOrderRepository
+from .repositories import FakeOrderItemRepository
 from .repositories import FakeProductRepository
 from .repositories import FakeProductImageRepository
 from .repositories import FakeUserRepository
 from .unit_of_work import FakeUnitOfWork
+from .unit_of_work import FakeAsyncRepository
+from .unit_of_work import FakeAsyncUnitOfWork
+from .s3 import FakeS3
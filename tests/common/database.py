@@ -0,0 +1,26 @@
+import sqlalchemy.ext.asyncio
+import sqlalchemy.pool
+
+import market.database.orm
+
+
+IN_MEMORY_URL = 'sqlite+aiosqlite://'
+
+
+async def create_async_session_factory(url: str = IN_MEMORY_URL):
+    """Returns an engine of a database with all of the tables and its
+    session factory configured as the default one. Connections to
+    in-memory databases are shared, so the database outlives sessions
+    """
+    engine = sqlalchemy.ext.asyncio.create_async_engine(
+        url,
+        poolclass=sqlalchemy.pool.StaticPool if url == IN_MEMORY_URL else None,
+    )
+
+    async with engine.begin() as connection:
+        await connection.run_sync(market.database.orm.Base.metadata.create_all)
+
+    return engine, sqlalchemy.ext.asyncio.async_sessionmaker(
+        bind=engine,
+        expire_on_commit=False,
+    )
@@ -1,14 +1,23 @@
 import datetime
 import uuid
+from typing import Any
+from typing import AsyncIterator
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Generic
 from typing import Optional
+from typing import Set
+from typing import Tuple
 from typing import TypeVar
 
 import market.modules.cart.domain.models
 import market.modules.image.domain.models
+import market.modules.order.domain.models
 import market.modules.product.domain.models
+import market.modules.product.repositories
+import market.modules.product.search
 import market.modules.product_image.domain.models
 import market.modules.user.domain.models
 import market.services
@@ -42,6 +51,20 @@ class FakeRepository(Generic[T]):
         return filtered_items
     
 
+    def iterate(self, batch_size: int, **filters) -> Iterator[T]:
+        return iter(self.list(**filters))
+    
+
+    def stream(self, batch_size: int, **filters) -> AsyncIterator[T]:
+        items = self.list(**filters)
+
+        async def iterate():
+            for item in items:
+                yield item
+        
+        return iterate()
+    
+
     def get(self, item_id: uuid.UUID) -> T:
         if item_id not in self.items:
             raise errors.NotFoundError(
@@ -51,6 +74,10 @@ class FakeRepository(Generic[T]):
         return self.items[item_id]
     
 
+    def get_many(self, item_ids: Iterable[uuid.UUID]) -> List[T]:
+        return [self.get(item_id) for item_id in item_ids]
+    
+
     def add(self, item: T) -> T:
         if item.id in self.items: # type: ignore
             raise errors.AlreadyExistsError(
@@ -78,11 +105,149 @@ class FakeRepository(Generic[T]):
 
 
 class FakeCartRepository(FakeRepository[market.modules.cart.domain.models.CartItem]):
-    pass
+    products: Optional['FakeProductRepository']
+
+
+    def __init__(
+        self,
+        items: Optional[List[market.modules.cart.domain.models.CartItem]] = None,
+        products: Optional['FakeProductRepository'] = None,
+    ) -> None:
+        super().__init__(items)
+        self.products = products
+    
+
+    def get_summary(
+        self,
+        user_id: uuid.UUID,
+    ) -> market.modules.cart.domain.models.CartSummary:
+        lines = []
+
+        for item in self.list(user_id=user_id):
+            product = self.products.get(item.product_id)
+            lines.append(market.modules.cart.domain.models.CartLine(
+                cart_item_id=item.id,
+                product_id=product.id,
+                title=product.title,
+                price_rub=product.price_rub,
+                amount=item.amount,
+                stock=product.stock,
+                is_available=product.is_active and product.stock >= item.amount,
+                total_rub=product.price_rub * item.amount,
+            ))
+        
+        return market.modules.cart.domain.models.CartSummary(
+            lines=lines,
+            total_rub=sum(line.total_rub for line in lines),
+        )
+    
+
+    def merge(
+        self,
+        item: market.modules.cart.domain.models.CartItem,
+        on_conflict: str = 'error',
+    ) -> Optional[uuid.UUID]:
+        existing = self.list(user_id=item.user_id, product_id=item.product_id)
+
+        if not existing:
+            return self.add(item).id
+        
+        existing_item, = existing
+
+        if on_conflict == 'error':
+            return None
+        
+        if on_conflict == 'increment':
+            existing_item.amount += item.amount
+        else:
+            existing_item.amount = item.amount
+
+        return existing_item.id
+    
+
+    def merge_many(
+        self,
+        items: List[market.modules.cart.domain.models.CartItem],
+        on_conflict: str = 'error',
+    ) -> List[Optional[uuid.UUID]]:
+        return [self.merge(item, on_conflict) for item in items]
+    
+
+    def update_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> Set[uuid.UUID]:
+        updated_product_ids = set()
+
+        for item in self.list(user_id=user_id):
+            if item.product_id in amounts:
+                item.amount = amounts[item.product_id]
+                updated_product_ids.add(item.product_id)
+        
+        return updated_product_ids
+    
+
+    def delete_products(
+        self,
+        user_id: uuid.UUID,
+        product_ids: Iterable[uuid.UUID],
+    ) -> None:
+        product_ids = set(product_ids)
+
+        for item in self.list(user_id=user_id):
+            if item.product_id in product_ids:
+                self.delete(item)
+    
+
+    def delete_amounts(
+        self,
+        user_id: uuid.UUID,
+        amounts: Dict[uuid.UUID, int],
+    ) -> int:
+        deleted = 0
+
+        for item in self.list(user_id=user_id):
+            if amounts.get(item.id) == item.amount:
+                self.delete(item)
+                deleted += 1
+        
+        return deleted
 
 
 class FakeImageRepository(FakeRepository[market.modules.image.domain.models.Image]):
-    pass
+    product_images: Optional['FakeProductImageRepository']
+
+
+    def __init__(
+        self,
+        items: Optional[List[market.modules.image.domain.models.Image]] = None,
+        product_images: Optional['FakeProductImageRepository'] = None,
+    ) -> None:
+        super().__init__(items)
+        self.product_images = product_images
+    
+
+    def list_by_products(
+        self,
+        product_ids: Iterable[uuid.UUID],
+    ) -> List[Tuple[uuid.UUID, market.modules.image.domain.models.Image]]:
+        product_ids = set(product_ids)
+        return [
+            (product_image.product_id, self.get(product_image.image_id))
+            for product_image in self.product_images.list()
+            if product_image.product_id in product_ids
+        ]
+    
+
+    def get_variants_by_content_hash(self, content_hash: str) -> Dict[str, str]:
+        return next(
+            (
+                item.variants for item in self.list(content_hash=content_hash)
+                if item.variants
+            ),
+            {},
+        )
 
 
 class FakeProductRepository(FakeRepository[market.modules.product.domain.models.Product]):
@@ -93,6 +258,133 @@ class FakeProductRepository(FakeRepository[market.modules.product.domain.models.
         item.added = datetime.datetime.now()
         item.last_updated = datetime.datetime.now()
         return super().add(item)
+    
+
+    def list(
+        self,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        order_by: str = 'added',
+        descending: bool = False,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        title_prefix: Optional[str] = None,
+        **filters,
+    ) -> List[market.modules.product.domain.models.Product]:
+        sort_attribute = market.modules.product.repositories.\
+            SORT_ATTRIBUTES[order_by]
+        get_keyset = lambda item: (getattr(item, sort_attribute), item.id)
+
+        items = super().list(**filters)
+        items.sort(key=get_keyset, reverse=descending)
+
+        if min_price is not None:
+            items = [item for item in items if item.price_rub >= min_price]
+        
+        if max_price is not None:
+            items = [item for item in items if item.price_rub <= max_price]
+        
+        if in_stock is not None:
+            items = [item for item in items if (item.stock > 0) == in_stock]
+        
+        if title_prefix:
+            items = [
+                item for item in items
+                if item.title.startswith(title_prefix)
+            ]
+
+        if after is not None:
+            keyset = market.modules.product.repositories.parse_cursor(
+                after,
+                order_by,
+                descending,
+            )
+            if descending:
+                items = [item for item in items if get_keyset(item) < keyset]
+            else:
+                items = [item for item in items if get_keyset(item) > keyset]
+        
+        if limit is not None:
+            items = items[:limit]
+
+        return items
+    
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+    ) -> List[market.modules.product.domain.models.Product]:
+        index = market.modules.product.search.InvertedIndex()
+
+        for item in self.items.values():
+            index.add(item.id, item.title, item.description)
+
+        found_ids = index.search(query, limit, offset)
+        return [self.items[item_id] for item_id in found_ids]
+    
+
+    def add_many(self, products: List[Dict[str, Any]]) -> None:
+        for fields in products:
+            self.add(market.modules.product.domain.models.Product(**fields))
+    
+
+    def update_many(
+        self,
+        owner_id: uuid.UUID,
+        products: List[Dict[str, Any]],
+    ) -> Set[uuid.UUID]:
+        updated_ids = set()
+
+        for fields in products:
+            item = self.items.get(fields['id'])
+
+            if item is not None and item.owner_id == owner_id:
+                self.update(item, **fields)
+                updated_ids.add(item.id)
+        
+        return updated_ids
+    
+
+    def reserve_stock(self, product_id: uuid.UUID, amount: int) -> bool:
+        item = self.get(product_id)
+
+        if not item.is_active or item.stock < amount:
+            return False
+        
+        item.stock -= amount
+        return True
+
+
+class FakeOrderRepository(FakeRepository[market.modules.order.domain.models.Order]):
+    def add(
+        self,
+        item: market.modules.order.domain.models.Order,
+    ) -> market.modules.order.domain.models.Order:
+        item.placed = datetime.datetime.now()
+        return super().add(item)
+    
+
+    def list(self, **filters) -> List[market.modules.order.domain.models.Order]:
+        items = super().list(**filters)
+        items.sort(key=lambda item: item.placed, reverse=True)
+        return items
+
+
+class FakeOrderItemRepository(
+    FakeRepository[market.modules.order.domain.models.OrderItem],
+):
+    def list_by_orders(
+        self,
+        order_ids: Iterable[uuid.UUID],
+    ) -> List[market.modules.order.domain.models.OrderItem]:
+        order_ids = set(order_ids)
+        return [
+            item for item in self.items.values()
+            if item.order_id in order_ids
+        ]
 
 
 class FakeProductImageRepository(
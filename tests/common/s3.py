@@ -0,0 +1,106 @@
+import hashlib
+import re
+import uuid
+from typing import Dict
+from typing import List
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+AUTHORIZATION_PATTERN = re.compile(
+    r'AWS4-HMAC-SHA256 Credential=\S+/\d{8}/[\w-]+/s3/aws4_request, '
+    r'SignedHeaders=[\w;-]+, Signature=[0-9a-f]{64}',
+)
+
+
+class FakeS3:
+    """In-memory stand-in of an S3-compatible store, served as an ASGI app
+
+    Requests must be signed and carry a valid payload hash, but signatures
+    themselves aren't verified.
+    """
+    objects: Dict[str, bytes]
+    uploads: Dict[str, Dict[int, bytes]]
+    requests: List[str]
+
+
+    def __init__(self) -> None:
+        self.objects = {}
+        self.uploads = {}
+        self.requests = []
+    
+
+    async def __call__(self, scope, receive, send) -> None:
+        request = Request(scope, receive)
+        response = await self.handle(request)
+        await response(scope, receive, send)
+    
+
+    async def handle(self, request: Request) -> Response:
+        body = await request.body()
+        authorization = request.headers.get('authorization', '')
+        payload_hash = request.headers.get('x-amz-content-sha256')
+
+        if AUTHORIZATION_PATTERN.fullmatch(authorization) is None:
+            return Response(status_code=403)
+
+        if payload_hash != hashlib.sha256(body).hexdigest():
+            return Response(status_code=400)
+
+        key = request.url.path
+        params = request.query_params
+        method = request.method
+        self.requests.append(f'{method} {key}')
+
+        if method == 'POST' and 'uploads' in params:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            return Response(
+                '<InitiateMultipartUploadResult '
+                'xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<UploadId>{upload_id}</UploadId>'
+                '</InitiateMultipartUploadResult>',
+            )
+
+        if method == 'PUT' and 'uploadId' in params:
+            parts = self.uploads[params['uploadId']]
+            parts[int(params['partNumber'])] = body
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            return Response(headers={'etag': etag})
+
+        if method == 'POST' and 'uploadId' in params:
+            parts = self.uploads.pop(params['uploadId'])
+            self.objects[key] = b''.join(parts[n] for n in sorted(parts))
+            return Response('<CompleteMultipartUploadResult/>')
+
+        if method == 'DELETE' and 'uploadId' in params:
+            self.uploads.pop(params['uploadId'], None)
+            return Response(status_code=204)
+
+        if method == 'PUT':
+            self.objects[key] = body
+            return Response()
+
+        if method == 'DELETE':
+            self.objects.pop(key, None)
+            return Response(status_code=204)
+
+        if key not in self.objects:
+            return Response(status_code=404)
+
+        data = self.objects[key]
+        headers = {'last-modified': 'Fri, 24 May 2013 00:00:00 GMT'}
+
+        if method == 'HEAD':
+            headers['content-length'] = str(len(data))
+            return Response(headers=headers)
+
+        byte_range = request.headers.get('range')
+
+        if byte_range is not None:
+            start, end = byte_range[len('bytes='):].split('-')
+            end = int(end) + 1 if end else len(data)
+            return Response(data[int(start):end], status_code=206)
+
+        return Response(data, headers=headers)
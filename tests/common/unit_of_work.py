@@ -5,3 +5,51 @@ class FakeUnitOfWork(unit_of_work.UnitOfWork):
     def __init__(self, **kwargs) -> None:
         for k, v in kwargs.items():
             setattr(self, k, v)
+
+
+class FakeAsyncRepository:
+    """Exposes methods of a fake repository as coroutines"""
+
+
+    def __init__(self, repository) -> None:
+        self.repository = repository
+    
+
+    def __getattr__(self, name):
+        attribute = getattr(self.repository, name)
+
+        if not callable(attribute):
+            return attribute
+
+        async def method(*args, **kwargs):
+            return attribute(*args, **kwargs)
+
+        return method
+
+
+class FakeAsyncUnitOfWork(unit_of_work.AsyncUnitOfWork):
+    """Asyncio view over the repositories of a fake unit of work"""
+
+
+    def __init__(self, uow: unit_of_work.UnitOfWork) -> None:
+        self.uow = uow
+    
+
+    def __getattr__(self, name):
+        return FakeAsyncRepository(getattr(self.uow, name))
+    
+
+    async def __aenter__(self) -> 'FakeAsyncUnitOfWork':
+        return self
+    
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        ...
+    
+
+    async def commit(self) -> None:
+        self.uow.commit()
+    
+
+    async def rollback(self) -> None:
+        self.uow.rollback()
@@ -1,12 +1,65 @@
+import fastapi
 import fastapi.testclient
 import pytest
+import sqlalchemy
+import sqlalchemy.orm
 
+import market.database.orm
 from market.apps.fastapi_app import deps
 from market.apps.fastapi_app import fastapi_main
 
 from . import common
 
 
+def get_fake_async_uow(uow=fastapi.Depends(deps.get_uow)):
+    return common.FakeAsyncUnitOfWork(uow)
+
+
+def get_fake_async_uow_factory(uow=fastapi.Depends(deps.get_uow)):
+    return lambda: common.FakeAsyncUnitOfWork(uow)
+
+
+@pytest.fixture(autouse=True)
+def fake_async_uow():
+    """Makes async endpoints and tasks use the fake unit of work of a test"""
+    overrides = fastapi_main.app.dependency_overrides
+    overrides[deps.get_async_uow] = get_fake_async_uow
+    overrides[deps.get_async_uow_factory] = get_fake_async_uow_factory
+    yield
+    overrides.pop(deps.get_async_uow, None)
+    overrides.pop(deps.get_async_uow_factory, None)
+
+
+@pytest.fixture(autouse=True)
+def disable_image_variants(monkeypatch):
+    """Image variants are generated only by the tests which enable them"""
+    monkeypatch.setenv('IMAGE_VARIANTS_ENABLED', 'false')
+
+
+@pytest.fixture(autouse=True)
+def media_url_root(monkeypatch):
+    """Root of URLs of images returned by endpoints"""
+    media_url_root = 'http://localhost/media/'
+    monkeypatch.setenv('MEDIA_URL_ROOT', media_url_root)
+    return media_url_root
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / 'market.db'
+
+
+@pytest.fixture
+def session_factory(database_path):
+    """Session factory of an SQLite database made for the test, configured
+    as the default one
+    """
+    engine = sqlalchemy.create_engine(f'sqlite:///{database_path}')
+    market.database.orm.Base.metadata.create_all(bind=engine)
+    yield sqlalchemy.orm.sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
 @pytest.fixture(scope='module')
 def app():
     yield fastapi_main.app
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 
 import pytest
@@ -60,3 +61,87 @@ def test_auth_service_register():
 
     with pytest.raises(ValueError):
         service.register_user(uuid.uuid4(), 'username', 'does_not_matter')
+
+
+def test_auth_service_get_user_cached():
+    user_repo = common.FakeUserRepository([])
+    user_cache = market.services.auth.UserCache(max_size=10, ttl=60)
+    service = market.services.auth.AuthServiceImpl(
+        user_repo, # type: ignore
+        user_cache=user_cache,
+    )
+    user_id = uuid.uuid4()
+    service.register_user(user_id, 'username', 'password')
+    token = service.login('username', 'password')
+    assert token is not None
+
+    assert service.get_user(token.access_token).id == user_id
+
+    # Cached user is returned without querying the repository
+    user_repo.delete(user_repo.get(user_id))
+    assert service.get_user(token.access_token).id == user_id
+
+    user_cache.invalidate_user(user_id)
+    assert service.get_user(token.access_token) is None
+
+
+def test_auth_service_get_user_async_cached():
+    user_repo = common.FakeUserRepository([])
+    user_cache = market.services.auth.UserCache(max_size=10, ttl=60)
+    service = market.services.auth.AuthServiceImpl(
+        user_repo, # type: ignore
+        user_cache=user_cache,
+    )
+    user_id = uuid.uuid4()
+    service.register_user(user_id, 'username', 'password')
+    token = service.login('username', 'password')
+    assert token is not None
+
+    # Services of asyncio endpoints are made over asyncio repositories
+    service.repo = common.FakeAsyncRepository(user_repo) # type: ignore
+    get_user = lambda: asyncio.run(service.get_user_async(token.access_token))
+
+    assert get_user().id == user_id
+
+    # Cached user is returned without querying the repository
+    user_repo.delete(user_repo.get(user_id))
+    assert get_user().id == user_id
+
+    user_cache.invalidate_user(user_id)
+    assert get_user() is None
+
+
+def test_user_cache_expiration():
+    now = 1000.0
+    user_cache = market.services.auth.UserCache(
+        max_size=2,
+        ttl=60,
+        clock=lambda: now,
+    )
+    user = models.User(id=uuid.uuid4(), username='username', password='hash')
+
+    user_cache.put('token', user, expires_at=now + 10)
+    assert user_cache.get('token') == user
+    assert user_cache.get('token') is not user
+
+    # Entry lives no longer than the token
+    now += 10
+    assert user_cache.get('token') is None
+
+    # Least recently used entries are evicted
+    user_cache.put('first', user)
+    user_cache.put('second', user)
+    user_cache.get('first')
+    user_cache.put('third', user)
+    assert user_cache.get('first') is not None
+    assert user_cache.get('second') is None
+    assert user_cache.get('third') is not None
+
+
+def test_auth_service_shares_hashing_context_and_settings():
+    user_repo = common.FakeUserRepository([])
+    first = market.services.auth.AuthServiceImpl(user_repo) # type: ignore
+    second = market.services.auth.AuthServiceImpl(user_repo) # type: ignore
+
+    assert first.pwd_context is second.pwd_context
+    assert first.settings is second.settings
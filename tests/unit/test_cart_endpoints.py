@@ -2,6 +2,7 @@ import datetime
 import uuid
 
 import fastapi
+import orjson
 import pytest
 from fastapi import status
 from fastapi import testclient
@@ -65,6 +66,19 @@ def test_cart_endpoint_get_cart_items_authorized(
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) == 1
 
+    response = client.get(
+        '/cart',
+        auth=auth,
+        headers={'Accept': 'application/x-ndjson'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert orjson.loads(response.content) == response.json() == {
+        'id': str(cart_repo.list()[0].id),
+        'product_id': str(product.id),
+        'amount': 1,
+    }
+
 
 @pytest.mark.usefixtures('app', 'client')
 def test_cart_endpoint_get_cart_items_unauthorized(
@@ -146,6 +160,162 @@ def test_cart_endpoint_add_cart_item_failure(
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.usefixtures('app', 'client')
+def test_cart_endpoint_add_cart_item_increment(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('testuser', user_repo)
+
+    product = create_test_product(user.id)
+    product_repo = common.FakeProductRepository([product])
+    cart_repo = common.FakeCartRepository([])
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=product_repo,
+        cart=cart_repo,
+    )
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    for _ in range(2):
+        response = client.post(
+            '/cart',
+            auth=auth,
+            params={'on_conflict': 'increment'},
+            json={'product_id': str(product.id), 'amount': 2},
+        )
+        assert response.status_code == status.HTTP_200_OK
+    
+    assert response.json()['amount'] == 4
+    assert len(cart_repo.items) == 1
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_cart_endpoint_add_cart_item_returning_representation(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('testuser', user_repo)
+
+    product = create_test_product(user.id)
+    product_repo = common.FakeProductRepository([product])
+    cart_repo = common.FakeCartRepository([])
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=product_repo,
+        cart=cart_repo,
+    )
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    statuses = []
+
+    for _ in range(2):
+        response = client.post(
+            '/cart/',
+            auth=auth,
+            headers={'Prefer': 'handling=strict, return=representation'},
+            params={'on_conflict': 'increment'},
+            json={'product_id': str(product.id), 'amount': 2},
+            follow_redirects=False,
+        )
+        statuses.append(response.status_code)
+
+    assert statuses == [status.HTTP_201_CREATED, status.HTTP_200_OK]
+    cart_item_id = next(iter(cart_repo.items))
+    assert response.headers['Content-Location'] == f'/cart/{cart_item_id}'
+    assert response.json() == {
+        'id': str(cart_item_id),
+        'product_id': str(product.id),
+        'amount': 4,
+    }
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_cart_endpoint_get_cart_summary(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('testuser', user_repo)
+
+    product = create_test_product(user.id)
+    product_repo = common.FakeProductRepository([product])
+    cart_repo = common.FakeCartRepository(
+        [
+            market.modules.cart.domain.models.CartItem(
+                id=uuid.uuid4(),
+                product_id=product.id,
+                user_id=user.id,
+                amount=2,
+            ),
+        ],
+        products=product_repo,
+    )
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=product_repo,
+        cart=cart_repo,
+    )
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/cart/summary', auth=auth)
+    assert response.status_code == status.HTTP_200_OK
+    summary = response.json()
+    assert summary['total_rub'] == 200.0
+    assert summary['lines'][0]['title'] == product.title
+    assert summary['lines'][0]['is_available'] is True
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_cart_endpoint_apply_cart_batch(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('testuser', user_repo)
+
+    products = [create_test_product(user.id) for _ in range(3)]
+    product_repo = common.FakeProductRepository(products)
+    cart_repo = common.FakeCartRepository([
+        market.modules.cart.domain.models.CartItem(
+            id=uuid.uuid4(),
+            product_id=product.id,
+            user_id=user.id,
+            amount=1,
+        )
+        for product in products[:2]
+    ])
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=product_repo,
+        cart=cart_repo,
+    )
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.post('/cart/batch', auth=auth, json={'operations': [
+        {'op': 'update', 'product_id': str(products[0].id), 'amount': 4},
+        {'op': 'remove', 'product_id': str(products[1].id)},
+        {'op': 'add', 'product_id': str(products[2].id), 'amount': 2},
+    ]})
+    assert response.status_code == status.HTTP_200_OK
+    amounts = {item['product_id']: item['amount'] for item in response.json()}
+    assert amounts == {str(products[0].id): 4, str(products[2].id): 2}
+
+    # Updating an item which is not in the cart
+    response = client.post('/cart/batch', auth=auth, json={'operations': [
+        {'op': 'update', 'product_id': str(products[1].id), 'amount': 1},
+    ]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # Changing a product twice
+    response = client.post('/cart/batch', auth=auth, json={'operations': [
+        {'op': 'remove', 'product_id': str(products[0].id)},
+        {'op': 'add', 'product_id': str(products[0].id), 'amount': 1},
+    ]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 def test_cart_endpoint_get_cart_item_by_owner(
     lw_app: fastapi.FastAPI,
     client: testclient.TestClient,
@@ -0,0 +1,168 @@
+import asyncio
+import uuid
+
+import pytest
+
+import market.modules.cart.repositories
+import market.modules.product.domain.models
+import market.modules.user.domain.models
+from market.modules.cart.domain import models
+from market.services import unit_of_work
+
+from .. import common
+
+
+def create_cart_owner(session_factory):
+    user = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username='cart_owner',
+        password='password_hash',
+    )
+    product = market.modules.product.domain.models.Product(
+        id=uuid.uuid4(),
+        title='Product',
+        stock=10,
+        price_rub=100.0,
+        owner_id=user.id,
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.users.add(user)
+        uow.products.add(product)
+        uow.commit()
+
+    return user.id, product.id
+
+
+def merge(session_factory, user_id, product_id, amount, on_conflict):
+    cart_item = models.CartItem(
+        id=uuid.uuid4(),
+        amount=amount,
+        product_id=product_id,
+        user_id=user_id,
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        cart_item_id = uow.cart.merge(cart_item, on_conflict=on_conflict)
+        uow.commit()
+
+    return cart_item_id
+
+
+def get_amounts(session_factory):
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        return [cart_item.amount for cart_item in uow.cart.list()]
+
+
+@pytest.mark.parametrize('with_upsert', [True, False])
+def test_cart_repository_merge(session_factory, monkeypatch, with_upsert):
+    if not with_upsert:
+        monkeypatch.delitem(
+            market.modules.cart.repositories.UPSERT_INSERTS,
+            'sqlite',
+        )
+
+    user_id, product_id = create_cart_owner(session_factory)
+
+    cart_item_id = merge(session_factory, user_id, product_id, 2, 'error')
+    assert cart_item_id is not None
+    assert get_amounts(session_factory) == [2]
+
+    assert merge(session_factory, user_id, product_id, 3, 'error') is None
+    assert get_amounts(session_factory) == [2]
+
+    merged_id = merge(session_factory, user_id, product_id, 3, 'increment')
+    assert merged_id == cart_item_id
+    assert get_amounts(session_factory) == [5]
+
+    merged_id = merge(session_factory, user_id, product_id, 1, 'replace')
+    assert merged_id == cart_item_id
+    assert get_amounts(session_factory) == [1]
+
+
+def test_cart_repository_get_summary(session_factory):
+    user_id, product_id = create_cart_owner(session_factory)
+    merge(session_factory, user_id, product_id, 3, 'error')
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        summary = uow.cart.get_summary(user_id)
+        line, = summary.lines
+        assert line.product_id == product_id
+        assert line.title == 'Product'
+        assert line.total_rub == 300.0
+        assert line.is_available is True
+        assert summary.total_rub == 300.0
+
+        product = uow.products.get(product_id)
+        uow.products.update(product, stock=2)
+        uow.commit()
+
+        assert uow.cart.get_summary(user_id).lines[0].is_available is False
+        assert uow.cart.get_summary(uuid.uuid4()).lines == []
+
+
+def test_cart_repository_bulk_operations(session_factory):
+    user_id, product_id = create_cart_owner(session_factory)
+    merge(session_factory, user_id, product_id, 3, 'error')
+    missing_product_id = uuid.uuid4()
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        updated_product_ids = uow.cart.update_amounts(user_id, {
+            product_id: 5,
+            missing_product_id: 1,
+        })
+        assert updated_product_ids == {product_id}
+        assert uow.cart.list()[0].amount == 5
+
+        uow.cart.delete_products(user_id, [product_id, missing_product_id])
+        assert uow.cart.list() == []
+        uow.commit()
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        cart_items = [
+            models.CartItem(
+                id=uuid.uuid4(),
+                amount=1,
+                product_id=product_id,
+                user_id=user_id,
+            )
+            for _ in range(2)
+        ]
+        cart_items[1].product_id = missing_product_id
+        cart_item_ids = uow.cart.merge_many(cart_items)
+        assert cart_item_ids == [item.id for item in cart_items]
+
+        cart_item_ids = uow.cart.merge_many(cart_items[:1], 'error')
+        assert cart_item_ids == [None]
+
+
+def test_async_cart_repository(session_factory, database_path):
+    user_id, product_id = create_cart_owner(session_factory)
+    cart_item = models.CartItem(
+        id=uuid.uuid4(),
+        amount=2,
+        product_id=product_id,
+        user_id=user_id,
+    )
+
+    async def run():
+        url = f'sqlite+aiosqlite:///{database_path}'
+        engine, async_factory = await common.create_async_session_factory(url)
+
+        async with unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            async_factory,
+        ) as uow:
+            # Statements of the synchronous repository are run over the
+            # asyncio session and see its pending changes
+            assert await uow.cart.merge(cart_item) == cart_item.id
+            assert await uow.cart.merge(cart_item, 'increment') == cart_item.id
+            summary = await uow.cart.get_summary(user_id)
+            assert [line.amount for line in summary.lines] == [4]
+
+            deleted = await uow.cart.delete_amounts(user_id, {cart_item.id: 4})
+            assert deleted == 1
+            assert await uow.cart.list(user_id=user_id) == []
+
+        await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,144 @@
+import asyncio
+import uuid
+
+import pytest
+
+import market.common.errors
+import market.modules.product.domain.models
+import market.modules.user.domain.models
+import market.services.orders
+from market.modules.cart.domain import models
+from market.services import unit_of_work
+
+from .. import common
+
+
+def create_cart(session_factory, stocks, amount):
+    """Creates products with the stocks and a user with `amount` of each
+    of them in cart
+    """
+    user = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username='buyer',
+        password='password_hash',
+    )
+    products = [
+        market.modules.product.domain.models.Product(
+            id=uuid.uuid4(),
+            title=f'Product {index}',
+            stock=stock,
+            price_rub=100.0,
+            owner_id=user.id,
+        )
+        for index, stock in enumerate(stocks)
+    ]
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.users.add(user)
+
+        for product in products:
+            uow.products.add(product)
+            uow.cart.add(models.CartItem(
+                id=uuid.uuid4(),
+                amount=amount,
+                product_id=product.id,
+                user_id=user.id,
+            ))
+
+        uow.commit()
+
+    return user.id, [product.id for product in products]
+
+
+def checkout(database_path, user_id, change_cart=None):
+    """Checks the user cart out with an asyncio unit of work over the
+    database, committing if it succeeds. `change_cart` is called after
+    the cart is read
+    """
+    async def run():
+        engine, session_factory = await common.create_async_session_factory(
+            f'sqlite+aiosqlite:///{database_path}',
+        )
+
+        try:
+            async with unit_of_work.AsyncSQLAlchemyUnitOfWork(
+                session_factory,
+            ) as uow:
+                if change_cart is not None:
+                    get_summary = uow.cart.get_summary
+
+                    async def get_summary_and_change_cart(user_id):
+                        summary = await get_summary(user_id)
+                        change_cart()
+                        return summary
+
+                    uow.cart.get_summary = get_summary_and_change_cart
+
+                order, items = await market.services.orders.checkout(
+                    uow,
+                    user_id,
+                )
+                await uow.commit()
+                return order, items
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def get_stocks(session_factory, product_ids):
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        products = uow.products.get_many(product_ids)
+        return [product.stock for product in products]
+
+
+def test_checkout(session_factory, database_path):
+    user_id, product_ids = create_cart(session_factory, [5, 2], amount=2)
+    order, items = checkout(database_path, user_id)
+
+    assert order.total_rub == 400.0
+    assert sorted(item.product_id for item in items) == sorted(product_ids)
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        assert uow.cart.list(user_id=user_id) == []
+        assert len(uow.order_items.list_by_orders([order.id])) == 2
+
+    assert get_stocks(session_factory, product_ids) == [3, 0]
+
+
+def test_checkout_out_of_stock(session_factory, database_path):
+    user_id, product_ids = create_cart(session_factory, [5, 1], amount=2)
+
+    with pytest.raises(market.common.errors.OutOfStockError):
+        checkout(database_path, user_id)
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        assert len(uow.cart.list(user_id=user_id)) == 2
+        assert uow.orders.list() == []
+
+    assert get_stocks(session_factory, product_ids) == [5, 1]
+
+
+def test_checkout_empty_cart(database_path):
+    with pytest.raises(ValueError):
+        checkout(database_path, uuid.uuid4())
+
+
+def test_checkout_cart_changed(session_factory, database_path):
+    user_id, product_ids = create_cart(session_factory, [5], amount=2)
+
+    def change_cart():
+        # The amount is changed by another request after it's read
+        with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as other:
+            cart_item, = other.cart.list(user_id=user_id)
+            other.cart.update(cart_item, amount=3)
+            other.commit()
+
+    with pytest.raises(market.common.errors.CartChangedError):
+        checkout(database_path, user_id, change_cart)
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        assert [item.amount for item in uow.cart.list(user_id=user_id)] == [3]
+        assert uow.orders.list() == []
+
+    assert get_stocks(session_factory, product_ids) == [5]
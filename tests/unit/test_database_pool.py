@@ -0,0 +1,75 @@
+import pytest
+import sqlalchemy
+import sqlalchemy.exc
+
+import market.config
+import market.database.pool
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(
+        f'sqlite:///{tmp_path / "pool.db"}',
+        poolclass=market.database.pool.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.01,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_pool_statistics(engine: sqlalchemy.Engine):
+    first = engine.connect()
+    second = engine.connect()
+
+    statistics = market.database.pool.get_pool_statistics(engine.pool)
+    assert statistics.pool_class == 'InstrumentedQueuePool'
+    assert statistics.size == 1
+    assert statistics.checked_out == 2
+    assert statistics.overflow == 1
+    assert statistics.checkouts == 2
+
+    with pytest.raises(sqlalchemy.exc.TimeoutError):
+        engine.connect()
+
+    first.close()
+    second.close()
+
+    statistics = market.database.pool.get_pool_statistics(engine.pool)
+    assert statistics.checked_out == 0
+    assert statistics.timeouts == 1
+    assert statistics.max_wait_seconds >= 0.0
+
+
+def test_pool_options(monkeypatch):
+    monkeypatch.setenv('DATABASE_POOL_SIZE', '3')
+    market.config.get_database_pool_settings.cache_clear()
+
+    try:
+        options = market.config.get_database_pool_options(
+            'sqlite:///market.db',
+            is_async=False,
+        )
+        memory_options = market.config.get_database_pool_options(
+            'sqlite://',
+            is_async=False,
+        )
+    finally:
+        market.config.get_database_pool_settings.cache_clear()
+
+    assert options['pool_size'] == 3
+    assert options['poolclass'] is market.database.pool.InstrumentedQueuePool
+    assert 'pool_size' not in memory_options
+    assert memory_options['pool_pre_ping'] is True
+
+
+def test_database_engine_is_shared():
+    engine = market.config.get_database_engine()
+    assert market.config.get_database_engine() is engine
+
+
+def test_get_database_pools(client):
+    response = client.get('/health/database')
+    assert response.status_code == 200
+    assert 'pool_class' in response.json()['engine']
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+
+import market.common.errors
+import market.common.executors
+
+
+def test_bounded_executor_runs_calls():
+    executor = market.common.executors.BoundedExecutor(
+        max_workers=1,
+        max_queue_size=0,
+    )
+
+    async def run():
+        return await executor.run(lambda a, b: a + b, 1, b=2)
+    
+    assert asyncio.run(run()) == 3
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_bounded_executor_rejects_calls_over_the_limit():
+    executor = market.common.executors.BoundedExecutor(
+        max_workers=1,
+        max_queue_size=1,
+    )
+    release = threading.Event()
+
+    async def run():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(market.common.errors.ExecutorOverloadedError):
+            await executor.run(release.wait)
+        
+        release.set()
+        await asyncio.gather(running, queued)
+    
+    asyncio.run(run())
+    assert executor.pending == 0
+    executor.shutdown()
@@ -1,14 +1,17 @@
+import concurrent.futures
 import os
 import shutil
 import uuid
 
 import fastapi
+import httpx
 import pytest
 from fastapi import status
 from fastapi import testclient
 
 import market.modules.image.domain.models
 import market.services.auth
+import market.services.storage
 from market.apps.fastapi_app import deps
 
 from .. import common
@@ -37,6 +40,113 @@ def test_image_endpoint_upload_image_success(
     shutil.rmtree(temp_path)
 
 
+def test_image_endpoint_upload_duplicate_image(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    tmp_path,
+):
+    image_repo = common.FakeImageRepository([])
+    uow = common.FakeUnitOfWork(images=image_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    lw_app.dependency_overrides[deps.get_media_path] = lambda: str(tmp_path)
+
+    for _ in range(2):
+        with open('./tests/content/test_image.png', 'rb') as f:
+            response = client.post('/images', files={'image': f})
+
+        assert response.status_code == status.HTTP_200_OK
+    
+    first, second = image_repo.items.values()
+    assert first.id != second.id
+    assert first.image == second.image
+    assert first.content_hash == second.content_hash
+    assert first.image.endswith(f'{first.content_hash}.png')
+    stored_files = [files for _, _, files in os.walk(tmp_path) if files]
+    assert stored_files == [[f'{first.content_hash}.png']]
+
+
+def test_image_endpoint_upload_image_variants(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    tmp_path,
+    monkeypatch,
+):
+    pytest.importorskip('PIL')
+    monkeypatch.setenv('IMAGE_VARIANTS_ENABLED', 'true')
+    image_repo = common.FakeImageRepository([])
+    uow = common.FakeUnitOfWork(images=image_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    lw_app.dependency_overrides[deps.get_media_path] = lambda: str(tmp_path)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    lw_app.dependency_overrides[deps.get_media_executor] = lambda: executor
+
+    with open('./tests/content/test_image.png', 'rb') as f:
+        response = client.post('/images', files={'image': f})
+
+    assert response.status_code == status.HTTP_200_OK
+    variants = response.json()['variants']
+    assert set(variants) == {'thumbnail', 'medium', 'webp'}
+    assert variants['thumbnail'].startswith('http://')
+
+    image, = image_repo.items.values()
+    assert image.variants['webp'].endswith('.webp')
+    assert os.path.exists(os.path.join(tmp_path, image.variants['thumbnail']))
+
+    # The same image reuses variants of the first one
+    with open('./tests/content/test_image.png', 'rb') as f:
+        response = client.post('/images', files={'image': f})
+
+    assert response.json()['variants'] == variants
+    executor.shutdown()
+
+
+def test_image_endpoint_upload_image_to_s3(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    image_repo = common.FakeImageRepository([])
+    uow = common.FakeUnitOfWork(images=image_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    fake_s3 = common.FakeS3()
+    media_storage = market.services.storage.S3Storage(
+        endpoint_url='http://s3.local',
+        bucket='media',
+        access_key_id='access_key',
+        secret_access_key='secret_key',
+        client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_s3)),
+    )
+    lw_app.dependency_overrides[deps.get_media_storage] = lambda: media_storage
+
+    with open('./tests/content/test_image.png', 'rb') as f:
+        data = f.read()
+        response = client.post('/images', files={'image': ('image.png', data)})
+
+    assert response.status_code == status.HTTP_200_OK
+    image, = image_repo.items.values()
+    assert fake_s3.objects == {f'/media/{image.image}': data}
+    del lw_app.dependency_overrides[deps.get_media_storage]
+
+
+def test_image_endpoint_upload_too_large_image(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    tmp_path,
+    monkeypatch,
+):
+    image_repo = common.FakeImageRepository([])
+    uow = common.FakeUnitOfWork(images=image_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    lw_app.dependency_overrides[deps.get_media_path] = lambda: str(tmp_path)
+    monkeypatch.setenv('MAX_IMAGE_SIZE', '10')
+
+    with open('./tests/content/test_image.png', 'rb') as f:
+        response = client.post('/images', files={'image': f})
+    
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert os.listdir(tmp_path) == []
+    assert len(image_repo.items) == 0
+
+
 def test_image_endpoint_get_existing_image_record(
     lw_app: fastapi.FastAPI,
     client: testclient.TestClient,
@@ -0,0 +1,127 @@
+import asyncio
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import sqlalchemy
+
+import market.modules.image.domain.models
+import market.modules.product.domain.models
+import market.modules.product_image.domain.models
+import market.modules.user.domain.models
+from market.services import unit_of_work
+
+from .. import common
+
+
+def test_get_image_variants_by_content_hash(session_factory):
+    variants = {'thumbnail': 'hash_thumbnail.webp'}
+    images = [
+        market.modules.image.domain.models.Image(
+            id=uuid.uuid4(),
+            image='hash.png',
+            content_hash='hash',
+            variants=image_variants,
+        )
+        for image_variants in [None, {}, variants, {}]
+    ]
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        for image in images:
+            uow.images.add(image)
+
+        uow.commit()
+
+    # Missing variants are stored as NULL
+    with session_factory.kw['bind'].connect() as connection:
+        statement = 'SELECT count(*) FROM images WHERE variants IS NOT NULL'
+        assert connection.exec_driver_sql(statement).scalar() == 1
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        assert uow.images.get_variants_by_content_hash('hash') == variants
+        assert uow.images.get_variants_by_content_hash('other') == {}
+
+
+def test_list_images_by_products():
+    async def run():
+        engine, session_factory = await common.create_async_session_factory()
+        owner = market.modules.user.domain.models.User(
+            id=uuid.uuid4(),
+            username='owner_user',
+            password='password_hash',
+        )
+        products = [
+            market.modules.product.domain.models.Product(
+                id=uuid.uuid4(),
+                title='Product',
+                stock=1,
+                price_rub=100.0,
+                owner_id=owner.id,
+            )
+            for _ in range(3)
+        ]
+        now = datetime.now(timezone.utc)
+        images = [
+            market.modules.image.domain.models.Image(
+                id=uuid.uuid4(),
+                image=f'image_{index}.png',
+                added=now - timedelta(minutes=index),
+            )
+            for index in range(3)
+        ]
+        ProductImage = market.modules.product_image.domain.models.ProductImage
+        # The last product has no images
+        product_images = [
+            ProductImage(
+                id=uuid.uuid4(),
+                product_id=product.id,
+                image_id=image.id,
+            )
+            for product, image in zip(
+                [products[0], products[0], products[1]],
+                images,
+            )
+        ]
+
+        async with unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        ) as uow:
+            await uow.users.add(owner)
+
+            for product in products:
+                await uow.products.add(product)
+
+            for image in images:
+                await uow.images.add(image)
+
+            for product_image in product_images:
+                await uow.product_images.add(product_image)
+
+            await uow.commit()
+
+        statements = []
+        sqlalchemy.event.listen(
+            engine.sync_engine,
+            'before_cursor_execute',
+            lambda *args: statements.append(args[2]),
+        )
+
+        async with unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        ) as uow:
+            result = await uow.images.list_by_products(
+                product.id for product in products
+            )
+
+        assert len(statements) == 1
+        # Images are listed in order of upload
+        assert [(product_id, image.id) for product_id, image in result] == [
+            (products[1].id, images[2].id),
+            (products[0].id, images[1].id),
+            (products[0].id, images[0].id),
+        ]
+
+        await engine.dispose()
+
+    asyncio.run(run())
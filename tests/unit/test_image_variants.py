@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+import market.modules.image.variants
+
+PIL = pytest.importorskip('PIL.Image')
+
+
+def test_generate_variants():
+    image = PIL.new('RGBA', (2000, 1000), (255, 0, 0, 128))
+    data = io.BytesIO()
+    image.save(data, format='PNG')
+
+    variants = {
+        variant.name: variant
+        for variant in market.modules.image.variants.generate_variants(
+            data.getvalue(),
+        )
+    }
+
+    assert set(variants) == {'thumbnail', 'medium', 'webp'}
+
+    with PIL.open(io.BytesIO(variants['thumbnail'].data)) as thumbnail:
+        assert thumbnail.format == 'JPEG'
+        assert thumbnail.size == (256, 128)
+
+    with PIL.open(io.BytesIO(variants['medium'].data)) as medium:
+        assert medium.size == (1024, 512)
+
+    with PIL.open(io.BytesIO(variants['webp'].data)) as webp:
+        assert webp.format == 'WEBP'
+        assert webp.size == (2000, 1000)
+        assert variants['webp'].extension == '.webp'
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import os
+
+import fastapi
+import pytest
+from fastapi import status
+from fastapi import testclient
+
+from market.apps.fastapi_app import deps
+from market.apps.fastapi_app import media
+
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_name(lw_app: fastapi.FastAPI, tmp_path):
+    lw_app.dependency_overrides[deps.get_media_path] = lambda: str(tmp_path)
+    sha256 = hashlib.sha256(DATA).hexdigest()
+    name = f'{sha256[:2]}/{sha256[2:4]}/{sha256}.png'
+    os.makedirs(tmp_path / sha256[:2] / sha256[2:4])
+
+    with open(tmp_path / name, 'wb') as f:
+        f.write(DATA)
+
+    return name
+
+
+def test_media_endpoint_get_file(
+    client: testclient.TestClient,
+    media_name: str,
+):
+    response = client.get(f'/media/{media_name}')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == DATA
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['content-length'] == str(len(DATA))
+    assert response.headers['etag'] == f'"{hashlib.sha256(DATA).hexdigest()}"'
+    assert 'immutable' in response.headers['cache-control']
+
+    response = client.head(f'/media/{media_name}')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b''
+
+
+def test_media_endpoint_not_modified(
+    client: testclient.TestClient,
+    media_name: str,
+):
+    etag = client.get(f'/media/{media_name}').headers['etag']
+
+    response = client.get(
+        f'/media/{media_name}',
+        headers={'If-None-Match': f'"other", W/{etag}'},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b''
+
+
+def test_media_endpoint_range(
+    client: testclient.TestClient,
+    media_name: str,
+):
+    response = client.get(f'/media/{media_name}', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == DATA[10:20]
+    assert response.headers['content-range'] == f'bytes 10-19/{len(DATA)}'
+
+    response = client.get(f'/media/{media_name}', headers={'Range': 'bytes=-4'})
+    assert response.content == DATA[-4:]
+
+    response = client.get(
+        f'/media/{media_name}',
+        headers={'Range': 'bytes=0-0', 'If-Range': '"changed"'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == DATA
+
+    response = client.get(
+        f'/media/{media_name}',
+        headers={'Range': f'bytes={len(DATA)}-'},
+    )
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers['content-range'] == f'bytes */{len(DATA)}'
+
+
+def test_media_endpoint_missing_file(
+    client: testclient.TestClient,
+    media_name: str,
+):
+    response = client.get('/media/missing.png')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.get('/media/..%2F..%2Fetc%2Fpasswd')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_media_file_response_zerocopy(tmp_path):
+    path = tmp_path / 'file.bin'
+    path.write_bytes(DATA)
+    response = media.MediaFileResponse(
+        str(path),
+        status_code=206,
+        headers={'content-length': '10'},
+        offset=5,
+        count=10,
+    )
+    messages = []
+
+    async def send(message):
+        if message['type'] == media.ZEROCOPY_EXTENSION:
+            message = dict(message, data=os.pread(message['file'], 10, 5))
+
+        messages.append(message)
+
+    scope = {'type': 'http', 'extensions': {media.ZEROCOPY_EXTENSION: {}}}
+    asyncio.run(response(scope, None, send))
+
+    assert messages[0]['status'] == 206
+    assert messages[1]['offset'] == 5
+    assert messages[1]['count'] == 10
+    assert messages[1]['data'] == DATA[5:15]
@@ -0,0 +1,174 @@
+import asyncio
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import market.common.uploads
+import market.modules.image.domain.models
+import market.modules.product.domain.models
+import market.modules.product_image.domain.models
+import market.modules.user.domain.models
+import market.services.media
+import market.services.storage
+from market.services import unit_of_work
+
+from .. import common
+
+
+def make_image(content_hash: str, added: datetime):
+    name = market.common.uploads.get_content_addressed_name(content_hash)
+    return market.modules.image.domain.models.Image(
+        id=uuid.uuid4(),
+        image=f'{name}.png',
+        content_hash=content_hash,
+        variants={'thumbnail': f'{name}.thumbnail.jpg'},
+        added=added,
+    )
+
+
+def test_collect_orphaned_images(tmp_path):
+    async def run():
+        engine, session_factory = await common.create_async_session_factory()
+        uow_factory = lambda: unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        )
+        media_storage = market.services.storage.LocalStorage(str(tmp_path))
+        now = datetime.now(timezone.utc)
+        old = now - timedelta(days=2)
+
+        orphan = make_image('a' * 64, old)
+        attached = make_image('b' * 64, old)
+        recent = make_image('c' * 64, now)
+        # Shares files with the attached image
+        duplicate = make_image('b' * 64, old)
+        images = [orphan, attached, recent, duplicate]
+
+        for image in images:
+            for name in [image.image, *image.variants.values()]:
+                await media_storage.put(name, b'data')
+
+        owner = market.modules.user.domain.models.User(
+            id=uuid.uuid4(),
+            username='owner_user',
+            password='password_hash',
+        )
+        product = market.modules.product.domain.models.Product(
+            id=uuid.uuid4(),
+            title='Product',
+            stock=1,
+            price_rub=100.0,
+            owner_id=owner.id,
+        )
+        ProductImage = market.modules.product_image.domain.models.ProductImage
+        product_image = ProductImage(
+            id=uuid.uuid4(),
+            product_id=product.id,
+            image_id=attached.id,
+        )
+
+        async with uow_factory() as uow:
+            await uow.users.add(owner)
+            await uow.products.add(product)
+
+            for image in images:
+                await uow.images.add(image)
+
+            await uow.product_images.add(product_image)
+            await uow.commit()
+
+        result = await market.services.media.collect_orphaned_images(
+            media_storage,
+            uow_factory,
+            grace_period=timedelta(days=1),
+            batch_size=1,
+        )
+        assert result == market.services.media.CollectionResult(
+            images=2,
+            files=2,
+        )
+
+        async with uow_factory() as uow:
+            remaining = await uow.images.list()
+            remaining_ids = {image.id for image in remaining}
+            assert remaining_ids == {attached.id, recent.id}
+
+        assert not await media_storage.exists(orphan.image)
+        assert not await media_storage.exists(orphan.variants['thumbnail'])
+        assert await media_storage.exists(attached.image)
+        assert await media_storage.exists(attached.variants['thumbnail'])
+        assert await media_storage.exists(recent.image)
+
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_collect_orphaned_images_in_limited_batches(tmp_path):
+    async def run():
+        engine, session_factory = await common.create_async_session_factory()
+        uow_factory = lambda: unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        )
+        media_storage = market.services.storage.LocalStorage(str(tmp_path))
+        old = datetime.now(timezone.utc) - timedelta(days=2)
+
+        async with uow_factory() as uow:
+            for content_hash in ('a' * 64, 'b' * 64, 'c' * 64):
+                await uow.images.add(make_image(content_hash, old))
+
+            await uow.commit()
+
+        result = await market.services.media.collect_orphaned_images(
+            media_storage,
+            uow_factory,
+            grace_period=timedelta(days=1),
+            batch_size=2,
+            max_batches=1,
+        )
+        assert result.images == 2
+
+        async with uow_factory() as uow:
+            assert len(await uow.images.list()) == 1
+
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_collect_files_uploaded_again(tmp_path):
+    async def run():
+        engine, session_factory = await common.create_async_session_factory()
+        uow_factory = lambda: unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        )
+        media_storage = market.services.storage.LocalStorage(str(tmp_path))
+        now = datetime.now(timezone.utc)
+        orphan = make_image('a' * 64, now - timedelta(days=2))
+        other = make_image('b' * 64, now - timedelta(days=2))
+        names = market.services.media.gc.get_file_names([orphan, other])
+
+        for name in names:
+            await media_storage.put(name, b'data')
+
+        # The orphan is deleted, and then an image of the same content is
+        # uploaded before its files are
+        async with uow_factory() as uow:
+            await uow.images.add(make_image('a' * 64, now))
+            await uow.commit()
+
+        deleted = await market.services.media.gc.delete_files(
+            media_storage,
+            uow_factory,
+            [orphan, other],
+            names,
+        )
+        assert deleted == 2
+
+        assert await media_storage.exists(orphan.image)
+        assert await media_storage.exists(orphan.variants['thumbnail'])
+        assert not await media_storage.exists(other.image)
+
+        await engine.dispose()
+
+    asyncio.run(run())
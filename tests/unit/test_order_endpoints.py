@@ -0,0 +1,90 @@
+import datetime
+import uuid
+
+import fastapi
+import pytest
+from fastapi import status
+from fastapi import testclient
+
+import market.modules.cart.domain.models
+import market.modules.product.domain.models
+from market.apps.fastapi_app import deps
+
+from .. import common
+
+
+def create_test_uow(stock: int, amount: int):
+    user_repo = common.FakeUserRepository([])
+    auth_service = common.LightAuthService(user_repo) # type: ignore
+    user = auth_service.register_user(uuid.uuid4(), 'testuser', 'testuser')
+    token = auth_service.login('testuser', 'testuser')
+    assert token is not None
+
+    product = market.modules.product.domain.models.Product(
+        id=uuid.uuid4(),
+        title='Product title',
+        description='Product description',
+        price_rub=100.0,
+        stock=stock,
+        owner_id=user.id,
+        added=datetime.datetime.now(),
+        last_updated=datetime.datetime.now(),
+    )
+    product_repo = common.FakeProductRepository([product])
+    cart_repo = common.FakeCartRepository(
+        [
+            market.modules.cart.domain.models.CartItem(
+                id=uuid.uuid4(),
+                product_id=product.id,
+                user_id=user.id,
+                amount=amount,
+            ),
+        ],
+        products=product_repo,
+    )
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=product_repo,
+        cart=cart_repo,
+        orders=common.FakeOrderRepository([]),
+        order_items=common.FakeOrderItemRepository([]),
+    )
+    return uow, product, common.TokenAuth(token.access_token)
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_order_endpoint_place_order(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    uow, product, auth = create_test_uow(stock=3, amount=2)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.post('/orders', auth=auth)
+    assert response.status_code == status.HTTP_201_CREATED
+    order = response.json()
+    assert order['total_rub'] == 200.0
+    assert order['items'][0]['product_id'] == str(product.id)
+    assert product.stock == 1
+    assert uow.cart.items == {}
+
+    response = client.get('/orders', auth=auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['id'] for item in response.json()] == [order['id']]
+
+    response = client.get(f'/orders/{order["id"]}', auth=auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == order
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_order_endpoint_place_order_out_of_stock(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    uow, product, auth = create_test_uow(stock=1, amount=2)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.post('/orders', auth=auth)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert product.stock == 1
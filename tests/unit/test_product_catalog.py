@@ -0,0 +1,147 @@
+import asyncio
+import io
+import uuid
+
+import orjson
+
+import market.modules.product.domain.models
+import market.modules.user.domain.models
+import market.services.catalog
+from market.services import unit_of_work
+
+from .. import common
+
+
+def validate(record):
+    fields = {
+        'id': None,
+        'description': '',
+        'is_active': True,
+        **record,
+    }
+
+    if 'title' not in fields:
+        raise ValueError('title: field required')
+    
+    if fields['id'] is not None:
+        fields['id'] = uuid.UUID(fields['id'])
+    
+    fields['stock'] = int(fields['stock'])
+    fields['price_rub'] = float(fields['price_rub'])
+    return fields
+
+
+def create_user(session_factory, username: str) -> uuid.UUID:
+    user = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username=username,
+        password='password_hash',
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.users.add(user)
+        uow.commit()
+
+    return user.id
+
+
+def test_import_products_in_batches(session_factory):
+    owner_id = create_user(session_factory, 'owner_user')
+    other_id = create_user(session_factory, 'other_user')
+    other_product = market.modules.product.domain.models.Product(
+        id=uuid.uuid4(),
+        title='Other product',
+        stock=1,
+        price_rub=100.0,
+        owner_id=other_id,
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.products.add(other_product)
+        uow.commit()
+
+    lines = [
+        orjson.dumps({'title': f'Product {i}', 'stock': i, 'price_rub': 1})
+        for i in range(25)
+    ]
+    lines[3] = b'{"stock": 1}'
+    lines[7] = b'not json'
+    lines.append(b'')
+    lines.append(orjson.dumps({
+        'id': str(other_product.id),
+        'title': 'Stolen product',
+        'stock': 1,
+        'price_rub': 1,
+    }))
+    file = io.BytesIO(b'\n'.join(lines))
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        result = market.services.catalog.import_products(
+            uow,
+            owner_id=owner_id,
+            records=market.services.catalog.read_records(file, 'ndjson'),
+            validate=validate,
+            batch_size=10,
+            max_errors=2,
+        )
+
+    assert (result.created, result.updated, result.failed) == (23, 0, 3)
+    assert [error.record for error in result.errors] == [4, 8]
+    assert result.errors[0].detail == 'title: field required'
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        products = uow.products.list(owner_id=owner_id)
+        assert len(products) == 23
+        assert all(product.added is not None for product in products)
+        assert uow.products.get(other_product.id).title == 'Other product'
+
+
+def test_import_and_export_products_as_csv(session_factory, database_path):
+    owner_id = create_user(session_factory, 'owner_user')
+    csv_file = io.BytesIO(
+        b'title,description,stock,price_rub,is_active\r\n'
+        b'First product,"Multiline\r\ndescription",1,100.0,\r\n'
+        b'Second product,,2,200.0,false,extra\r\n'
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        result = market.services.catalog.import_products(
+            uow,
+            owner_id=owner_id,
+            records=market.services.catalog.read_records(csv_file, 'csv'),
+            validate=validate,
+            batch_size=10,
+            max_errors=10,
+        )
+
+    assert (result.created, result.failed) == (1, 1)
+    assert result.errors[0].record == 2
+
+    async def export():
+        engine, session_factory = await common.create_async_session_factory(
+            f'sqlite+aiosqlite:///{database_path}',
+        )
+
+        async with unit_of_work.AsyncSQLAlchemyUnitOfWork(
+            session_factory,
+        ) as uow:
+            products = await uow.products.stream(
+                batch_size=1,
+                owner_id=owner_id,
+            )
+            records = (
+                {'title': product.title, 'is_active': product.is_active}
+                async for product in products
+            )
+            content = market.services.catalog.write_csv(
+                records,
+                fields=['title', 'is_active'],
+                chunk_size=1,
+            )
+            chunks = [chunk async for chunk in content]
+
+        await engine.dispose()
+        return chunks
+
+    chunks = asyncio.run(export())
+    assert chunks == [b'title,is_active\r\nFirst product,true\r\n']
@@ -1,13 +1,19 @@
+import csv
 import datetime
+import io
 import uuid
 
 import fastapi
+import orjson
 import pytest
 from fastapi import status
 from fastapi import testclient
 
+import market.modules.image.domain.models
 import market.modules.user.domain.models
 import market.modules.product.domain.models
+import market.modules.product_image.domain.models
+import market.modules.product.repositories
 import market.services.auth
 from market.apps.fastapi_app import deps
 
@@ -54,6 +60,174 @@ def test_product_endpoint_list_products(
     assert len(response.json()) == 1
 
 
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_stream_products(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv('PRODUCTS_MAX_PAGE_SIZE', '2')
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('owner_user', user_repo)
+
+    products = [create_test_product(user.id) for _ in range(5)]
+    product_repo = common.FakeProductRepository(products)
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    ndjson_headers = {'Accept': 'application/x-ndjson'}
+
+    response = client.get('/products', headers=ndjson_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert 'X-Next-Cursor' not in response.headers
+    product_ids = [
+        orjson.loads(line)['id'] for line in response.content.splitlines()
+    ]
+    expected_ids = [
+        str(product.id) for product in product_repo.list(order_by='added')
+    ]
+    assert product_ids == expected_ids
+
+    # Limit isn't capped by the maximum page size
+    response = client.get(
+        '/products',
+        headers=ndjson_headers,
+        params={'limit': 3},
+    )
+    assert len(response.content.splitlines()) == 3
+
+    response = client.get(
+        '/products',
+        headers={'Accept': 'application/x-ndjson;q=0, application/json'},
+    )
+    assert response.headers['content-type'] == 'application/json'
+    assert len(response.json()) == 2
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_list_products_paginated(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('owner_user', user_repo)
+
+    products = [create_test_product(user.id) for _ in range(3)]
+    product_repo = common.FakeProductRepository(products)
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/products?limit=2')
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page) == 2
+
+    cursor = response.headers['X-Next-Cursor']
+    response = client.get(f'/products?limit=2&cursor={cursor}')
+    assert response.status_code == status.HTTP_200_OK
+    second_page = response.json()
+    assert len(second_page) == 1
+    assert 'X-Next-Cursor' not in response.headers
+
+    listed_ids = {item['id'] for item in first_page + second_page}
+    assert listed_ids == {str(product.id) for product in products}
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_list_products_filtered_and_sorted(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('owner_user', user_repo)
+
+    products = [create_test_product(user.id) for _ in range(4)]
+    for index, product in enumerate(products):
+        product.price_rub = 100.0 * (index + 1)
+    products[1].stock = 0
+    product_repo = common.FakeProductRepository(products)
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/products', params={
+        'min_price': 150.0,
+        'in_stock': True,
+        'sort': 'price',
+        'order': 'desc',
+        'limit': 1,
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['price_rub'] for item in response.json()] == [400.0]
+
+    response = client.get('/products', params={
+        'min_price': 150.0,
+        'in_stock': True,
+        'sort': 'price',
+        'order': 'desc',
+        'cursor': response.headers['X-Next-Cursor'],
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['price_rub'] for item in response.json()] == [300.0]
+
+    # Cursor made for another ordering is rejected
+    response = client.get('/products', params={
+        'sort': 'added',
+        'cursor': market.modules.product.repositories.make_cursor(
+            products[0],
+            order_by='price',
+        ),
+    })
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_list_products_invalid_cursor(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    product_repo = common.FakeProductRepository([])
+    uow = common.FakeUnitOfWork(products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/products?cursor=invalid')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_search_products(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('owner_user', user_repo)
+
+    phone = create_test_product(user.id)
+    phone.title = 'Smart phone'
+    phone_case = create_test_product(user.id)
+    phone_case.title = 'Leather case'
+    phone_case.description = 'Fits any phone'
+    product_repo = common.FakeProductRepository([
+        phone_case,
+        phone,
+        create_test_product(user.id),
+    ])
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/products/search', params={'q': 'Phone'})
+    assert response.status_code == status.HTTP_200_OK
+    found_ids = [uuid.UUID(item['id']) for item in response.json()]
+    assert found_ids == [phone.id, phone_case.id]
+
+    response = client.get('/products/search', params={'q': 'phone', 'offset': 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+    response = client.get('/products/search', params={'q': 'phone tablet'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
 @pytest.mark.usefixtures('app', 'client')
 def test_product_endpoint_add_product_authorized(
     lw_app: fastapi.FastAPI,
@@ -76,6 +250,71 @@ def test_product_endpoint_add_product_authorized(
     assert len(product_repo.list()) == 1
 
 
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_add_product_returning_representation(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    user, auth = create_test_user('owner_user', user_repo)
+
+    product_repo = common.FakeProductRepository([])
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.post(
+        '/products/',
+        auth=auth,
+        headers={'Prefer': 'return=representation'},
+        json={'title': 'Some title', 'stock': 10, 'price_rub': 100.0},
+        follow_redirects=False,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers['Preference-Applied'] == 'return=representation'
+    product = product_repo.list()[0]
+    assert response.headers['Location'] == f'/products/{product.id}'
+    assert response.json()['id'] == str(product.id)
+    assert response.json()['owner_id'] == str(user.id)
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_put_product_returning_representation_by_default(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv('RETURN_REPRESENTATION', 'true')
+    user_repo = common.FakeUserRepository([])
+    owner, owner_auth = create_test_user('owner_user', user_repo)
+
+    product = create_test_product(owner.id)
+    product_repo = common.FakeProductRepository([product])
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+    product_json = {'title': 'New title', 'stock': 20, 'price_rub': 100.0}
+
+    response = client.put(
+        f'/products/{product.id}',
+        auth=owner_auth,
+        json=product_json,
+        follow_redirects=False,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['Content-Location'] == f'/products/{product.id}'
+    assert response.json()['title'] == 'New title'
+
+    # The request's preference overrides the setting
+    response = client.put(
+        f'/products/{product.id}',
+        auth=owner_auth,
+        headers={'Prefer': 'return=minimal'},
+        json=product_json,
+        follow_redirects=False,
+    )
+    assert response.status_code == status.HTTP_303_SEE_OTHER
+    assert response.headers['Location'] == f'/products/{product.id}'
+
+
 @pytest.mark.usefixtures('app', 'client')
 def test_product_endpoint_add_product_unauthorized(
     lw_app: fastapi.FastAPI,
@@ -96,6 +335,75 @@ def test_product_endpoint_add_product_unauthorized(
     assert len(product_repo.list()) == 0
 
 
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_import_products(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    owner, auth = create_test_user('owner_user', user_repo)
+
+    product = create_test_product(owner.id)
+    product_repo = common.FakeProductRepository([product])
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    content = b'\n'.join([
+        b'{"title": "Imported product", "stock": 1, "price_rub": 10}',
+        b'{"title": "Short", "stock": 1, "price_rub": 10}',
+        b'{"id": "%s", "title": "Updated title", "stock": 5, "price_rub": 1}'
+        % str(product.id).encode(),
+        b'{"id": "%s", "title": "Missing product", "stock": 5, "price_rub": 1}'
+        % str(uuid.uuid4()).encode(),
+    ])
+    response = client.post(
+        '/products/import',
+        auth=auth,
+        files={'file': ('products.ndjson', content, 'application/x-ndjson')},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert (result['created'], result['updated'], result['failed']) == (1, 1, 2)
+    assert [error['record'] for error in result['errors']] == [2, 4]
+    assert result['errors'][0]['detail'].startswith('title: ')
+    assert product.title == 'Updated title'
+    assert len(product_repo.list()) == 2
+
+
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_export_products(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+):
+    user_repo = common.FakeUserRepository([])
+    owner, auth = create_test_user('owner_user', user_repo)
+    other_user, _ = create_test_user('other_user', user_repo)
+
+    product = create_test_product(owner.id)
+    other_product = create_test_product(other_user.id)
+    product_repo = common.FakeProductRepository([product, other_product])
+    uow = common.FakeUnitOfWork(users=user_repo, products=product_repo)
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get('/products/export', auth=auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = response.content.splitlines()
+    assert len(lines) == 1
+    assert orjson.loads(lines[0])['id'] == str(product.id)
+
+    response = client.get(
+        '/products/export',
+        auth=auth,
+        params={'format': 'csv'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['id'] for row in rows] == [str(product.id)]
+    assert rows[0]['is_active'] == 'true'
+
+
 @pytest.mark.usefixtures('app', 'client')
 def test_product_endpoint_get_existing_product(
     lw_app: fastapi.FastAPI,
@@ -114,6 +422,62 @@ def test_product_endpoint_get_existing_product(
     assert uuid.UUID(response.json()['id']) == product.id
 
 
+@pytest.mark.usefixtures('app', 'client')
+def test_product_endpoint_get_product_with_images(
+    lw_app: fastapi.FastAPI,
+    client: testclient.TestClient,
+    media_url_root: str,
+):
+    user_repo = common.FakeUserRepository([])
+    owner, auth = create_test_user('owner_user', user_repo)
+
+    product = create_test_product(owner.id)
+    other_product = create_test_product(owner.id)
+    image, other_image = [
+        market.modules.image.domain.models.Image(
+            id=uuid.uuid4(),
+            image=name,
+            variants={'thumbnail': f'thumbnail_{name}'},
+        )
+        for name in ('image.png', 'other_image.png')
+    ]
+    ProductImage = market.modules.product_image.domain.models.ProductImage
+    product_image_repo = common.FakeProductImageRepository([
+        ProductImage(id=uuid.uuid4(), product_id=product.id, image_id=image.id),
+        ProductImage(
+            id=uuid.uuid4(),
+            product_id=other_product.id,
+            image_id=other_image.id,
+        ),
+    ])
+    uow = common.FakeUnitOfWork(
+        users=user_repo,
+        products=common.FakeProductRepository([product, other_product]),
+        images=common.FakeImageRepository(
+            [image, other_image],
+            product_images=product_image_repo,
+        ),
+        product_images=product_image_repo,
+    )
+    lw_app.dependency_overrides[deps.get_uow] = lambda: uow
+
+    response = client.get(f'/products/{product.id}')
+    assert response.status_code == status.HTTP_200_OK
+    assert 'images' not in response.json()
+
+    response = client.get(
+        f'/products/{product.id}',
+        params={'expand': 'images'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['id'] == str(product.id)
+    assert response.json()['images'] == [{
+        'id': str(image.id),
+        'image': f'{media_url_root}image.png',
+        'variants': {'thumbnail': f'{media_url_root}thumbnail_image.png'},
+    }]
+
+
 @pytest.mark.usefixtures('app', 'client')
 def test_product_endpoint_get_nonexisting_product(
     lw_app: fastapi.FastAPI,
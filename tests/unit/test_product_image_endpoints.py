@@ -82,6 +82,15 @@ def test_product_image_endpoint_list_product_images(
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) == 0
 
+    response = client.get(
+        '/productimages',
+        headers={'Accept': 'application/x-ndjson'},
+        params={'product_id': str(product_with_images.id)},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert len(response.content.splitlines()) == 1
+
     response = client.get(f'/productimages?product_id={uuid.uuid4()}')
     assert response.status_code == status.HTTP_200_OK
     assert len(response.json()) == 0
@@ -0,0 +1,137 @@
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import pytest
+
+import market.modules.product.repositories
+import market.modules.user.domain.models
+from market.modules.product.domain import models
+from market.services import unit_of_work
+
+
+def create_products(session_factory, *values):
+    """Creates products of `(title, price, stock, added minute, last
+    updated minute)` values and returns them in the same order
+    """
+    owner = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username='owner_user',
+        password='password_hash',
+    )
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    products = [
+        models.Product(
+            id=uuid.uuid4(),
+            title=title,
+            stock=stock,
+            price_rub=price,
+            owner_id=owner.id,
+            added=start + timedelta(minutes=added, microseconds=500),
+            last_updated=start + timedelta(minutes=last_updated),
+        )
+        for title, price, stock, added, last_updated in values
+    ]
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.users.add(owner)
+
+        for product in products:
+            uow.products.add(product)
+
+        uow.commit()
+
+    return products
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('order_by', ['added', 'last_updated', 'price'])
+def test_product_repository_list_paginated(
+    session_factory,
+    order_by,
+    descending,
+):
+    # Sort values repeat, so pages are split by ids within equal values
+    products = create_products(
+        session_factory,
+        ('First', 5.0, 1, 0, 2),
+        ('Second', 1.5, 1, 1, 0),
+        ('Third', 5.0, 1, 1, 2),
+        ('Fourth', 3.25, 1, 2, 1),
+        ('Fifth', 1.5, 1, 0, 0),
+        ('Sixth', 5.0, 1, 1, 1),
+    )
+    attribute = market.modules.product.repositories.SORT_ATTRIBUTES[order_by]
+    expected = sorted(
+        products,
+        key=lambda product: (getattr(product, attribute), product.id),
+        reverse=descending,
+    )
+    result = []
+    after = None
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        while True:
+            page = uow.products.list(
+                after=after,
+                limit=2,
+                order_by=order_by,
+                descending=descending,
+            )
+            result.extend(page)
+
+            if len(page) < 2:
+                break
+
+            # Cursors are made of values loaded from the database, so
+            # datetimes and floats make a round trip through them
+            after = market.modules.product.repositories.make_cursor(
+                page[-1],
+                order_by,
+                descending,
+            )
+
+    assert [product.id for product in result] == [
+        product.id for product in expected
+    ]
+
+
+@pytest.mark.parametrize('filters,titles', [
+    ({'min_price': 3.25}, ['Phone', 'Pho%ne', 'Photo', 'Pz\U0010ffff']),
+    ({'max_price': 3.25}, ['Pho_ne', 'Phones case', 'Photo', 'phone']),
+    ({'min_price': 2.0, 'max_price': 4.0}, ['Photo']),
+    ({'in_stock': True}, ['Phone', 'Pho_ne', 'Photo', 'phone']),
+    ({'in_stock': False}, ['Pho%ne', 'Phones case', 'Pz\U0010ffff']),
+    (
+        {'title_prefix': 'Pho'},
+        ['Phone', 'Pho%ne', 'Pho_ne', 'Phones case', 'Photo'],
+    ),
+    ({'title_prefix': 'Phone'}, ['Phone', 'Phones case']),
+    ({'title_prefix': 'Pho%'}, ['Pho%ne']),
+    ({'title_prefix': 'Pho_'}, ['Pho_ne']),
+    # Prefixes ending with the last code point have no upper bound, so
+    # only LIKE limits them and its wildcards must match only themselves
+    ({'title_prefix': 'Pz\U0010ffff'}, ['Pz\U0010ffff']),
+    ({'title_prefix': 'P_\U0010ffff'}, []),
+    ({'title_prefix': 'Pho', 'in_stock': True, 'max_price': 4.0}, [
+        'Pho_ne',
+        'Photo',
+    ]),
+])
+def test_product_repository_list_filtered(session_factory, filters, titles):
+    create_products(
+        session_factory,
+        ('Phone', 5.0, 1, 0, 0),
+        ('Pho%ne', 5.0, 0, 1, 0),
+        ('Pho_ne', 1.5, 2, 2, 0),
+        ('Phones case', 1.5, 0, 3, 0),
+        ('Photo', 3.25, 1, 4, 0),
+        ('phone', 1.5, 1, 5, 0),
+        ('Pz\U0010ffff', 10.0, 0, 6, 0),
+    )
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        products = uow.products.list(**filters)
+
+    assert [product.title for product in products] == titles
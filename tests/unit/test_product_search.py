@@ -0,0 +1,178 @@
+import uuid
+
+import pytest
+import sqlalchemy
+import sqlalchemy.orm
+import sqlalchemy.pool
+
+import market.database.orm
+import market.modules.product.repositories
+import market.modules.product.search
+import market.modules.user.domain.models
+from market.modules.product.domain import models
+
+
+@pytest.fixture
+def engine():
+    engine = sqlalchemy.create_engine(
+        'sqlite://',
+        poolclass=sqlalchemy.pool.StaticPool,
+    )
+    market.database.orm.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def create_test_products(session: sqlalchemy.orm.Session, *titles: str):
+    owner = market.modules.user.domain.models.User(
+        id=uuid.uuid4(),
+        username='owner_user',
+        password='password_hash',
+    )
+    session.add(owner)
+    products = [
+        models.Product(
+            id=uuid.uuid4(),
+            title=title,
+            description='Product description',
+            stock=10,
+            price_rub=100.0,
+            owner_id=owner.id,
+        )
+        for title in titles
+    ]
+    session.add_all(products)
+    session.commit()
+    return products
+
+
+def test_inverted_index_ranking():
+    index = market.modules.product.search.InvertedIndex()
+    in_title = uuid.uuid4()
+    in_description = uuid.uuid4()
+    index.add(in_description, 'Leather case', 'Fits any phone')
+    index.add(in_title, 'Smart phone', 'Black')
+    index.add(uuid.uuid4(), 'Tablet', 'Black')
+
+    assert index.search('Phone', limit=10) == [in_title, in_description]
+    assert index.search('black phone', limit=10) == [in_title]
+    assert index.search('phone', limit=10, offset=1) == [in_description]
+    assert index.search('!!!', limit=10) == []
+
+    index.remove(in_title)
+    assert index.search('phone', limit=10) == [in_description]
+
+
+def test_inverted_index_tokenization():
+    index = market.modules.product.search.InvertedIndex()
+    product_id = uuid.uuid4()
+    index.add(product_id, 'Café crème', '')
+
+    assert index.search('CAFE', limit=10) == [product_id]
+
+
+def test_product_repository_search_fts(engine: sqlalchemy.Engine):
+    market.modules.product.search.install(engine)
+    session = sqlalchemy.orm.Session(bind=engine)
+    phone, phone_case, _ = create_test_products(
+        session,
+        'Smart phone',
+        'Phone case',
+        'Tablet stand',
+    )
+    repo = market.modules.product.repositories.ProductRepository(session)
+
+    found = repo.search('phone', limit=10)
+    assert {product.id for product in found} == {phone.id, phone_case.id}
+    assert repo.search('"phone OR', limit=10) == []
+
+    # Index is kept in sync by triggers
+    phone.title = 'Smart watch'
+    session.commit()
+    assert [product.id for product in repo.search('phone', limit=10)] == [
+        phone_case.id,
+    ]
+
+    session.close()
+
+
+def test_product_repository_search_fts_after_renumbering(
+    engine: sqlalchemy.Engine,
+):
+    market.modules.product.search.install(engine)
+    session = sqlalchemy.orm.Session(bind=engine)
+    products = create_test_products(
+        session,
+        *(f'Product {number}' for number in range(10)),
+        'Smart phone',
+    )
+    phone_id = products[-1].id
+    remaining_ids = {product.id for product in products[5:]}
+
+    for product in products[:5]:
+        session.delete(product)
+
+    session.commit()
+    session.close()
+
+    # Renumbering implicit rowids, as VACUUM may do
+    with engine.begin() as connection:
+        connection.exec_driver_sql('UPDATE products SET rowid = -rowid')
+
+    session = sqlalchemy.orm.Session(bind=engine)
+    repo = market.modules.product.repositories.ProductRepository(session)
+    assert [product.id for product in repo.search('phone', limit=10)] == [
+        phone_id,
+    ]
+    found = repo.search('product', limit=10)
+    assert {product.id for product in found} == remaining_ids
+
+    session.close()
+
+
+def test_inverted_index_follows_session_commits(engine: sqlalchemy.Engine):
+    session = sqlalchemy.orm.Session(bind=engine)
+    [phone] = create_test_products(session, 'Smart phone')
+
+    index = market.modules.product.search.InvertedIndex()
+    market.modules.product.search.install_inverted_index(engine, index)
+    assert index.search('phone', limit=10) == [phone.id]
+
+    try:
+        phone.title = 'Smart watch'
+        session.flush()
+        session.rollback()
+        assert index.search('phone', limit=10) == [phone.id]
+
+        phone.title = 'Smart watch'
+        session.commit()
+        assert index.search('phone', limit=10) == []
+        assert index.search('watch', limit=10) == [phone.id]
+    finally:
+        index.unsubscribe()
+        session.close()
+
+
+def test_inverted_index_follows_bulk_changes(engine: sqlalchemy.Engine):
+    session = sqlalchemy.orm.Session(bind=engine)
+    [phone] = create_test_products(session, 'Smart phone')
+
+    index = market.modules.product.search.InvertedIndex()
+    market.modules.product.search.install_inverted_index(engine, index)
+
+    try:
+        changes = [{
+            'id': phone.id,
+            'title': 'Smart watch',
+            'description': 'Product description',
+        }]
+        market.modules.product.search.record_changes(session, changes)
+        session.rollback()
+        assert index.search('watch', limit=10) == []
+
+        market.modules.product.search.record_changes(session, changes)
+        session.commit()
+        assert index.search('watch', limit=10) == [phone.id]
+    finally:
+        index.unsubscribe()
+        session.close()
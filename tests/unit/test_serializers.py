@@ -0,0 +1,62 @@
+import collections
+import uuid
+from datetime import datetime
+
+import orjson
+import pydantic
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+import market.modules.image.domain.models
+import market.modules.product.domain.models
+from market.apps.fastapi_app import serializers
+from market.apps.fastapi_app.routers.image import schemas as image_schemas
+from market.apps.fastapi_app.routers.product import schemas
+
+
+def test_serializer_matches_schema(media_url_root: str):
+    product = market.modules.product.domain.models.Product(
+        id=uuid.uuid4(),
+        title='Product title',
+        description='Product description',
+        price_rub=100.5,
+        stock=10,
+        owner_id=uuid.uuid4(),
+        added=datetime(2023, 1, 2, 3, 4, 5, 678),
+        last_updated=datetime(2023, 1, 2, 3, 4, 5),
+    )
+    image = market.modules.image.domain.models.Image(
+        id=uuid.uuid4(),
+        image='images/image.png',
+        variants={'thumbnail': 'images/image_thumbnail.webp'},
+    )
+    cases = [
+        (schemas.serialize_product, schemas.ProductRead, product),
+        (image_schemas.serialize_image, image_schemas.ImageRead, image),
+    ]
+
+    for serialize, schema, instance in cases:
+        expected = jsonable_encoder(schema.from_orm(instance))
+        assert orjson.loads(orjson.dumps(serialize(instance))) == expected
+
+    assert image_schemas.serialize_image(image)['variants'] == {
+        'thumbnail': f'{media_url_root}images/image_thumbnail.webp',
+    }
+
+
+def test_serializer_reads_result_rows():
+    class Schema(pydantic.BaseModel):
+        id: int
+
+    Row = collections.namedtuple('Row', ['id', 'title'])
+    serialize = serializers.make_serializer(Schema)
+
+    assert serialize(Row(id=1, title='Title')) == {'id': 1}
+
+
+def test_serializer_requires_converters_of_validated_fields():
+    with pytest.raises(ValueError):
+        serializers.make_serializer(image_schemas.ImageRead)
+
+    with pytest.raises(ValueError):
+        serializers.make_serializer(schemas.ProductRead, unknown=str)
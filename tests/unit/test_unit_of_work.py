@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+
+import pytest
+import sqlalchemy
+import sqlalchemy.event
+import sqlalchemy.orm
+
+import market.common.errors
+import market.modules.user.domain.models
+from market.modules.product.domain import models
+from market.services import unit_of_work
+
+from .. import common
+
+
+def make_uow(session_factory):
+    return unit_of_work.AsyncSQLAlchemyUnitOfWork(session_factory)
+
+
+def test_async_unit_of_work():
+    async def run():
+        engine, session_factory = await common.create_async_session_factory()
+        owner = market.modules.user.domain.models.User(
+            id=uuid.uuid4(),
+            username='owner_user',
+            password='password_hash',
+        )
+        product = models.Product(
+            id=uuid.uuid4(),
+            title='Product',
+            description='Product description',
+            stock=10,
+            price_rub=100.0,
+            owner_id=owner.id,
+        )
+
+        async with make_uow(session_factory) as uow:
+            await uow.users.add(owner)
+            await uow.products.add(product)
+            await uow.commit()
+
+        async with make_uow(session_factory) as uow:
+            instance = await uow.products.get(product.id)
+            assert instance.title == 'Product'
+
+            instances = await uow.products.list(owner_id=owner.id)
+            assert [inst.id for inst in instances] == [product.id]
+
+            with pytest.raises(market.common.errors.NotFoundError):
+                await uow.products.get(uuid.uuid4())
+
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_unit_of_work_is_lazy():
+    sessions = []
+
+    def session_factory():
+        session = sqlalchemy.orm.Session()
+        sessions.append(session)
+        return session
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        uow.commit()
+        assert sessions == []
+
+        assert uow.products is uow.products
+        assert uow.users.session is uow.products.session
+        assert len(sessions) == 1
+
+
+def test_repository_get_many_uses_identity_map(session_factory):
+    statements = []
+    sqlalchemy.event.listen(
+        session_factory.kw['bind'],
+        'before_cursor_execute',
+        lambda *args: statements.append(args[2]),
+    )
+    users = [
+        market.modules.user.domain.models.User(
+            id=uuid.uuid4(),
+            username=f'user_{index}',
+            password='password_hash',
+        )
+        for index in range(3)
+    ]
+    user_ids = [user.id for user in users]
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        for user in users:
+            uow.users.add(user)
+
+        uow.commit()
+
+    with unit_of_work.SQLAlchemyUnitOfWork(session_factory) as uow:
+        statements.clear()
+        first = uow.users.get(user_ids[0])
+        assert uow.users.get(user_ids[0]) is first
+        assert len(statements) == 1
+
+        instances = uow.users.get_many(user_ids[::-1])
+        assert [inst.id for inst in instances] == user_ids[::-1]
+        assert len(statements) == 2
+
+        with pytest.raises(market.common.errors.NotFoundError):
+            uow.users.get_many([user_ids[0], uuid.uuid4()])
@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+
+import market.common.errors
+import market.services.media
+import market.services.storage
+
+
+def store(media_storage, data, **options):
+    async def run():
+        async with market.services.media.store_upload(
+            media_storage,
+            io.BytesIO(data),
+            chunk_size=64,
+            **options,
+        ) as uploaded_file:
+            return uploaded_file
+
+    return asyncio.run(run())
+
+
+def test_store_upload(tmp_path):
+    data = os.urandom(1000)
+    sha256 = hashlib.sha256(data).hexdigest()
+    media_storage = market.services.storage.LocalStorage(str(tmp_path))
+
+    uploaded_file = store(media_storage, data, extension='.png')
+
+    assert uploaded_file.size == len(data)
+    assert uploaded_file.sha256 == sha256
+    assert uploaded_file.name == f'{sha256[:2]}/{sha256[2:4]}/{sha256}.png'
+    assert os.listdir(tmp_path) == [sha256[:2]]
+
+    with open(tmp_path / uploaded_file.name, 'rb') as f:
+        assert f.read() == data
+
+
+def test_store_upload_duplicate(tmp_path):
+    data = os.urandom(1000)
+    media_storage = market.services.storage.LocalStorage(str(tmp_path))
+    first = store(media_storage, data)
+    modified_at = os.stat(tmp_path / first.name).st_mtime_ns
+
+    second = store(media_storage, data)
+
+    assert second.name == first.name
+    assert os.stat(tmp_path / second.name).st_mtime_ns == modified_at
+    assert os.listdir(tmp_path) == [first.sha256[:2]]
+
+
+def test_store_upload_too_large(tmp_path):
+    media_storage = market.services.storage.LocalStorage(str(tmp_path))
+
+    with pytest.raises(market.common.errors.FileTooLargeError):
+        store(media_storage, b'x' * 1000, max_size=100)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_store_upload_restores_collected_file(tmp_path):
+    data = os.urandom(1000)
+    media_storage = market.services.storage.LocalStorage(str(tmp_path))
+
+    async def run():
+        async with market.services.media.store_upload(
+            media_storage,
+            io.BytesIO(data),
+            chunk_size=64,
+        ) as uploaded_file:
+            # The collector deletes the file of an orphan with the same
+            # content before the image of the upload is committed
+            await media_storage.delete(uploaded_file.name)
+
+        return uploaded_file
+
+    uploaded_file = asyncio.run(run())
+
+    with open(tmp_path / uploaded_file.name, 'rb') as f:
+        assert f.read() == data